@@ -0,0 +1,53 @@
+# Generated by Django 3.2 on 2026-10-18 12:00
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accum', '0002_point_paths_key_point'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='frames',
+            name='start_gps_time',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='frames',
+            name='stop_gps_time',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='frames',
+            name='point_count',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='frames',
+            name='bbox',
+            field=django.contrib.gis.db.models.fields.PolygonField(blank=True, null=True, srid=4326),
+        ),
+        # Summarize the frames that already have point paths
+        migrations.RunSQL(
+            sql="""
+            UPDATE accum_frames frm
+            SET    start_gps_time = pp.start_gps_time,
+                   stop_gps_time = pp.stop_gps_time,
+                   point_count = pp.point_count,
+                   bbox = pp.bbox
+            FROM   (SELECT frame_id,
+                           min(gps_time) AS start_gps_time,
+                           max(gps_time) AS stop_gps_time,
+                           count(*) AS point_count,
+                           ST_MakeEnvelope(min(ST_X(geom)), min(ST_Y(geom)), max(ST_X(geom)), max(ST_Y(geom)), 4326) AS bbox
+                    FROM   accum_point_paths
+                    GROUP BY frame_id) pp
+            WHERE  frm.id = pp.frame_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
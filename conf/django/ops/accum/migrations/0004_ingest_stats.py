@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accum', '0003_frames_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ingest_stats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.CharField(db_index=True, max_length=20)),
+                ('operation', models.CharField(max_length=50)),
+                ('phase', models.CharField(max_length=50)),
+                ('duration', models.FloatField()),
+                ('row_count', models.IntegerField(blank=True, null=True)),
+                ('season', models.CharField(blank=True, max_length=50, null=True)),
+                ('segment', models.CharField(blank=True, max_length=20, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 3.2 on 2026-10-18 12:00
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+from ops.utility import LOCATION_EPSG, epsgCaseSql
+
+# Point paths projected per statement by the backfill (each batch commits on its own).
+BACKFILL_BATCH_SIZE = 500000
+
+
+def backfillPointPaths(apps, schema_editor):
+    """Stores the projected geometry of the existing point paths in batches of ids."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT MIN(id), MAX(id) FROM accum_point_paths;")
+        minId, maxId = cursor.fetchone()
+        if minId is None:
+            return
+        for startId in range(minId, maxId + 1, BACKFILL_BATCH_SIZE):
+            cursor.execute(
+                """
+                UPDATE accum_point_paths pp
+                SET    geom_proj = ST_SetSRID(ST_Transform(ST_Force2D(pp.geom), {epsg}), 0)
+                FROM   accum_locations loc
+                WHERE  loc.id = pp.location_id AND loc.name = ANY(%s)
+                AND    pp.id BETWEEN %s AND %s;
+                """.format(epsg=epsgCaseSql("loc.name")),
+                [list(LOCATION_EPSG), startId, startId + BACKFILL_BATCH_SIZE - 1],
+            )
+
+
+class Migration(migrations.Migration):
+
+    # the point paths backfill commits batch by batch
+    atomic = False
+
+    dependencies = [
+        ('accum', '0004_ingest_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='segments',
+            name='geom_proj',
+            field=django.contrib.gis.db.models.fields.LineStringField(blank=True, null=True, srid=0),
+        ),
+        migrations.RunSQL(
+            sql=[(
+                """
+                UPDATE accum_segments seg
+                SET    geom_proj = ST_SetSRID(ST_Transform(seg.geom, {epsg}), 0)
+                FROM   accum_seasons ss
+                       JOIN accum_locations loc ON loc.id = ss.location_id
+                WHERE  ss.id = seg.season_id AND loc.name = ANY(%s);
+                """.format(epsg=epsgCaseSql("loc.name")),
+                [list(LOCATION_EPSG)],
+            )],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='point_paths',
+            name='geom_proj',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, null=True, spatial_index=False, srid=0),
+        ),
+        migrations.RunPython(backfillPointPaths, migrations.RunPython.noop),
+        # Index the point paths once they are filled (this replaces the ST_Transform expression
+        # indexes created by provisions.sh)
+        migrations.RunSQL(
+            sql="""
+            CREATE INDEX accum_point_paths_geom_proj_gist ON accum_point_paths USING gist (geom_proj);
+            DROP INDEX IF EXISTS accum_arctic_geom_idx;
+            DROP INDEX IF EXISTS accum_antarctic_geom_idx;
+            """,
+            reverse_sql="DROP INDEX IF EXISTS accum_point_paths_geom_proj_gist;",
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accum', '0005_geom_proj'),
+    ]
+
+    operations = [
+        # Point paths without geom_proj (projected on the fly, see utility.projectedPointSql) are
+        # searched through this partial index, which stays small as points are projected when written
+        migrations.RunSQL(
+            sql="""
+            CREATE INDEX accum_point_paths_unprojected ON accum_point_paths (location_id, season_id)
+            WHERE geom_proj IS NULL;
+            """,
+            reverse_sql="DROP INDEX IF EXISTS accum_point_paths_unprojected;",
+        ),
+    ]
@@ -0,0 +1,626 @@
+"""Crossover engines for crossoverCalculation.
+
+An engine finds the crossovers of one segment with a list of candidate segments (in the projection
+of the segment's location) and returns them as a Crossovers tuple of arrays:
+
+        point_path_1_id: (numpy array) id of the key point of the segment closest to each crossover
+        point_path_2_id: (numpy array) id of the key point of the other segment closest to it
+        angle: (numpy array) acute angle of the crossing in degrees
+        lon, lat: (numpy arrays) crossover points in EPSG:4326
+
+Two engines are available (see CROSSOVER_ENGINES and settings.OPS_CROSSOVER_ENGINE):
+
+        - 'sql' intersects the lines rebuilt from the key points in PostGIS
+        - 'strtree' loads the projected key points once and intersects the line pieces in NumPy,
+          with the candidate piece pairs taken from an STRtree over the pieces of the other segments
+
+The engines read the stored projected geometries (geom_proj) of the point paths of the segment's
+location and transform the geometries of any other point paths on the fly (PROJECTED_POINT_SQL),
+so candidates from other locations or not yet backfilled are still compared.
+
+Both engines only find the crossing points and their positions along the two lines. The closest
+key points and the angles of all crossings are then resolved at once by resolveCrossings (a
+sorted-index lookup of the rounded positions and vectorized azimuths), so the engines give the
+same rows.
+
+Self-intersections are not found by the engines but by selfCrossovers, a sweep over the pieces of
+the segment's own line.
+
+The crossovers of every engine and of selfCrossovers are saved by writeCrossovers, which streams
+them into the crossovers table with a binary COPY.
+
+"""
+import collections
+import numpy as np
+import ops.utility as utility
+import ops.pgcopy as pgcopy
+
+# Crossovers of a segment found by an engine (see the module docstring).
+Crossovers = collections.namedtuple(
+    "Crossovers", ["point_path_1_id", "point_path_2_id", "angle", "lon", "lat"]
+)
+
+# Entries per node of the STRtree.
+STRTREE_NODE_CAPACITY = 10
+
+# Most candidate piece pairs tested at once by the self-crossing sweep.
+SWEEP_CHUNK_PAIRS = 1000000
+
+# Projected geometry of a point path in the projection %(proj)s: the stored geom_proj of the point
+# paths of the location %(loc)s, and geom transformed on the fly for the others (point paths of
+# other locations or not backfilled yet).
+PROJECTED_POINT_SQL = """CASE WHEN pp.location_id = %(loc)s AND pp.geom_proj IS NOT NULL THEN pp.geom_proj
+            ELSE ST_SetSRID(ST_Transform(ST_Force2D(pp.geom), %(proj)s), 0) END"""
+
+# Key points of a segment or of several segments (in line order) with their projected coordinates.
+KEY_POINTS_SQL = """
+SELECT pp.segment_id, pp.id, ST_X(prj.geom), ST_Y(prj.geom)
+FROM   {app}_point_paths pp, LATERAL (SELECT {projected} AS geom) prj
+WHERE  pp.segment_id = ANY(%(segments)s) AND pp.key_point = true
+ORDER BY pp.segment_id, pp.gps_time;
+"""
+
+# Crossings of the line of the segment %(seg)s with the lines of the segments %(candidates)s: the
+# crossing point, its position along both lines (fractional key point index from 0) and the other
+# segment (the 'sql' engine). Collinear overlaps are skipped.
+CROSSINGS_SQL = """SET LOCAL work_mem = '15MB';
+WITH pts AS
+    (SELECT {projected} AS geom_proj, row_number() over (order by pp.gps_time) - 1 AS idx
+        FROM {app}_point_paths pp WHERE pp.segment_id = %(seg)s AND pp.key_point = true),
+line AS
+    (SELECT ST_MakeLine(ST_MakePoint(ST_X(pts.geom_proj), ST_Y(pts.geom_proj), pts.idx) ORDER BY pts.idx) AS ln
+        FROM pts),
+other_pts AS
+    (SELECT pp.segment_id, {projected} AS geom_proj, row_number() over (partition by pp.segment_id order by pp.gps_time) - 1 AS idx
+        FROM {app}_point_paths pp WHERE pp.segment_id = ANY(%(candidates)s) AND pp.key_point = true),
+others AS
+    (SELECT other_pts.segment_id, ST_MakeLine(ST_MakePointM(ST_X(other_pts.geom_proj), ST_Y(other_pts.geom_proj), other_pts.idx) ORDER BY other_pts.idx) AS ln
+        FROM other_pts GROUP BY other_pts.segment_id),
+i_pts AS
+    (SELECT o.segment_id, o.ln, (ST_Dump(ST_Intersection(line.ln, ST_Force2D(o.ln)))).geom AS i_pt
+        FROM line, others o)
+SELECT ST_X(i_pt), ST_Y(i_pt), ST_Z(i_pt), segment_id, ST_InterpolatePoint(ln, i_pt)
+FROM   i_pts
+WHERE  GeometryType(i_pt) = 'POINT';"""
+
+
+def emptyCrossovers():
+    """Gets a Crossovers tuple without any crossovers."""
+    return Crossovers(
+        np.zeros(0, dtype=np.int64),
+        np.zeros(0, dtype=np.int64),
+        np.zeros(0, dtype=np.float64),
+        np.zeros(0, dtype=np.float64),
+        np.zeros(0, dtype=np.float64),
+    )
+
+
+def concatCrossovers(found):
+    """Joins several Crossovers tuples into one.
+
+    Input:
+            found: (list of Crossovers) crossovers of an engine, of selfCrossovers, ...
+
+    Output:
+            crossovers: (Crossovers) all of the crossovers in input order
+
+    """
+    if not found:
+        return emptyCrossovers()
+    return Crossovers(*[np.concatenate(column) for column in zip(*found)])
+
+
+def writeCrossovers(cursor, app, found):
+    """Streams crossovers into the crossovers table of an application with a binary COPY.
+
+    Input:
+            cursor: (object) a database cursor
+            app: (string) application name
+            found: (Crossovers) the crossovers to insert
+
+    Output:
+            rowCount: (integer) number of crossovers inserted
+
+    """
+    if len(found.point_path_1_id) == 0:
+        return 0
+    columnData = pgcopy.crossoverColumns(
+        found.point_path_1_id, found.point_path_2_id, found.angle, found.lon, found.lat)
+    pgcopy.copyBinary(cursor, app + '_crossovers', pgcopy.CROSSOVER_COLUMNS, columnData)
+    return len(found.point_path_1_id)
+
+
+def acuteAngles(angle1, angle2):
+    """Folds the difference of two azimuths to the acute angle between the lines.
+
+    Input:
+            angle1: (numpy array) azimuths in degrees
+            angle2: (numpy array) azimuths in degrees
+
+    Output:
+            angle: (numpy array) acute angles in degrees
+
+    """
+    angle = np.abs(np.asarray(angle1, dtype=np.float64) - np.asarray(angle2, dtype=np.float64))
+    angle = np.where(angle > 90, np.abs(180 - angle), angle)
+    return np.where(angle > 90, np.abs(180 - angle), angle)
+
+
+def sqlCrossovers(cursor, app, segmentId, proj, candidateIds, timer=None, locationId=None):
+    """Finds the crossovers of a segment with the candidate segments in PostGIS.
+
+    Input:
+            cursor: (object) database cursor
+            app: (string) application name
+            segmentId: (integer) id of the segment
+            proj: (integer) epsg code of the location's projection (see utility.LOCATION_EPSG)
+            candidateIds: (list of integers) ids of the segments that may cross it
+            timer: (object) utility.PhaseTimer of the run (intersect and resolve phases are added)
+            locationId: (integer) id of the location of proj, whose stored projected geometries
+                    are used (None transforms every point path, see PROJECTED_POINT_SQL)
+
+    Output:
+            crossovers: (named tuple) Crossovers found
+
+    PostGIS only finds the crossing points and their positions along both lines; the closest key
+    points and the angles are resolved for all crossings at once by resolveCrossings.
+
+    """
+    timer = timer or utility.PhaseTimer("crossoverCalculation")
+    if not len(candidateIds):
+        return emptyCrossovers()
+
+    with timer.phase("intersect"):
+        cursor.execute(
+            CROSSINGS_SQL.format(app=app, projected=PROJECTED_POINT_SQL),
+            {"seg": int(segmentId), "candidates": [int(candidateId) for candidateId in candidateIds],
+             "proj": int(proj), "loc": locationId},
+        )
+        crossings = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 5)
+    if not len(crossings):
+        return emptyCrossovers()
+
+    with timer.phase("resolve", len(crossings)):
+        target = loadKeyPoints(cursor, app, [segmentId], proj, locationId)
+        others = loadKeyPoints(cursor, app, np.unique(crossings[:, 3]), proj, locationId)
+        # positions along the other lines become rows of the other key points
+        otherPosition = np.searchsorted(others[:, 0], crossings[:, 3], side="left") + crossings[:, 4]
+        return resolveCrossings(target, others, crossings[:, 2], otherPosition, crossings[:, :2], proj)
+
+
+def strtreeCrossovers(cursor, app, segmentId, proj, candidateIds, timer=None, locationId=None):
+    """Finds the crossovers of a segment with the candidate segments in NumPy (see findCrossings).
+
+    Input:
+            cursor: (object) database cursor
+            app: (string) application name
+            segmentId: (integer) id of the segment
+            proj: (integer) epsg code of the location's projection (see utility.LOCATION_EPSG)
+            candidateIds: (list of integers) ids of the segments that may cross it
+            timer: (object) utility.PhaseTimer of the run (load, intersect and resolve phases are added)
+            locationId: (integer) id of the location of proj, whose stored projected geometries
+                    are used (None transforms every point path, see PROJECTED_POINT_SQL)
+
+    Output:
+            crossovers: (named tuple) Crossovers found
+
+    """
+    timer = timer or utility.PhaseTimer("crossoverCalculation")
+    if not len(candidateIds):
+        return emptyCrossovers()
+    with timer.phase("load"):
+        target = loadKeyPoints(cursor, app, [segmentId], proj, locationId)
+        others = loadKeyPoints(cursor, app, candidateIds, proj, locationId)
+    with timer.phase("intersect"):
+        targetPosition, otherPosition, crossXy = intersectLines(target, others)
+    if not len(crossXy):
+        return emptyCrossovers()
+    with timer.phase("resolve", len(crossXy)):
+        return resolveCrossings(target, others, targetPosition, otherPosition, crossXy, proj)
+
+
+def loadKeyPoints(cursor, app, segmentIds, proj, locationId=None):
+    """Loads the projected key points of segments in line order.
+
+    Input:
+            cursor: (object) database cursor
+            app: (string) application name
+            segmentIds: (list of integers) ids of the segments
+            proj: (integer) epsg code of the projection (see utility.LOCATION_EPSG)
+            locationId: (integer) id of the location of proj, whose stored projected geometries
+                    are used (None transforms every point path, see PROJECTED_POINT_SQL)
+
+    Output:
+            keyPoints: (numpy array) rows of segment id, point path id, x and y
+
+    """
+    cursor.execute(
+        KEY_POINTS_SQL.format(app=app, projected=PROJECTED_POINT_SQL),
+        {"segments": [int(segmentId) for segmentId in segmentIds], "proj": int(proj), "loc": locationId},
+    )
+    return np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 4)
+
+
+def findCrossings(target, others, proj):
+    """Finds the crossovers of the line of one segment with the lines of other segments.
+
+    Input:
+            target: (numpy array) key points of the segment (see loadKeyPoints)
+            others: (numpy array) key points of the other segments (see loadKeyPoints)
+            proj: (integer) epsg code of the projection of the key points
+
+    Output:
+            crossovers: (named tuple) Crossovers found, in the order of the segment's line
+
+    """
+    targetPosition, otherPosition, crossXy = intersectLines(target, others)
+    if not len(crossXy):
+        return emptyCrossovers()
+    return resolveCrossings(target, others, targetPosition, otherPosition, crossXy, proj)
+
+
+def intersectLines(target, others):
+    """Intersects the line of one segment with the lines of other segments.
+
+    Input:
+            target: (numpy array) key points of the segment (see loadKeyPoints)
+            others: (numpy array) key points of the other segments (see loadKeyPoints)
+
+    Output:
+            targetPosition: (numpy array) fractional row in target of each crossing
+            otherPosition: (numpy array) fractional row in others of each crossing
+            crossXy: (numpy array) crossing points, in the order of the segment's line
+
+    The pieces (pairs of consecutive key points) of the other lines are packed in an STRtree
+    and queried with the boxes of the segment's pieces. Each candidate pair of pieces is then
+    tested at once (see crossPieces).
+
+    """
+    targetPieces = linePieces(target)
+    otherPieces = linePieces(others)
+    if not len(targetPieces) or not len(otherPieces):
+        return np.zeros(0), np.zeros(0), np.zeros((0, 2))
+
+    targetXy = target[:, 2:4]
+    otherXy = others[:, 2:4]
+    tree = STRtree(pieceBoxes(otherXy, otherPieces))
+    targetIdx, otherIdx = tree.query(pieceBoxes(targetXy, targetPieces))
+    pieces1 = targetPieces[targetIdx]
+    pieces2 = otherPieces[otherIdx]
+
+    pieces1, pieces2, t, u = crossPieces(
+        targetXy, pieces1, lastPieces(target, pieces1), otherXy, pieces2, lastPieces(others, pieces2))
+    order = np.lexsort((u, pieces2, t, pieces1))
+    pieces1, pieces2, t, u = pieces1[order], pieces2[order], t[order], u[order]
+    return pieces1 + t, pieces2 + u, crossingPoints(targetXy, pieces1, t)
+
+
+def crossPieces(xy1, pieces1, isLast1, xy2, pieces2, isLast2):
+    """Tests pairs of line pieces for crossings (vectorized segment-segment intersection).
+
+    Input:
+            xy1: (numpy array) points of the first lines
+            pieces1: (numpy array) first point of the piece of the first lines of each pair
+            isLast1: (numpy array) whether each of pieces1 ends its line
+            xy2: (numpy array) points of the second lines
+            pieces2: (numpy array) first point of the piece of the second lines of each pair
+            isLast2: (numpy array) whether each of pieces2 ends its line
+
+    Output:
+            pieces1, pieces2: (numpy arrays) the pairs that cross
+            t, u: (numpy arrays) fraction along each piece of the crossing
+
+    Pieces are half-open (the crossing may not be on their last point) except the last piece of a
+    line, so a crossing on a point shared by two pieces is found once. Parallel pieces do not cross.
+
+    """
+    p = xy1[pieces1]
+    r = xy1[pieces1 + 1] - p
+    q = xy2[pieces2]
+    s = xy2[pieces2 + 1] - q
+    qp = q - p
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = r[:, 0] * s[:, 1] - r[:, 1] * s[:, 0]
+        t = (qp[:, 0] * s[:, 1] - qp[:, 1] * s[:, 0]) / denom
+        u = (qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0]) / denom
+    hit = (
+        (denom != 0)
+        & (t >= 0) & ((t < 1) | (isLast1 & (t <= 1)))
+        & (u >= 0) & ((u < 1) | (isLast2 & (u <= 1)))
+    )
+    return pieces1[hit], pieces2[hit], t[hit], u[hit]
+
+
+def crossingPoints(xy, pieces, t):
+    """Gets the points at fraction t along line pieces (exactly the point when t is 0 or 1)."""
+    crossXy = xy[pieces] + t[:, None] * (xy[pieces + 1] - xy[pieces])
+    crossXy = np.where((t == 0)[:, None], xy[pieces], crossXy)
+    return np.where((t == 1)[:, None], xy[pieces + 1], crossXy)
+
+
+def resolveCrossings(target, others, targetPosition, otherPosition, crossXy, proj):
+    """Resolves the closest key points and the angles of crossings.
+
+    Input:
+            target: (numpy array) key points of the segment (see loadKeyPoints)
+            others: (numpy array) key points of the other segments (see loadKeyPoints)
+            targetPosition: (numpy array) fractional row in target of each crossing
+            otherPosition: (numpy array) fractional row in others of each crossing
+            crossXy: (numpy array) projected crossing points
+            proj: (integer) epsg code of the projection of the key points
+
+    Output:
+            crossovers: (named tuple) Crossovers of the crossings
+
+    """
+    pointIdx1, angle1 = closestKeyPoints(target, targetPosition, crossXy)
+    pointIdx2, angle2 = closestKeyPoints(others, otherPosition, crossXy)
+    lon, lat = utility.transformCoords(crossXy[:, 0], crossXy[:, 1], proj, 4326)
+    return Crossovers(
+        target[pointIdx1, 1].astype(np.int64),
+        others[pointIdx2, 1].astype(np.int64),
+        acuteAngles(angle1, angle2),
+        lon,
+        lat,
+    )
+
+
+def selfCrossovers(keyPoints, proj):
+    """Finds the crossovers of the line of a segment with itself.
+
+    Input:
+            keyPoints: (numpy array) key points of the segment (see loadKeyPoints)
+            proj: (integer) epsg code of the projection of the key points
+
+    Output:
+            crossovers: (named tuple) Crossovers found, ordered by their first pass. The key
+                    points are the closer end of the piece of the first and of the second pass
+                    over each crossing, and the angle is the acute angle between the two pieces.
+
+    """
+    pieces1, pieces2, t, u = selfCrossings(keyPoints[:, 2:4])
+    if not len(pieces1):
+        return emptyCrossovers()
+    xy = keyPoints[:, 2:4]
+    crossXy = crossingPoints(xy, pieces1, t)
+
+    def closerEnd(pieces):
+        startDist = np.hypot(*(xy[pieces] - crossXy).T)
+        stopDist = np.hypot(*(xy[pieces + 1] - crossXy).T)
+        return np.where(startDist <= stopDist, pieces, pieces + 1)
+
+    def direction(pieces):
+        delta = xy[pieces + 1] - xy[pieces]
+        return np.degrees(np.arctan2(delta[:, 1], delta[:, 0]))
+
+    lon, lat = utility.transformCoords(crossXy[:, 0], crossXy[:, 1], proj, 4326)
+    return Crossovers(
+        keyPoints[closerEnd(pieces1), 1].astype(np.int64),
+        keyPoints[closerEnd(pieces2), 1].astype(np.int64),
+        acuteAngles(direction(pieces1), direction(pieces2)),
+        lon,
+        lat,
+    )
+
+
+def selfCrossings(xy, chunkPairs=SWEEP_CHUNK_PAIRS):
+    """Finds the pairs of pieces of a line that cross each other with a sweep line.
+
+    Input:
+            xy: (numpy array) points of the line
+            chunkPairs: (integer) most candidate pairs tested at once
+
+    Output:
+            pieces1, pieces2: (numpy arrays) first point of the earlier and the later piece of each
+                    crossing (adjacent pieces, which share a point, are never paired)
+            t, u: (numpy arrays) fraction along each piece of the crossing
+
+    The pieces are sorted by where they start along the sweep axis (the axis the pieces overlap
+    least on). Sweeping over that order, the pieces a piece can cross are the ones that start
+    before it ends: a contiguous range found by binary search, so the candidate pairs come out in
+    O(n log n) plus their number. Candidates that do not overlap on the other axis are dropped and
+    the rest are tested exactly (see crossPieces), chunkPairs pairs at a time.
+
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    pieceCount = len(xy) - 1
+    if pieceCount < 3:
+        return empty, empty, np.zeros(0), np.zeros(0)
+    pieces = np.arange(pieceCount)
+    boxes = pieceBoxes(xy, pieces)
+
+    # sweep along the axis the pieces overlap least on
+    extents = boxes[:, 2:] - boxes[:, :2]
+    spans = boxes[:, 2:].max(axis=0) - boxes[:, :2].min(axis=0)
+    axis = int(np.argmin(extents.mean(axis=0) / np.maximum(spans, np.finfo(np.float64).tiny)))
+    other = 1 - axis
+
+    order = np.argsort(boxes[:, axis], kind="stable")
+    sweepStart = boxes[order, axis]
+    sweepStop = np.searchsorted(sweepStart, boxes[order, axis + 2], side="right")
+    counts = sweepStop - np.arange(1, pieceCount + 1)
+    isLast = pieces == pieceCount - 1
+
+    found = [[], [], [], []]
+    chunkStart = 0
+    cumulative = np.cumsum(counts)
+    while chunkStart < pieceCount:
+        # sweep positions whose candidates fit in one chunk (at least one position)
+        chunkStop = int(np.searchsorted(cumulative, cumulative[chunkStart] - counts[chunkStart] + chunkPairs, side="right"))
+        chunkStop = max(chunkStop, chunkStart + 1)
+        chunkCounts = counts[chunkStart:chunkStop]
+        position = np.repeat(np.arange(chunkStart, chunkStop), chunkCounts)
+        offsets = np.arange(chunkCounts.sum()) - np.repeat(np.cumsum(chunkCounts) - chunkCounts, chunkCounts)
+        pieces1 = order[position]
+        pieces2 = order[position + 1 + offsets]
+        pieces1, pieces2 = np.minimum(pieces1, pieces2), np.maximum(pieces1, pieces2)
+        keep = (
+            (pieces2 - pieces1 > 1)
+            & (boxes[pieces1, other] <= boxes[pieces2, other + 2])
+            & (boxes[pieces2, other] <= boxes[pieces1, other + 2])
+        )
+        crossed = crossPieces(
+            xy, pieces1[keep], isLast[pieces1[keep]], xy, pieces2[keep], isLast[pieces2[keep]])
+        for values, chunkValues in zip(found, crossed):
+            values.append(chunkValues)
+        chunkStart = chunkStop
+
+    pieces1, pieces2, t, u = (np.concatenate(values) for values in found)
+    order = np.lexsort((u, pieces2, t, pieces1))
+    return pieces1[order], pieces2[order], t[order], u[order]
+
+
+def linePieces(keyPoints):
+    """Gets the pieces of the lines of key points (see loadKeyPoints).
+
+    Output:
+            pieces: (numpy array) index of the first key point of each piece
+
+    """
+    sameLine = keyPoints[1:, 0] == keyPoints[:-1, 0]
+    return np.flatnonzero(sameLine)
+
+
+def lastPieces(keyPoints, pieces):
+    """Flags the pieces that end their line."""
+    nextIdx = pieces + 2
+    return (nextIdx >= len(keyPoints)) | (keyPoints[np.minimum(nextIdx, len(keyPoints) - 1), 0] != keyPoints[pieces, 0])
+
+
+def pieceBoxes(xy, pieces):
+    """Gets the bounding boxes (minx, miny, maxx, maxy) of line pieces."""
+    start = xy[pieces]
+    stop = xy[pieces + 1]
+    return np.hstack([np.minimum(start, stop), np.maximum(start, stop)])
+
+
+def closestKeyPoints(keyPoints, position, crossXy):
+    """Resolves the key point closest to each crossing and the azimuth of the line there.
+
+    Input:
+            keyPoints: (numpy array) key points of the lines (see loadKeyPoints)
+            position: (numpy array) fractional key point index of each crossing
+            crossXy: (numpy array) crossing points
+
+    Output:
+            pointIdx: (numpy array) row in keyPoints of the key point closest to each crossing
+            azimuth: (numpy array) azimuth in degrees from each crossing to its closest key point,
+                    or to the next key point when the crossing is on it (as ST_Azimuth)
+
+    """
+    # index of the first and last key point of the line of each crossing
+    lineIds = keyPoints[:, 0]
+    lineStart = np.searchsorted(lineIds, lineIds, side="left")
+    lineStop = np.searchsorted(lineIds, lineIds, side="right") - 1
+    firstIdx = lineStart[np.clip(np.floor(position).astype(np.int64), 0, len(keyPoints) - 1)]
+    lastIdx = lineStop[firstIdx]
+
+    # the key points are numbered from 1 along the line and the crossing's number is rounded
+    # half to even (as a float is cast to an integer in PostgreSQL)
+    pointIdx = firstIdx + np.rint(position - firstIdx + 1).astype(np.int64) - 1
+    pointIdx = np.clip(pointIdx, firstIdx, lastIdx)
+    otherIdx = np.where(pointIdx + 1 <= lastIdx, pointIdx + 1, pointIdx - 1)
+
+    onPoint = np.all(keyPoints[pointIdx, 2:4] == crossXy, axis=1)
+    towardIdx = np.where(onPoint, otherIdx, pointIdx)
+    delta = keyPoints[towardIdx, 2:4] - crossXy
+    azimuth = np.degrees(np.mod(np.arctan2(delta[:, 0], delta[:, 1]), 2 * np.pi))
+    return pointIdx, azimuth
+
+
+class STRtree:
+    """Sort-Tile-Recursive packed R-tree over 2D boxes, queried with many boxes at once.
+
+    Input:
+            boxes: (numpy array) rows of minx, miny, maxx, maxy
+            nodeCapacity: (integer) entries per node
+
+    Each level of the tree is a set of node boxes whose children are a contiguous range of the
+    level below, so a query walks down all query boxes together level by level.
+
+    """
+
+    def __init__(self, boxes, nodeCapacity=STRTREE_NODE_CAPACITY):
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.nodeCapacity = nodeCapacity
+        self.itemIds = _strOrder(boxes, nodeCapacity)
+        self.itemBoxes = boxes[self.itemIds]
+
+        # levels from the leaves up: (node boxes, first child, child stop)
+        self.levels = []
+        levelBoxes = self.itemBoxes
+        while len(levelBoxes) > nodeCapacity:
+            childStart = np.arange(0, len(levelBoxes), nodeCapacity)
+            childStop = np.minimum(childStart + nodeCapacity, len(levelBoxes))
+            nodeBoxes = np.hstack([
+                np.minimum.reduceat(levelBoxes[:, :2], childStart, axis=0),
+                np.maximum.reduceat(levelBoxes[:, 2:], childStart, axis=0),
+            ])
+            order = _strOrder(nodeBoxes, nodeCapacity)
+            self.levels.append((nodeBoxes[order], childStart[order], childStop[order]))
+            levelBoxes = nodeBoxes[order]
+
+    def __len__(self):
+        return len(self.itemIds)
+
+    def query(self, boxes):
+        """Finds the pairs of query boxes and tree boxes that intersect.
+
+        Input:
+                boxes: (numpy array) rows of minx, miny, maxx, maxy
+
+        Output:
+                queryIdx: (numpy array) index of the query box of each pair
+                itemIdx: (numpy array) index (in the tree's input) of the tree box of each pair
+
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if not len(boxes) or not len(self.itemIds):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        # start from every entry of the top level (the root's children)
+        topBoxes = self.levels[-1][0] if self.levels else self.itemBoxes
+        queryIdx = np.repeat(np.arange(len(boxes)), len(topBoxes))
+        nodeIdx = np.tile(np.arange(len(topBoxes)), len(boxes))
+        keep = _overlaps(boxes[queryIdx], topBoxes[nodeIdx])
+        queryIdx, nodeIdx = queryIdx[keep], nodeIdx[keep]
+
+        for levelIdx in range(len(self.levels) - 1, -1, -1):
+            _, childStart, childStop = self.levels[levelIdx]
+            childBoxes = self.levels[levelIdx - 1][0] if levelIdx else self.itemBoxes
+            counts = childStop[nodeIdx] - childStart[nodeIdx]
+            queryIdx = np.repeat(queryIdx, counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            nodeIdx = np.repeat(childStart[nodeIdx], counts) + offsets
+            keep = _overlaps(boxes[queryIdx], childBoxes[nodeIdx])
+            queryIdx, nodeIdx = queryIdx[keep], nodeIdx[keep]
+
+        return queryIdx, self.itemIds[nodeIdx]
+
+
+def _strOrder(boxes, nodeCapacity):
+    """Orders boxes in vertical slices by x, and by y within each slice (STR packing)."""
+    count = len(boxes)
+    if not count:
+        return np.zeros(0, dtype=np.int64)
+    centerX = (boxes[:, 0] + boxes[:, 2]) / 2
+    centerY = (boxes[:, 1] + boxes[:, 3]) / 2
+    sliceSize = nodeCapacity * int(np.ceil(np.sqrt(np.ceil(count / nodeCapacity))))
+    order = np.argsort(centerX, kind="stable")
+    sliceIdx = np.arange(count) // sliceSize
+    return order[np.lexsort((centerY[order], sliceIdx))]
+
+
+def _overlaps(boxes1, boxes2):
+    """Tests pairs of boxes for intersection (touching boxes intersect)."""
+    return (
+        (boxes1[:, 0] <= boxes2[:, 2]) & (boxes2[:, 0] <= boxes1[:, 2])
+        & (boxes1[:, 1] <= boxes2[:, 3]) & (boxes2[:, 1] <= boxes1[:, 3])
+    )
+
+
+# Crossover engines by name (see settings.OPS_CROSSOVER_ENGINE).
+CROSSOVER_ENGINES = {
+    "sql": sqlCrossovers,
+    "strtree": strtreeCrossovers,
+}
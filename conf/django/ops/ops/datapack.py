@@ -0,0 +1,452 @@
+"""Loads OPS datapacks into a live database without pg_bulkload or a PostgreSQL restart.
+
+A datapack (see views.getInitialData) is a set of CSV dumps named {app}_{table}. Each file is
+COPYed into an UNLOGGED staging table, and the staged rows are then inserted into the live
+{app}_* tables with set-based SQL in one transaction:
+
+        - small lookup tables (locations, radars, seasons, layers, ...) are matched to existing rows
+          by name, so a season or layer that is already loaded is reused instead of duplicated
+        - all other tables get their ids shifted past the live ids (and sequences), so packs can be
+          loaded into a populated database
+        - foreign keys are rewritten to the new ids of the rows they reference; references to rows
+          that are not in the pack (such as the fixture layers) are kept as they are
+
+Example:
+        import ops.datapack
+        ops.datapack.loadDirectory('/tmp/pgdata/')
+
+Datapack tarballs are loaded in parallel by the load_datapacks management command.
+
+"""
+import csv
+import itertools
+import logging
+import os
+import tarfile
+from collections import OrderedDict
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+import ops.pgcopy as pgcopy
+import ops.utility as utility
+
+# Applications whose tables can be loaded from datapacks.
+DATAPACK_APPS = ("rds", "accum", "snow", "kuband")
+
+# Datapack tables in foreign key order (referenced tables first).
+DATAPACK_TABLES = (
+    "locations",
+    "season_groups",
+    "radars",
+    "seasons",
+    "layer_groups",
+    "layers",
+    "layer_links",
+    "segments",
+    "frames",
+    "point_paths",
+    "crossovers",
+    "layer_points",
+    "landmarks",
+)
+
+# Columns that identify a row of a lookup table (staged rows matching a live row are mapped to it).
+NATURAL_KEYS = {
+    "locations": ("name",),
+    "season_groups": ("name",),
+    "radars": ("name",),
+    "seasons": ("name", "location_id"),
+    "layer_groups": ("name",),
+    "layers": ("name", "layer_group_id"),
+}
+
+# Columns that identify a segment (a pack holding a segment that is already loaded is rejected).
+SEGMENT_KEY = ("name", "season_id", "radar_id")
+
+# Values of columns missing from datapacks made by older versions of OPS.
+LEGACY_DEFAULTS = {
+    "segments": {"crossover_calc": "true"},
+    "point_paths": {"key_point": "true"},
+}
+
+# Bytes read from a datapack file per COPY chunk.
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Summary of the frames loaded without one (see the frames summary migration).
+FRAME_SUMMARY_SQL = """
+UPDATE {app}_frames frm
+SET    start_gps_time = pp.start_gps_time,
+       stop_gps_time = pp.stop_gps_time,
+       point_count = pp.point_count,
+       bbox = pp.bbox
+FROM   (SELECT frame_id,
+               min(gps_time) AS start_gps_time,
+               max(gps_time) AS stop_gps_time,
+               count(*) AS point_count,
+               ST_MakeEnvelope(min(ST_X(geom)), min(ST_Y(geom)), max(ST_X(geom)), max(ST_Y(geom)), 4326) AS bbox
+        FROM   {app}_point_paths
+        WHERE  frame_id BETWEEN %s AND %s
+        GROUP BY frame_id) pp
+WHERE  frm.id = pp.frame_id AND frm.point_count IS NULL;
+"""
+
+
+def datapackFiles(directory):
+    """Finds the datapack files in a directory.
+
+    Input:
+            directory: (string) directory holding {app}_{table} datapack files
+
+    Output:
+            packFiles: (dictionary) app name to an ordered dictionary of table name to file path
+                    (in DATAPACK_TABLES order)
+
+    """
+    packFiles = {}
+    fileNames = set(os.listdir(directory))
+    for app in DATAPACK_APPS:
+        appFiles = OrderedDict(
+            (table, os.path.join(directory, app + "_" + table))
+            for table in DATAPACK_TABLES
+            if app + "_" + table in fileNames
+        )
+        if appFiles:
+            packFiles[app] = appFiles
+    return packFiles
+
+
+def datapackMember(fileName):
+    """Gets the application and table of a datapack file name.
+
+    Input:
+            fileName: (string) name or path of a datapack file (such as 'rds_point_paths')
+
+    Output:
+            appTable: (tuple) application and table name, or None if the file is not a datapack table
+
+    """
+    app, _, table = os.path.basename(fileName).partition("_")
+    if app in DATAPACK_APPS and table in DATAPACK_TABLES:
+        return app, table
+    return None
+
+
+def loadDirectory(directory):
+    """Loads every datapack file in a directory (see loadDatapack).
+
+    Input:
+            directory: (string) directory holding {app}_{table} datapack files
+
+    Output:
+            rowCounts: (dictionary) app name to the rowCounts of loadDatapack
+
+    """
+    rowCounts = {}
+    for app, appFiles in datapackFiles(directory).items():
+        csvFiles = OrderedDict((table, open(path, "rb")) for table, path in appFiles.items())
+        try:
+            rowCounts[app] = loadDatapack(app, csvFiles)
+        finally:
+            for csvFile in csvFiles.values():
+                csvFile.close()
+    return rowCounts
+
+
+def loadDatapack(app, csvFiles):
+    """Loads the datapack files of one application into its live tables.
+
+    Input:
+            app: (string) application name
+            csvFiles: (dictionary) table name (such as 'point_paths') to a binary file object of
+                    the table's datapack CSV
+
+    Output:
+            rowCounts: (dictionary) table name to the number of rows inserted
+
+    Nothing is inserted if any table fails to load. The touched tables are analyzed afterwards.
+
+    """
+    runId = utility.randId(8).lower()
+    stagedTables = OrderedDict()
+    try:
+        for table in DATAPACK_TABLES:
+            if table in csvFiles:
+                stagedTables[table], _ = stageTable(app, table, csvFiles[table], runId)
+
+        with transaction.atomic():
+            rowCounts = insertStaged(app, stagedTables)
+
+    finally:
+        dropStaged(stagedTables.values())
+
+    analyzeTables(app, [table for table, rowCount in rowCounts.items() if rowCount])
+
+    return rowCounts
+
+
+def stageTarball(path, progress=None):
+    """Streams the members of a datapack tarball into staging tables (see stageTable).
+
+    Input:
+            path: (string) path of a datapack .tar.gz
+            progress: (function) called with (app, table, rowCount) after each member is staged
+
+    Output:
+            stagedTables: (dictionary) app name to an ordered dictionary of table name to staging
+                    table name (in DATAPACK_TABLES order)
+
+    The tarball is read once from start to end and its members are never extracted to disk.
+    Members that are not datapack tables are skipped. If staging fails, the staging tables
+    made so far are dropped.
+
+    """
+    runId = utility.randId(8).lower()
+    stagedTables = {}
+    try:
+        with tarfile.open(path, "r|gz") as tarball:
+            for member in tarball:
+                appTable = datapackMember(member.name) if member.isfile() else None
+                if appTable is None:
+                    continue
+                app, table = appTable
+                stagingTable, rowCount = stageTable(app, table, tarball.extractfile(member), runId)
+                stagedTables.setdefault(app, {})[table] = stagingTable
+                if progress is not None:
+                    progress(app, table, rowCount)
+    except Exception:
+        dropStaged(stagingTable for appTables in stagedTables.values() for stagingTable in appTables.values())
+        raise
+
+    return {
+        app: OrderedDict((table, appTables[table]) for table in DATAPACK_TABLES if table in appTables)
+        for app, appTables in stagedTables.items()
+    }
+
+
+def stageTable(app, table, csvFile, runId):
+    """COPYs a datapack file into a new UNLOGGED staging table shaped like the live table.
+
+    Input:
+            app: (string) application name
+            table: (string) table name (such as 'point_paths')
+            csvFile: (object) binary file object of the table's datapack CSV
+            runId: (string) id shared by the staging tables of one load
+
+    Output:
+            stagingTable: (string) name of the staging table
+            rowCount: (integer) number of rows staged
+
+    Files from older versions of OPS hold fewer columns than the live table; the missing
+    trailing columns are left NULL (see LEGACY_DEFAULTS).
+
+    """
+    stagingTable = "datapack_%s_%s_%s" % (runId, app, table)
+    liveColumns = tableColumns(app + "_" + table)
+
+    # the first line tells how many of the live columns the file holds
+    firstLine = csvFile.readline()
+    columnCount = len(next(csv.reader([firstLine.decode()]), []))
+    if columnCount > len(liveColumns):
+        raise Exception(
+            "DATAPACK FILE %s_%s HAS %d COLUMNS, EXPECTED AT MOST %d."
+            % (app, table, columnCount, len(liveColumns))
+        )
+
+    rowCount = 0
+    with connection.cursor() as cursor:
+        # no constraints, indexes or WAL on the staging table
+        cursor.execute(
+            "CREATE UNLOGGED TABLE %s AS SELECT * FROM %s_%s WITH NO DATA;" % (stagingTable, app, table)
+        )
+        if columnCount:
+            chunks = itertools.chain([firstLine], iter(lambda: csvFile.read(COPY_CHUNK_SIZE), b""))
+            cursor.copy_expert(
+                "COPY %s (%s) FROM STDIN WITH CSV;" % (stagingTable, ", ".join(liveColumns[:columnCount])),
+                pgcopy.CopyStream(chunks),
+            )
+            rowCount = cursor.rowcount
+        logging.info("Staged %d rows of %s_%s from the datapack.", rowCount, app, table)
+
+    return stagingTable, rowCount
+
+
+def dropStaged(stagingTables):
+    """Drops staging tables made by stageTable.
+
+    Input:
+            stagingTables: (list) names of the staging tables
+
+    """
+    with connection.cursor() as cursor:
+        for stagingTable in stagingTables:
+            cursor.execute("DROP TABLE IF EXISTS %s;" % stagingTable)
+
+
+def analyzeTables(app, tables):
+    """Analyzes the live tables a datapack was loaded into.
+
+    Input:
+            app: (string) application name
+            tables: (list) table names (such as 'point_paths')
+
+    """
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute("ANALYZE %s_%s;" % (app, table))
+
+
+def insertStaged(app, stagedTables):
+    """Inserts staged datapack rows into the live tables with new ids (run in a transaction).
+
+    Input:
+            app: (string) application name
+            stagedTables: (dictionary) table name to staging table name (in DATAPACK_TABLES order)
+
+    Output:
+            rowCounts: (dictionary) table name to the number of rows inserted
+
+    The live tables are locked against concurrent writes while their ids are assigned.
+
+    """
+    rowCounts = OrderedDict()
+    idMaps = {}  # lookup table -> temporary table of (old_id, live_id, new_id)
+    idOffsets = {}  # other tables -> number added to their staged ids
+    fallbackUserId = User.objects.order_by("-is_superuser", "pk").values_list("pk", flat=True).first()
+
+    with connection.cursor() as cursor:
+        for table, stagingTable in stagedTables.items():
+            liveTable = app + "_" + table
+            cursor.execute("LOCK TABLE %s IN SHARE ROW EXCLUSIVE MODE;" % liveTable)
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id');", [liveTable])
+            sequence = cursor.fetchone()[0]
+
+            columnExprs, joins = _columnExpressions(
+                app, table, idMaps, idOffsets, fallbackUserId
+            )
+
+            if table in NATURAL_KEYS:
+                # map every staged row to the live row with the same natural key or a new id
+                mapTable = stagingTable + "_ids"
+                keyMatch = " AND ".join(
+                    "l.%s = %s" % (column, columnExprs[column]) for column in NATURAL_KEYS[table]
+                )
+                cursor.execute(
+                    "CREATE TEMP TABLE {map} ON COMMIT DROP AS "
+                    "SELECT old_id, live_id, COALESCE(live_id, nextval('{seq}')) AS new_id FROM "
+                    "(SELECT DISTINCT ON (s.id) s.id AS old_id, l.id AS live_id "
+                    "FROM {staging} s {joins} LEFT JOIN {live} l ON {match} ORDER BY s.id, l.id) matched;".format(
+                        map=mapTable, seq=sequence, staging=stagingTable, joins=joins,
+                        live=liveTable, match=keyMatch)
+                )
+                idMaps[table] = mapTable
+                columnExprs["id"] = "m.new_id"
+                joins = "JOIN %s m ON m.old_id = s.id %s" % (mapTable, joins)
+                where = "WHERE m.live_id IS NULL"
+
+            else:
+                # shift the staged ids past both the live ids and the sequence
+                cursor.execute(
+                    "SELECT GREATEST((SELECT COALESCE(MAX(id), 0) FROM {live}), (SELECT last_value FROM {seq})) "
+                    "+ 1 - MIN(id) FROM {staging};".format(live=liveTable, seq=sequence, staging=stagingTable)
+                )
+                idOffsets[table] = cursor.fetchone()[0] or 0
+                columnExprs["id"] = "s.id + %d" % idOffsets[table]
+                where = ""
+
+            if table == "segments":
+                _checkSegments(cursor, app, stagingTable, columnExprs, joins)
+
+            columns = list(columnExprs)
+            cursor.execute(
+                "INSERT INTO {live} ({columns}) SELECT {exprs} FROM {staging} s {joins} {where};".format(
+                    live=liveTable, columns=", ".join(columns),
+                    exprs=", ".join(columnExprs[column] for column in columns),
+                    staging=stagingTable, joins=joins, where=where)
+            )
+            rowCounts[table] = cursor.rowcount
+            cursor.execute(
+                "SELECT setval('{seq}', GREATEST((SELECT MAX(id) FROM {live}), (SELECT last_value FROM {seq})));".format(
+                    seq=sequence, live=liveTable)
+            )
+            logging.info("Inserted %d rows into %s from the datapack.", rowCounts[table], liveTable)
+
+        # summarize the loaded frames (old datapacks have no frame summaries)
+        if "frames" in idOffsets and "point_paths" in stagedTables:
+            cursor.execute(
+                "SELECT MIN(id) + %s, MAX(id) + %s FROM %s;"
+                % (idOffsets["frames"], idOffsets["frames"], stagedTables["frames"])
+            )
+            cursor.execute(FRAME_SUMMARY_SQL.format(app=app), list(cursor.fetchone()))
+
+        # store the projected geometries of the loaded segments and point paths (old datapacks have none)
+        if "segments" in idOffsets:
+            cursor.execute(
+                "SELECT id + %s FROM %s WHERE geom_proj IS NULL;"
+                % (idOffsets["segments"], stagedTables["segments"])
+            )
+            utility.updateSegmentProjection(app, [row[0] for row in cursor.fetchall()])
+        if "point_paths" in idOffsets:
+            cursor.execute(
+                "SELECT MIN(id) + %s, MAX(id) + %s FROM %s;"
+                % (idOffsets["point_paths"], idOffsets["point_paths"], stagedTables["point_paths"])
+            )
+            cursor.execute(utility.POINT_PATH_PROJECTION_SQL.format(app=app), list(cursor.fetchone()))
+
+    return rowCounts
+
+
+def _columnExpressions(app, table, idMaps, idOffsets, fallbackUserId):
+    """Builds the SELECT expression of every live column of a table from its staging table 's'.
+
+    Output:
+            columnExprs: (ordered dictionary) live column name to SQL expression
+            joins: (string) LEFT JOINs of the id maps used by the expressions
+
+    """
+    model = apps.get_model(app, table)
+    foreignKeys = {
+        field.column: field.related_model for field in model._meta.concrete_fields if field.many_to_one
+    }
+    legacyDefaults = LEGACY_DEFAULTS.get(table, {})
+
+    columnExprs = OrderedDict()
+    joins = []
+    for column in tableColumns(app + "_" + table):
+        relatedModel = foreignKeys.get(column)
+        relatedTable = relatedModel._meta.model_name if relatedModel is not None else None
+        if relatedModel is not None and relatedModel._meta.app_label == app and relatedTable in idMaps:
+            alias = "j%d" % len(joins)
+            joins.append("LEFT JOIN %s %s ON %s.old_id = s.%s" % (idMaps[relatedTable], alias, alias, column))
+            columnExprs[column] = "COALESCE(%s.new_id, s.%s)" % (alias, column)
+        elif relatedModel is not None and relatedModel._meta.app_label == app and relatedTable in idOffsets:
+            columnExprs[column] = "s.%s + %d" % (column, idOffsets[relatedTable])
+        elif relatedModel is User and fallbackUserId is not None:
+            # picks by users unknown to this server are credited to its first (super) user
+            alias = "j%d" % len(joins)
+            joins.append("LEFT JOIN auth_user %s ON %s.id = s.%s" % (alias, alias, column))
+            columnExprs[column] = "COALESCE(%s.id, %d)" % (alias, fallbackUserId)
+        elif column in legacyDefaults:
+            columnExprs[column] = "COALESCE(s.%s, %s)" % (column, legacyDefaults[column])
+        else:
+            columnExprs[column] = "s.%s" % column
+
+    return columnExprs, " ".join(joins)
+
+
+def _checkSegments(cursor, app, stagingTable, columnExprs, joins):
+    """Raises an exception if a staged segment is already loaded."""
+    keyMatch = " AND ".join("l.%s = %s" % (column, columnExprs[column]) for column in SEGMENT_KEY)
+    cursor.execute(
+        "SELECT s.name FROM {staging} s {joins} JOIN {app}_segments l ON {match} LIMIT 20;".format(
+            staging=stagingTable, joins=joins, app=app, match=keyMatch)
+    )
+    loadedSegments = [row[0] for row in cursor.fetchall()]
+    if loadedSegments:
+        raise Exception("DATAPACK SEGMENTS ARE ALREADY LOADED: %s" % ", ".join(loadedSegments))
+
+
+def tableColumns(table):
+    """Gets the column names of a table in their database order (the order of a datapack CSV)."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT * FROM %s LIMIT 0;" % table)
+        return [column[0] for column in cursor.description]
@@ -0,0 +1,258 @@
+"""Database maintenance triggered by OPS write requests.
+
+Write views report how many rows they changed in each table. Once the rows changed in a table
+since its last ANALYZE pass settings.OPS_ANALYZE_ROW_THRESHOLD, an ANALYZE of only that table
+is queued. The queue is worked by a background thread after the request's transaction commits,
+so the planner statistics of {app}_point_paths and {app}_layer_points follow a season load
+without a full vacuumAnalyze.sh and without slowing the request.
+
+Bulk loads of a whole season can instead defer the indexes of the large tables: the
+non-essential indexes are dropped before the load and rebuilt (concurrently where possible)
+and analyzed after it (see deferIndexes, and createPathBatch and the load_datapacks command).
+The rebuild never depends on the background thread: a request rebuilds its indexes in its own
+transaction before it returns.
+
+"""
+import contextlib
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+import ops.utility as utility
+
+# Default number of changed rows after which a table is analyzed (override with
+# OPS_ANALYZE_ROW_THRESHOLD, 0 or None turns the automatic ANALYZE off).
+ANALYZE_ROW_THRESHOLD = 50000
+
+# Tables whose non-essential indexes are dropped during deferred index bulk loads.
+DEFERRED_INDEX_TABLES = ("point_paths", "layer_points", "crossovers")
+
+# Indexes that can be dropped during a bulk load (everything but primary keys, unique indexes and
+# indexes backing a constraint): the gps_time, key_point and foreign key indexes and the GIST
+# index of the projected point path geometries.
+DEFERRABLE_INDEXES_SQL = """
+SELECT i.relname, pg_get_indexdef(x.indexrelid)
+FROM   pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+WHERE  x.indrelid = %s::regclass AND NOT x.indisprimary AND NOT x.indisunique
+       AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+ORDER BY i.relname;
+"""
+
+_rowsChanged = {}
+_pending = set()
+_queue = queue.Queue()
+_lock = threading.Lock()
+_worker = None
+
+
+def _resetAfterFork():
+    """Starts a forked child with its own empty queue (the parent's thread does not exist in it)."""
+    global _queue, _lock, _worker
+    _rowsChanged.clear()
+    _pending.clear()
+    _queue = queue.Queue()
+    _lock = threading.Lock()
+    _worker = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_resetAfterFork)
+
+
+def recordRowsChanged(table, rowCount):
+    """Counts rows changed in a table and queues an ANALYZE once the threshold is reached.
+
+    Input:
+            table: (string) name of the database table (such as rds_point_paths)
+            rowCount: (integer) number of rows inserted, updated or deleted
+
+    The ANALYZE is queued when the current transaction commits (and never if it rolls back).
+
+    """
+    threshold = getattr(settings, "OPS_ANALYZE_ROW_THRESHOLD", ANALYZE_ROW_THRESHOLD)
+    if not threshold or not rowCount:
+        return
+
+    with _lock:
+        rowsChanged = _rowsChanged.get(table, 0) + int(rowCount)
+        if rowsChanged < threshold:
+            _rowsChanged[table] = rowsChanged
+            return
+        _rowsChanged[table] = 0
+
+    transaction.on_commit(lambda: queueAnalyze(table))
+
+
+def recordDeleted(deleteCounts):
+    """Counts the rows removed by QuerySet.delete() (including cascades) per table.
+
+    Input:
+            deleteCounts: (dictionary) model label (such as 'rds.layer_points') to number of
+                    deleted rows, as returned by QuerySet.delete()
+
+    """
+    for modelLabel, rowCount in deleteCounts.items():
+        recordRowsChanged(apps.get_model(modelLabel)._meta.db_table, rowCount)
+
+
+def queueAnalyze(table):
+    """Queues an ANALYZE of a table unless one is already waiting to run.
+
+    Input:
+            table: (string) name of the database table
+
+    """
+    with _lock:
+        if table in _pending:
+            return
+        _pending.add(table)
+        _queue.put(table)
+        _startWorker()
+
+
+def _startWorker():
+    """Starts the background thread if it is not running (call with _lock held)."""
+    global _worker
+    if _worker is None:
+        _worker = threading.Thread(target=_analyzeTables, name="opsAnalyze", daemon=True)
+        _worker.start()
+
+
+def _analyzeTables():
+    """Runs the queued ANALYZE commands one at a time (on the worker thread's own connection)."""
+    global _worker
+    try:
+        while True:
+            try:
+                table = _queue.get(timeout=60)
+            except queue.Empty:
+                # stop when idle (checked under the lock so a newly queued table starts a new worker)
+                with _lock:
+                    if _queue.empty():
+                        _worker = None
+                        return
+                continue
+            # rows changed from here on need another ANALYZE, so allow the table to be queued again
+            with _lock:
+                _pending.discard(table)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE " + connection.ops.quote_name(table))
+                logging.info("ANALYZE of %s completed.", table)
+            except Exception as e:
+                logging.warning("ANALYZE of %s failed: %s", table, e)
+    finally:
+        connection.close()
+
+
+def dropIndexes(app, tables=DEFERRED_INDEX_TABLES):
+    """Drops the non-essential indexes of an application's tables ahead of a bulk load.
+
+    Input:
+            app: (string) application name
+            tables: (list) table names (such as 'point_paths')
+
+    Output:
+            indexes: (ordered dictionary) index name to a tuple of (table name, CREATE INDEX
+                    statement) for rebuildIndexes
+
+    Inside a transaction the indexes come back if it rolls back. The statements are also logged
+    so the indexes can be recreated by hand if the rebuild never runs.
+
+    """
+    indexes = OrderedDict()
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(DEFERRABLE_INDEXES_SQL, [app + "_" + table])
+            for indexName, definition in cursor.fetchall():
+                indexes[indexName] = (table, definition)
+        for indexName, (table, definition) in indexes.items():
+            logging.warning("Dropping index %s for a bulk load: %s;", indexName, definition)
+            cursor.execute("DROP INDEX %s;" % connection.ops.quote_name(indexName))
+    return indexes
+
+
+def rebuildIndexes(indexes, timer=None):
+    """Recreates the indexes dropped by dropIndexes.
+
+    Input:
+            indexes: (ordered dictionary) output of dropIndexes
+            timer: (object) utility.PhaseTimer recording the build of each index
+
+    Output:
+            failed: (list) names of the indexes that could not be rebuilt (logged with their statements)
+
+    Outside a transaction the indexes are built CONCURRENTLY, so the tables stay writable. An index
+    whose concurrent build fails is dropped (it would be left invalid) and built again normally.
+
+    """
+    timer = timer or utility.PhaseTimer("rebuildIndexes")
+    concurrently = not connection.in_atomic_block
+    failed = []
+    with connection.cursor() as cursor:
+        for indexName, (table, definition) in indexes.items():
+            statement = definition.replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1)
+            with timer.phase(("index " + indexName)[:50]):
+                try:
+                    if not concurrently:
+                        cursor.execute(statement)
+                        continue
+                    try:
+                        cursor.execute(statement.replace("CREATE INDEX ", "CREATE INDEX CONCURRENTLY ", 1))
+                    except Exception as e:
+                        logging.warning("Concurrent build of index %s failed, building it normally: %s", indexName, e)
+                        cursor.execute("DROP INDEX IF EXISTS %s;" % connection.ops.quote_name(indexName))
+                        cursor.execute(statement)
+                except Exception as e:
+                    logging.error("Index %s could not be rebuilt (%s): %s;", indexName, e, definition)
+                    failed.append(indexName)
+    return failed
+
+
+@contextlib.contextmanager
+def deferIndexes(app, tables=DEFERRED_INDEX_TABLES, timer=None):
+    """Drops the non-essential indexes of tables for the body of a with block (in a transaction).
+
+    Input:
+            app: (string) application name
+            tables: (list) table names (such as 'point_paths'); none leaves the indexes alone
+            timer: (object) utility.PhaseTimer recording the drop, the build of each index and the
+                    ANALYZE of the tables
+
+    Example:
+            with transaction.atomic(), maintenance.deferIndexes(app, ("point_paths",), timer):
+                    ...
+
+    The indexes are rebuilt and the tables analyzed at the end of the block, inside the same
+    transaction, so the dropped indexes are never committed. If the block raises or an index
+    cannot be rebuilt, the transaction is marked for rollback (which restores the indexes). The
+    tables are locked until the transaction ends, so only use this for loads large enough to be
+    worth it.
+
+    """
+    if not tables:
+        yield {}
+        return
+    if not connection.in_atomic_block:
+        raise Exception("deferIndexes() MUST RUN IN A TRANSACTION.")
+    timer = timer or utility.PhaseTimer("rebuildIndexes")
+    with timer.phase("drop_indexes"):
+        indexes = dropIndexes(app, tables)
+    try:
+        yield indexes
+    except Exception:
+        # the rollback brings the dropped indexes back
+        transaction.set_rollback(True)
+        raise
+    failed = rebuildIndexes(indexes, timer)
+    if failed:
+        transaction.set_rollback(True)
+        raise Exception("deferIndexes() COULD NOT REBUILD INDEXES %s." % ", ".join(failed))
+    with timer.phase("analyze"):
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute("ANALYZE %s_%s;" % (app, table))
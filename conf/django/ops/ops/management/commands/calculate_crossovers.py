@@ -0,0 +1,83 @@
+"""Calculates the crossovers of segments, spread over worker processes.
+
+Example:
+        python manage.py calculate_crossovers rds 1201 1202 1203
+        python manage.py calculate_crossovers rds --season 2011_Greenland_P3 --workers 8
+        python manage.py calculate_crossovers snow --season 2012_Greenland_P3 --engine strtree
+
+The segments are calculated as by the crossoverCalculation view (see views._calculateCrossovers),
+but the batch may be spread over forked worker processes, each with its own database connection.
+Forking is only safe from a command like this one, never from inside a web request. The crossovers
+table is analyzed once the batch is done.
+
+"""
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+import ops.datapack as datapack
+import ops.crossovers as crossovers
+import ops.utility as utility
+import ops.views as views
+
+
+class Command(BaseCommand):
+    help = "Calculates the crossovers of segments over a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("app", help="application name (rds, accum, snow or kuband)")
+        parser.add_argument("segments", nargs="*", type=int, help="ids of the segments to calculate")
+        parser.add_argument(
+            "--season",
+            action="append",
+            default=[],
+            help="also calculate the segments of this season whose crossovers are not calculated yet "
+            "(may be repeated)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help="number of worker processes the segments are spread over",
+        )
+        parser.add_argument(
+            "--engine",
+            default=getattr(settings, "OPS_CROSSOVER_ENGINE", "sql"),
+            help="crossover engine (%s)" % ", ".join(sorted(crossovers.CROSSOVER_ENGINES)),
+        )
+
+    def handle(self, *args, **options):
+        start = time.time()
+        app = options["app"]
+        engine = options["engine"]
+        if engine not in crossovers.CROSSOVER_ENGINES:
+            raise CommandError("UNKNOWN CROSSOVER ENGINE %s." % engine)
+        models = utility.getAppModels(app)
+
+        segments = list(options["segments"])
+        for season in options["season"]:
+            seasonSegments = models.segments.objects.filter(season__name=season, crossover_calc=False)
+            segments.extend(seasonSegments.order_by("id").values_list("id", flat=True))
+        segments = list(dict.fromkeys(segments))
+        if not segments:
+            raise CommandError("NO SEGMENTS TO CALCULATE.")
+
+        workers = max(1, options["workers"])
+        self.stdout.write("Calculating the crossovers of %d segments of %s with %d workers." % (len(segments), app, workers))
+        outStatus, outCrossovers, outMessages = views._calculateCrossovers(app, segments, engine, workers)
+
+        if sum(outCrossovers):
+            datapack.analyzeTables(app, ["crossovers"])
+        self.stdout.write(
+            "%d crossovers inserted for %d segments in %.1f s."
+            % (sum(outCrossovers), outStatus.count(1), time.time() - start)
+        )
+
+        errors = [
+            "segment %d: %s" % (segment_id, message)
+            for segment_id, status, message in zip(segments, outStatus, outMessages)
+            if not status
+        ]
+        if errors:
+            raise CommandError("CROSSOVER CALCULATION FAILED FOR %d OF %d SEGMENTS.\n" % (len(errors), len(segments))
+                               + "\n".join(errors))
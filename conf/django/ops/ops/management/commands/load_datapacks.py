@@ -0,0 +1,231 @@
+"""Loads OPS datapack tarballs into the database in parallel.
+
+Example:
+        python manage.py load_datapacks /opt/ops/data/postgresql/
+        python manage.py load_datapacks --workers 8 --dry-run OPS_CReSIS_RDS_DATAPACK_1.tar.gz
+        python manage.py load_datapacks --defer-indexes /opt/ops/data/postgresql/
+
+Each tarball is streamed straight into UNLOGGED staging tables (see ops/datapack.py), with the
+tarballs staged in parallel over a pool of database connections. The staged packs are then
+inserted into the live tables: the tables of a pack in foreign key order in one transaction,
+the packs of an application one after another, and different applications in parallel.
+
+With --defer-indexes the non-essential indexes of the large tables are dropped before the inserts
+and rebuilt concurrently afterwards (see maintenance.dropIndexes). The timings of each step are
+saved to the ingest_stats table of each application.
+
+"""
+import glob
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+import ops.datapack as datapack
+import ops.maintenance as maintenance
+import ops.utility as utility
+
+
+class Command(BaseCommand):
+    help = "Loads OPS datapack tarballs (.tar.gz) into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "packs", nargs="+", help="datapack tarballs or directories holding *.tar.gz datapacks"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help="number of packs (or applications) loaded at the same time, each over its own connection",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="stage the packs and report the rows that would be inserted, then roll back",
+        )
+        parser.add_argument(
+            "--defer-indexes",
+            action="store_true",
+            help="drop the non-essential point path, layer point and crossover indexes during the "
+            "load and rebuild them afterwards",
+        )
+
+    def handle(self, *args, **options):
+        self.start = time.time()
+        self.lock = threading.Lock()
+        workers = max(1, options["workers"])
+        dryRun = options["dry_run"]
+        deferIndexes = options["defer_indexes"]
+        if dryRun and deferIndexes:
+            raise CommandError("--defer-indexes CANNOT BE USED WITH --dry-run.")
+
+        packs = findPacks(options["packs"])
+        if not packs:
+            raise CommandError("NO DATAPACKS FOUND IN %s." % ", ".join(options["packs"]))
+        self.progress("Loading %d datapacks with %d workers%s." % (len(packs), workers, " (dry run)" if dryRun else ""))
+
+        # stage every pack (any failure stops the load before anything is inserted)
+        stagedPacks = OrderedDict()
+        errors = []
+        for pack, stagedTables, error in self.runPool(workers, self.stagePack, packs):
+            if error is None:
+                stagedPacks[pack] = stagedTables
+            else:
+                errors.append("%s: %s" % (os.path.basename(pack), error))
+        if errors:
+            for stagedTables in stagedPacks.values():
+                for appTables in stagedTables.values():
+                    datapack.dropStaged(appTables.values())
+            raise CommandError("DATAPACK STAGING FAILED, NOTHING WAS LOADED.\n" + "\n".join(errors))
+
+        # insert the packs of each application in order (applications in parallel)
+        appPacks = OrderedDict()
+        for pack, stagedTables in stagedPacks.items():
+            for app, appTables in stagedTables.items():
+                appPacks.setdefault(app, []).append((pack, appTables))
+
+        totals = Counter()
+        for app, result, error in self.runPool(
+            workers, lambda app: self.insertApp(app, appPacks[app], dryRun, deferIndexes), list(appPacks)
+        ):
+            rowCounts, appErrors = result if error is None else (Counter(), [str(error)])
+            totals.update({app + "_" + table: rowCount for table, rowCount in rowCounts.items()})
+            errors.extend("%s: %s" % (app, appError) for appError in appErrors)
+
+        for table in sorted(totals):
+            self.stdout.write("%-26s %12d rows %s" % (table, totals[table], "would be inserted" if dryRun else "inserted"))
+        self.progress("Datapack load %s." % ("dry run completed" if dryRun else "completed"))
+
+        if errors:
+            raise CommandError("SOME DATAPACKS FAILED TO LOAD.\n" + "\n".join(errors))
+
+    def runPool(self, workers, function, items):
+        """Calls a function on every item over a pool of threads (each with its own connection).
+
+        Input:
+                workers: (integer) number of threads (1 runs the items on this thread)
+                function: (function) called with one item
+                items: (list) items to call the function with
+
+        Output:
+                results: (list) tuples of (item, result, exception) in the order of the items
+
+        """
+
+        def call(item):
+            try:
+                return item, function(item), None
+            except Exception as e:
+                return item, None, e
+            finally:
+                if workers > 1:
+                    connection.close()
+
+        if workers == 1:
+            return [call(item) for item in items]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(call, items))
+
+    def stagePack(self, pack):
+        """Stages a datapack tarball (see datapack.stageTarball) and reports each member."""
+        packName = os.path.basename(pack)
+        self.progress("Staging %s (%.1f MB)." % (packName, os.path.getsize(pack) / 1e6))
+
+        def progress(app, table, rowCount):
+            self.progress("Staged %d rows of %s_%s from %s." % (rowCount, app, table, packName))
+
+        return datapack.stageTarball(pack, progress)
+
+    def insertApp(self, app, packs, dryRun, deferIndexes):
+        """Inserts the staged packs of an application one after another.
+
+        Input:
+                app: (string) application name
+                packs: (list) tuples of (pack path, ordered dictionary of table to staging table)
+                dryRun: (boolean) roll back each pack after inserting it
+                deferIndexes: (boolean) drop the non-essential indexes during the inserts
+
+        Output:
+                rowCounts: (Counter) table name to the number of rows inserted
+                errors: (list) messages of the packs that failed to insert (and were rolled back)
+
+        """
+        timer = utility.PhaseTimer("load_datapacks")
+        rowCounts = Counter()
+        errors = []
+        indexes = {}
+        try:
+            if deferIndexes:
+                with timer.phase("drop_indexes"):
+                    indexes = maintenance.dropIndexes(app)
+                self.progress("Dropped %d indexes of %s." % (len(indexes), app))
+
+            for pack, stagedTables in packs:
+                packName = os.path.basename(pack)
+                insertStart = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        packCounts = datapack.insertStaged(app, stagedTables)
+                        if dryRun:
+                            transaction.set_rollback(True)
+                    timer.add("insert", time.perf_counter() - insertStart, sum(packCounts.values()))
+                    rowCounts.update(packCounts)
+                    self.progress(
+                        "%s %d rows of %s from %s."
+                        % ("Checked" if dryRun else "Inserted", sum(packCounts.values()), app, packName)
+                    )
+                except Exception as e:
+                    errors.append("%s: %s" % (packName, e))
+                    self.progress("Failed to insert %s from %s: %s" % (app, packName, e))
+                finally:
+                    datapack.dropStaged(stagedTables.values())
+
+        finally:
+            # the indexes are rebuilt even if the inserts fail
+            if indexes:
+                self.progress("Rebuilding %d indexes of %s." % (len(indexes), app))
+                failed = maintenance.rebuildIndexes(indexes, timer)
+                errors.extend("index %s could not be rebuilt (see the log)" % indexName for indexName in failed)
+
+        if not dryRun:
+            # rebuilt expression indexes need statistics of their own
+            analyzeTables = [table for table, rowCount in rowCounts.items() if rowCount]
+            if indexes:
+                analyzeTables.extend(set(table for table, _ in indexes.values()) - set(analyzeTables))
+            with timer.phase("analyze"):
+                datapack.analyzeTables(app, analyzeTables)
+            timer.save(utility.getAppModels(app))
+            self.progress(
+                "%s timings: %s."
+                % (app, ", ".join("%s %.1f s" % (name, duration) for name, (duration, _) in timer.phases.items()))
+            )
+        return rowCounts, errors
+
+    def progress(self, message):
+        """Writes a progress message with the time since the command started."""
+        with self.lock:
+            self.stdout.write("[%8.1f s] %s" % (time.time() - self.start, message))
+
+
+def findPacks(paths):
+    """Gets the datapack tarballs of files and directories (directories give their *.tar.gz files).
+
+    Input:
+            paths: (list) paths of tarballs or directories
+
+    Output:
+            packs: (list) paths of the datapack tarballs, largest first (so the pool finishes sooner)
+
+    """
+    packs = []
+    for path in paths:
+        if os.path.isdir(path):
+            packs.extend(glob.glob(os.path.join(path, "*.tar.gz")))
+        elif os.path.isfile(path):
+            packs.append(path)
+        else:
+            raise CommandError("DATAPACK %s DOES NOT EXIST." % path)
+    return sorted(set(packs), key=lambda pack: (-os.path.getsize(pack), pack))
@@ -0,0 +1,100 @@
+"""Django middleware for OPS requests.
+
+RequestDecompressionMiddleware lets clients POST compressed request bodies (for example
+large create/path or create/layer/points uploads from MATLAB over slow links).
+
+"""
+import gzip
+import tempfile
+import zlib
+from django.conf import settings
+import ops.utility as utility
+
+# zstd support is optional (pip install zstandard)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Bytes of decompressed body produced per read.
+DECOMPRESS_CHUNK_SIZE = 1024 * 1024
+
+# Decompressed bodies larger than this are spooled to a temporary file instead of memory.
+DECOMPRESS_SPOOL_SIZE = 16 * 1024 * 1024
+
+# Default cap on the decompressed body size (override with OPS_MAX_DECOMPRESSED_BODY_SIZE).
+MAX_DECOMPRESSED_BODY_SIZE = 1024 * 1024 * 1024
+
+
+class RequestDecompressionMiddleware(object):
+    """Decompresses request bodies sent with a Content-Encoding of gzip (or zstd).
+
+    The body is decompressed one chunk at a time into a spooled temporary file, which then
+    replaces the request stream so that request.POST and request.FILES parse the plain body.
+    Bodies that decompress past settings.OPS_MAX_DECOMPRESSED_BODY_SIZE are rejected (413)
+    before they can exhaust the worker's memory or disk.
+
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+        if encoding and encoding != "identity":
+            errorResponse = self.decompressBody(request, encoding)
+            if errorResponse is not None:
+                return errorResponse
+        return self.get_response(request)
+
+    def decompressBody(self, request, encoding):
+        """Replaces the request stream with the decompressed body.
+
+        Input:
+                request: (object) HTTPRequest object.
+                encoding: (string) lower case Content-Encoding of the request
+
+        Output:
+                errorResponse: (object) HttpResponse for an invalid body, or None on success
+
+        """
+        if encoding in ("gzip", "x-gzip"):
+            reader = gzip.GzipFile(fileobj=request._stream, mode="rb")
+            readErrors = (OSError, EOFError, zlib.error)
+        elif encoding == "zstd" and zstandard is not None:
+            reader = zstandard.ZstdDecompressor().stream_reader(request._stream, read_across_frames=True)
+            readErrors = (zstandard.ZstdError,)
+        else:
+            return _errorResponse(415, "ERROR: UNSUPPORTED CONTENT-ENCODING " + encoding.upper() + ".")
+
+        maxSize = getattr(settings, "OPS_MAX_DECOMPRESSED_BODY_SIZE", MAX_DECOMPRESSED_BODY_SIZE)
+        body = tempfile.SpooledTemporaryFile(max_size=DECOMPRESS_SPOOL_SIZE)
+        bodySize = 0
+        try:
+            while True:
+                chunk = reader.read(DECOMPRESS_CHUNK_SIZE)
+                if not chunk:
+                    break
+                bodySize += len(chunk)
+                if bodySize > maxSize:
+                    body.close()
+                    return _errorResponse(
+                        413, "ERROR: DECOMPRESSED REQUEST BODY EXCEEDS %d BYTES." % maxSize
+                    )
+                body.write(chunk)
+        except readErrors:
+            body.close()
+            return _errorResponse(400, "ERROR: COULD NOT DECOMPRESS " + encoding.upper() + " REQUEST BODY.")
+
+        body.seek(0)
+        request._stream = body
+        request.META["CONTENT_LENGTH"] = str(bodySize)
+        del request.META["HTTP_CONTENT_ENCODING"]
+        return None
+
+
+def _errorResponse(statusCode, message):
+    """Creates an OPS formatted error response with the given HTTP status code."""
+    outResponse = utility.response(0, message, {})
+    outResponse.status_code = statusCode
+    return outResponse
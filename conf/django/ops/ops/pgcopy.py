@@ -0,0 +1,448 @@
+"""Helpers for streaming rows into PostgreSQL with COPY ... FROM STDIN.
+
+Rows are encoded in chunks and fed straight to the database cursor so that bulk loads
+never touch the local disk and work against a database on another host.
+
+Two encodings are available: the COPY text format (copyText) and the PGCOPY binary
+format (copyBinary). The binary writer packs whole columns with NumPy so that no value
+is formatted as text for PostgreSQL to parse back.
+
+"""
+import struct
+import numpy as np
+
+# Number of rows encoded per chunk handed to the cursor.
+COPY_CHUNK_ROWS = 10000
+
+# PGCOPY binary signature, flags and header extension length, and the file trailer.
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PGCOPY_TRAILER = struct.pack(">h", -1)
+
+# Decimal places of the numeric point_paths columns (see point_paths in models.py).
+GPS_TIME_SCALE = 6
+ATTITUDE_SCALE = 5
+
+# Decimal places of the crossovers angle column (see crossovers in models.py).
+ANGLE_SCALE = 3
+
+# EWKB geometry types of a POINT and POINT Z with an embedded SRID (wkbPoint | [wkbZ] | wkbSRID).
+EWKB_POINT_SRID = 0x20000001
+EWKB_POINT_Z_SRID = 0xA0000001
+EWKB_LINESTRING_SRID = 0x20000002
+
+# Little-endian EWKB layouts of a POINT and POINT Z with an embedded SRID.
+EWKB_POINT_DTYPE = np.dtype(
+    [("byteOrder", "u1"), ("wkbType", "<u4"), ("srid", "<u4"), ("x", "<f8"), ("y", "<f8")]
+)
+EWKB_POINT_Z_DTYPE = np.dtype(
+    [("byteOrder", "u1"), ("wkbType", "<u4"), ("srid", "<u4"), ("x", "<f8"), ("y", "<f8"), ("z", "<f8")]
+)
+
+# Columns written by createPath, in COPY order.
+POINT_PATH_COLUMNS = (
+    "location_id",
+    "season_id",
+    "segment_id",
+    "frame_id",
+    "gps_time",
+    "roll",
+    "pitch",
+    "heading",
+    "geom",
+    "geom_proj",
+    "key_point",
+)
+
+# Columns written by the crossover writer (see crossovers.writeCrossovers), in COPY order.
+CROSSOVER_COLUMNS = (
+    "point_path_1_id",
+    "point_path_2_id",
+    "angle",
+    "geom",
+)
+
+
+class CopyStream(object):
+    """A read-only file-like object over an iterator of byte chunks.
+
+    cursor.copy_expert() pulls data with read(size); chunks are only produced as the
+    cursor asks for them so the full COPY payload is never held in memory at once.
+
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read(self, size=-1):
+        parts = [self._buffer]
+        bufferLen = len(self._buffer)
+        while size < 0 or bufferLen < size:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                break
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            parts.append(chunk)
+            bufferLen += len(chunk)
+        data = b"".join(parts)
+        if size < 0:
+            self._buffer = b""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def textChunks(rows, delimiter=",", chunkRows=COPY_CHUNK_ROWS):
+    """Encodes rows in the COPY text format, chunkRows rows at a time.
+
+    Input:
+            rows: (iterable of sequences) rows of values; None is written as NULL
+            delimiter: (string) the column delimiter given to COPY
+            chunkRows: (integer) number of rows per yielded chunk
+
+    Output:
+            chunks: (generator of bytes) encoded COPY text data
+
+    Values are written with str(); they must not contain the delimiter, tabs or newlines.
+
+    """
+    lines = []
+    for row in rows:
+        lines.append(
+            delimiter.join("\\N" if value is None else str(value) for value in row)
+        )
+        if len(lines) >= chunkRows:
+            lines.append("")
+            yield "\n".join(lines).encode("utf-8")
+            lines = []
+    if lines:
+        lines.append("")
+        yield "\n".join(lines).encode("utf-8")
+
+
+def copyText(cursor, table, columns, rows, delimiter=","):
+    """Streams rows into a table with COPY ... FROM STDIN in the text format.
+
+    Input:
+            cursor: (object) a database cursor (psycopg2 or a Django cursor wrapper)
+            table: (string) name of the destination table
+            columns: (list of strings) destination columns in row order
+            rows: (iterable of sequences) rows of values
+            delimiter: (string) the column delimiter
+
+    Output:
+            rowCount: (integer) number of rows copied
+
+    """
+    copySql = "COPY {table} ({columns}) FROM STDIN DELIMITER '{delimiter}';".format(
+        table=table, columns=", ".join(columns), delimiter=delimiter
+    )
+    cursor.copy_expert(copySql, CopyStream(textChunks(rows, delimiter)))
+    return cursor.rowcount
+
+
+def int4Column(values):
+    """Encodes integers as a PostgreSQL integer column.
+
+    Input:
+            values: (list or numpy array of integers)
+
+    Output:
+            column: (numpy array) big-endian int4 values
+
+    """
+    return np.asarray(values, dtype=">i4")
+
+
+def int8Column(values):
+    """Encodes integers as a PostgreSQL bigint column."""
+    return np.asarray(values, dtype=">i8")
+
+
+def float8Column(values):
+    """Encodes numbers as a PostgreSQL double precision column."""
+    return np.asarray(values, dtype=">f8")
+
+
+def boolColumn(values):
+    """Encodes booleans as a PostgreSQL boolean column."""
+    return np.asarray(values, dtype=np.bool_)
+
+
+def numericColumn(values, scale):
+    """Encodes numbers as a PostgreSQL numeric column with a fixed number of decimal places.
+
+    Input:
+            values: (list or numpy array of numbers)
+            scale: (integer) decimal places of the destination column
+
+    Output:
+            column: (numpy structured array) numeric binary values
+
+    Values are rounded to the column scale and written as base-10000 digits. Every value
+    uses the same number of digits (leading and trailing zero digits are stripped by
+    PostgreSQL on receipt) so the whole column is packed at once.
+
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not np.all(np.isfinite(values)):
+        raise Exception("numericColumn() CANNOT ENCODE NaN OR INFINITE VALUES.")
+
+    # base-10000 digits after the decimal point
+    fracDigits = (scale + 3) // 4
+    scaled = np.rint(np.abs(values) * 10 ** scale).astype(np.int64)
+    scaled *= 10 ** (4 * fracDigits - scale)
+
+    # base-10000 digits before the decimal point
+    intDigits = 1
+    maxInt = int(scaled.max()) // 10000 ** fracDigits if len(scaled) else 0
+    while maxInt >= 10000:
+        maxInt //= 10000
+        intDigits += 1
+    nDigits = intDigits + fracDigits
+
+    column = np.empty(
+        len(values),
+        dtype=[
+            ("ndigits", ">i2"),
+            ("weight", ">i2"),
+            ("sign", ">u2"),
+            ("dscale", ">i2"),
+            ("digits", ">i2", (nDigits,)),
+        ],
+    )
+    column["ndigits"] = nDigits
+    column["weight"] = intDigits - 1
+    column["sign"] = np.where(values < 0, 0x4000, 0x0000)
+    column["dscale"] = scale
+    for digitIdx in range(nDigits - 1, -1, -1):
+        column["digits"][:, digitIdx] = scaled % 10000
+        scaled //= 10000
+    return column
+
+
+def bytesColumn(values):
+    """Encodes equal length byte strings (e.g. EWKB geometries) as a binary column.
+
+    Input:
+            values: (list of bytes) values of identical length
+
+    Output:
+            column: (numpy array) fixed width void values
+
+    """
+    if len(values) == 0:
+        return np.empty(0, dtype="V1")
+    width = len(values[0])
+    joined = b"".join(values)
+    if len(joined) != width * len(values):
+        raise Exception("bytesColumn() VALUES MUST ALL HAVE THE SAME LENGTH.")
+    return np.frombuffer(joined, dtype="V%d" % width)
+
+
+def nullColumn(rowCount):
+    """Encodes a column of NULL values.
+
+    Input:
+            rowCount: (integer) number of rows
+
+    Output:
+            column: (numpy array) zero width values (written as NULL by binaryChunks)
+
+    """
+    return np.zeros(rowCount, dtype="V0")
+
+
+def ewkbPointZ(x, y, z, srid=4326):
+    """Packs a single POINT Z as little-endian EWKB with an embedded SRID.
+
+    Input:
+            x: (float) x coordinate (longitude)
+            y: (float) y coordinate (latitude)
+            z: (float) z coordinate (elevation)
+            srid: (integer) the geometry srid
+
+    Output:
+            ewkb: (bytes) the EWKB geometry
+
+    """
+    return struct.pack("<BIIddd", 1, EWKB_POINT_Z_SRID, srid, x, y, z)
+
+
+def ewkbPoints(x, y, z=None, srid=4326):
+    """Packs arrays of coordinates as little-endian EWKB points with an embedded SRID.
+
+    Input:
+            x: (list or numpy array of floats) x coordinates (longitude)
+            y: (list or numpy array of floats) y coordinates (latitude)
+            z: (list or numpy array of floats) z coordinates (elevation); if None 2D
+                    POINT geometries are built instead of POINT Z
+            srid: (integer) the geometry srid
+
+    Output:
+            ewkb: (numpy array) one fixed width EWKB value per point, usable directly as a
+                    bytesColumn() (bytes(ewkb[idx]) gives a single geometry)
+
+    The output is byte-for-byte identical to GEOSGeometry(...).ewkb for the same points.
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if z is None:
+        points = np.empty(len(x), dtype=EWKB_POINT_DTYPE)
+        points["wkbType"] = EWKB_POINT_SRID
+    else:
+        points = np.empty(len(x), dtype=EWKB_POINT_Z_DTYPE)
+        points["wkbType"] = EWKB_POINT_Z_SRID
+        points["z"] = z
+    points["byteOrder"] = 1
+    points["srid"] = srid
+    points["x"] = x
+    points["y"] = y
+    return points.view("V%d" % points.dtype.itemsize)
+
+
+def ewkbLineString(x, y, srid=4326):
+    """Packs arrays of coordinates as a single little-endian EWKB LINESTRING with an embedded SRID.
+
+    Input:
+            x: (list or numpy array of floats) x coordinates (longitude)
+            y: (list or numpy array of floats) y coordinates (latitude)
+            srid: (integer) the geometry srid
+
+    Output:
+            ewkb: (bytes) the EWKB geometry, readable with GEOSGeometry(memoryview(ewkb))
+
+    """
+    coords = np.empty((len(x), 2), dtype="<f8")
+    coords[:, 0] = x
+    coords[:, 1] = y
+    return struct.pack("<BIII", 1, EWKB_LINESTRING_SRID, srid, len(coords)) + coords.tobytes()
+
+
+def binaryChunks(columns, chunkRows=COPY_CHUNK_ROWS):
+    """Encodes encoded columns as PGCOPY binary tuples, chunkRows rows at a time.
+
+    Input:
+            columns: (list of numpy arrays) columns from the *Column() encoders, all of
+                    equal length
+            chunkRows: (integer) number of rows per yielded chunk
+
+    Output:
+            chunks: (generator of bytes) PGCOPY binary data including header and trailer
+
+    Each tuple is a fixed width record (field count, then a length and value per field),
+    so a chunk is packed with one structured array assignment per column.
+
+    """
+    rowCount = len(columns[0]) if columns else 0
+    fields = [("nfields", ">i2")]
+    for colIdx, column in enumerate(columns):
+        if len(column) != rowCount:
+            raise Exception("binaryChunks() COLUMNS MUST ALL HAVE THE SAME LENGTH.")
+        fields.append(("len%d" % colIdx, ">i4"))
+        fields.append(("val%d" % colIdx, column.dtype))
+    recordDtype = np.dtype(fields)
+
+    yield PGCOPY_HEADER
+    for start in range(0, rowCount, chunkRows):
+        stop = min(start + chunkRows, rowCount)
+        records = np.empty(stop - start, dtype=recordDtype)
+        records["nfields"] = len(columns)
+        for colIdx, column in enumerate(columns):
+            # zero width columns (nullColumn) are NULL
+            records["len%d" % colIdx] = column.dtype.itemsize or -1
+            records["val%d" % colIdx] = column[start:stop]
+        yield records.tobytes()
+    yield PGCOPY_TRAILER
+
+
+def copyBinary(cursor, table, columns, columnData):
+    """Streams encoded columns into a table with COPY ... FROM STDIN in the binary format.
+
+    Input:
+            cursor: (object) a database cursor (psycopg2 or a Django cursor wrapper)
+            table: (string) name of the destination table
+            columns: (list of strings) destination column names
+            columnData: (list of numpy arrays) encoded values for each column (see the
+                    *Column() encoders); types must match the destination columns exactly
+
+    Output:
+            rowCount: (integer) number of rows copied
+
+    """
+    copySql = "COPY {table} ({columns}) FROM STDIN WITH (FORMAT binary);".format(
+        table=table, columns=", ".join(columns)
+    )
+    cursor.copy_expert(copySql, CopyStream(binaryChunks(columnData)))
+    return cursor.rowcount
+
+
+def pointPathColumns(
+    locationId, seasonId, segmentId, frameIds, gpsTime, roll, pitch, heading, geomEwkb, geomProjEwkb=None,
+    keyPoint=True
+):
+    """Encodes point path values as binary columns in POINT_PATH_COLUMNS order.
+
+    Input:
+            locationId: (integer) location pk shared by all points
+            seasonId: (integer) season pk shared by all points
+            segmentId: (integer or list of integers) segment pk of the points
+            frameIds: (list of integers) frame pk of each point
+            gpsTime: (list of numbers) gps time of each point
+            roll: (list of numbers) roll of each point
+            pitch: (list of numbers) pitch of each point
+            heading: (list of numbers) heading of each point
+            geomEwkb: (list of bytes or numpy void array) EWKB POINT Z of each point
+            geomProjEwkb: (list of bytes or numpy void array) EWKB POINT of each point in the
+                    projection of its location (None leaves geom_proj NULL)
+            keyPoint: (boolean or list of booleans) key point flag of the points
+
+    Output:
+            columnData: (list of numpy arrays) input for copyBinary()
+
+    """
+    pointCount = len(frameIds)
+    if not isinstance(geomEwkb, np.ndarray):
+        geomEwkb = bytesColumn(geomEwkb)
+    if geomProjEwkb is None:
+        geomProjEwkb = nullColumn(pointCount)
+    elif not isinstance(geomProjEwkb, np.ndarray):
+        geomProjEwkb = bytesColumn(geomProjEwkb)
+    return [
+        int4Column(np.full(pointCount, locationId)),
+        int4Column(np.full(pointCount, seasonId)),
+        int4Column(np.broadcast_to(segmentId, (pointCount,))),
+        int4Column(frameIds),
+        numericColumn(gpsTime, GPS_TIME_SCALE),
+        numericColumn(roll, ATTITUDE_SCALE),
+        numericColumn(pitch, ATTITUDE_SCALE),
+        numericColumn(heading, ATTITUDE_SCALE),
+        geomEwkb,
+        geomProjEwkb,
+        boolColumn(np.broadcast_to(keyPoint, (pointCount,))),
+    ]
+
+
+def crossoverColumns(pointPath1Ids, pointPath2Ids, angle, lon, lat):
+    """Encodes crossover values as binary columns in CROSSOVER_COLUMNS order.
+
+    Input:
+            pointPath1Ids: (list of integers) point path pk of the first point of each crossover
+            pointPath2Ids: (list of integers) point path pk of the second point of each crossover
+            angle: (list of numbers) crossing angle of each crossover in degrees
+            lon: (list of floats) longitude of each crossover
+            lat: (list of floats) latitude of each crossover
+
+    Output:
+            columnData: (list of numpy arrays) input for copyBinary()
+
+    """
+    return [
+        int4Column(pointPath1Ids),
+        int4Column(pointPath2Ids),
+        numericColumn(angle, ANGLE_SCALE),
+        ewkbPoints(lon, lat),
+    ]
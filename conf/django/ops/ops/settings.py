@@ -54,6 +54,7 @@ INSTALLED_APPS = (
     "snow",
     "kuband",
     "opsuser",
+    "ops",
 )
 
 AUTH_PROFILE_MODULE = "opsuser.UserProfile"
@@ -68,6 +69,7 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_COOKIE_HTTPONLY = True
 
 MIDDLEWARE  = (
+    "ops.middleware.RequestDecompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     #'django.middleware.csrf.CsrfViewMiddleware',
@@ -76,6 +78,15 @@ MIDDLEWARE  = (
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 )
 
+# Largest request body (in bytes) accepted after gzip/zstd decompression (see ops/middleware.py)
+OPS_MAX_DECOMPRESSED_BODY_SIZE = 1024 * 1024 * 1024
+
+# Rows changed in a table by write views before it is analyzed in the background (see ops/maintenance.py)
+OPS_ANALYZE_ROW_THRESHOLD = 50000
+
+# Default crossover engine of crossoverCalculation ('sql' or 'strtree', see ops/crossovers.py)
+OPS_CROSSOVER_ENGINE = "sql"
+
 ROOT_URLCONF = "ops.urls"
 
 WSGI_APPLICATION = "ops.wsgi.application"
@@ -22,6 +22,11 @@ urlpatterns = [
     path("alter/user/permissions", ops.views.alterUserPermissions),
     # INPUT VIEWS
     path("create/path", ops.views.createPath),
+    path("create/path/batch", ops.views.createPathBatch),
+    path("create/path/upload", ops.views.createPathUpload),
+    path("create/path/upload/chunk", ops.views.createPathUploadChunk),
+    path("create/path/upload/commit", ops.views.createPathUploadCommit),
+    path("delete/path/upload", ops.views.deletePathUpload),
     path("alter/path/resolution", ops.views.alterPathResolution),
     path("alter/path/simplify", ops.views.simplifySegmentsResolution),
     path("create/layer", ops.views.createLayer),
@@ -42,6 +47,8 @@ urlpatterns = [
     path("get/layer/points/netcdf", ops.views.getLayerPointsNetcdf),
     path("get/system/info", ops.views.getSystemInfo),
     path("get/segment/info", ops.views.getSegmentInfo),
+    path("get/ingest/stats", ops.views.getIngestStats),
+    path("get/path/upload", ops.views.getPathUpload),
     path("get/crossovers", ops.views.getCrossovers),
     path("get/crossovers/report", ops.views.getCrossoversReport),
     path("get/frame/search", ops.views.getFrameSearch),
@@ -1,10 +1,18 @@
 from django.http import HttpResponse
 from django.apps import apps
+from django.db import connection, transaction
 from .authip import *
 from django.contrib.auth.models import User
+from django.contrib.gis.gdal import CoordTransform, OGRGeometry, SpatialReference
 from functools import wraps
 from decimal import Decimal
-import math, collections, string, random, traceback, sys, ujson, json
+import math, collections, string, random, struct, traceback, sys, ujson, json, time, logging, os, threading
+import numpy as np
+from contextlib import contextmanager
+
+
+# Seconds added around input gps time ranges to absorb double precision rounding.
+GPS_TIME_PAD = 0.00001
 
 
 def response(status, data, cookies):
@@ -118,6 +126,10 @@ def errorCheck(exception, sys):
             return response(0, "ERROR: ERROR CHECK FAILED ON EXCEPTION.", {})
 
 
+# Polar stereographic projection of each location (the projection of the geom_proj columns).
+LOCATION_EPSG = {"arctic": 3413, "antarctic": 3031}
+
+
 def epsgFromLocation(locationName):
     """Gets an epsg code based on a mapped string location name.
 
@@ -130,14 +142,44 @@ def epsgFromLocation(locationName):
     Current only locations 'arctic' and 'antarctic' are mapped to epsg codes
 
     """
-    if locationName == "arctic":
-        return 3413
-    elif locationName == "antarctic":
-        return 3031
+    if locationName in LOCATION_EPSG:
+        return LOCATION_EPSG[locationName]
     else:
         raise Exception("ONLY (antarctic and arctic) MAPPED FOR epsgFromLocation().")
 
 
+def epsgCaseSql(locationColumn="loc.name"):
+    """Builds the SQL expression giving the epsg code of a location name (see LOCATION_EPSG).
+
+    Input:
+            locationColumn: (string) SQL column (or expression) holding the location name
+
+    Output:
+            caseSql: (string) SQL CASE expression, NULL for unmapped locations
+
+    """
+    whens = " ".join("WHEN '%s' THEN %d" % (name, epsg) for name, epsg in sorted(LOCATION_EPSG.items()))
+    return "CASE %s %s END" % (locationColumn, whens)
+
+
+def projectedPointSql(epsg, alias="pp"):
+    """Builds the SQL expression giving the projected geometry of a point path.
+
+    The stored geom_proj is used where it is filled; point paths written without it (it is NULL)
+    are projected on the fly.
+
+    Input:
+            epsg: (integer or string) epsg code, or SQL expression of it (see epsgCaseSql)
+            alias: (string) SQL alias of the point paths table
+
+    Output:
+            projectedSql: (string) SQL expression of the projected point (srid 0)
+
+    """
+    return "COALESCE({alias}.geom_proj, ST_SetSRID(ST_Transform(ST_Force2D({alias}.geom), {epsg}), 0))".format(
+        alias=alias, epsg=epsg)
+
+
 def twttToRange(surfTwtt, layerTwtt):
     """Convert a layer's two-way travel time to range from aircraft in wgs1984 meters.
 
@@ -158,6 +200,425 @@ def twttToRange(surfTwtt, layerTwtt):
     return surfRange, layerRange
 
 
+def assignFrames(gpsTimes, frameStartGpsTimes, framePks):
+    """Assigns every point to the frame it falls in using the sorted frame start gps times.
+
+    Input:
+            gpsTimes: (list of floats) gps time of each point
+            frameStartGpsTimes: (list of floats) start gps time of each frame (ascending)
+            framePks: (list of integers) frame pk for each entry in frameStartGpsTimes
+
+    Output:
+            frameIds: (numpy array of integers) frame pk for each point
+
+    A point belongs to the last frame whose start gps time is less than or equal to the
+    point's gps time. All points are resolved at once with a binary search.
+
+    """
+    gpsTimes = np.asarray(gpsTimes, dtype=np.float64)
+    frameStartGpsTimes = np.asarray(frameStartGpsTimes, dtype=np.float64)
+    framePks = np.asarray(framePks)
+
+    if len(frameStartGpsTimes) != len(framePks):
+        raise Exception("frame_start_gps_time MUST HAVE ONE ENTRY PER FRAME.")
+    if np.any(np.diff(frameStartGpsTimes) < 0):
+        raise Exception("frame_start_gps_time MUST BE SORTED IN ASCENDING ORDER.")
+
+    frameIdxs = np.searchsorted(frameStartGpsTimes, gpsTimes, side="right") - 1
+    if len(frameIdxs) > 0 and frameIdxs.min() < 0:
+        raise Exception("POINT GPS TIME IS BEFORE THE FIRST FRAME START GPS TIME.")
+
+    return framePks[frameIdxs]
+
+
+def matchGpsTimes(gpsTimes, targetGpsTimes, maxGap=None):
+    """Finds the nearest target gps time of every gps time.
+
+    Input:
+            gpsTimes: (list of floats) gps times to match
+            targetGpsTimes: (list of floats) gps times to match against (ascending)
+            maxGap: (float) largest accepted gps time difference (default: the median spacing
+                    of targetGpsTimes, so gps times beyond the ends of the targets are not matched)
+
+    Output:
+            targetIdxs: (numpy array of integers) index of the nearest target gps time of each
+                    gps time (-1 where no target is within maxGap)
+            gaps: (numpy array of floats) gps time difference to the nearest target
+
+    """
+    gpsTimes = np.asarray(gpsTimes, dtype=np.float64)
+    targetGpsTimes = np.asarray(targetGpsTimes, dtype=np.float64)
+    targetCount = len(targetGpsTimes)
+    if targetCount == 0:
+        return np.full(len(gpsTimes), -1), np.full(len(gpsTimes), np.inf)
+    if maxGap is None:
+        maxGap = np.median(np.diff(targetGpsTimes)) if targetCount > 1 else 0.0
+
+    # the nearest target is on one side or the other of each gps time's insertion point
+    rightIdxs = np.clip(np.searchsorted(targetGpsTimes, gpsTimes), 0, targetCount - 1)
+    leftIdxs = np.clip(rightIdxs - 1, 0, targetCount - 1)
+    rightGaps = np.abs(targetGpsTimes[rightIdxs] - gpsTimes)
+    leftGaps = np.abs(targetGpsTimes[leftIdxs] - gpsTimes)
+    targetIdxs = np.where(rightGaps < leftGaps, rightIdxs, leftIdxs)
+    gaps = np.minimum(rightGaps, leftGaps)
+
+    targetIdxs[gaps > maxGap] = -1
+    return targetIdxs, gaps
+
+
+def summarizeFrames(frameIdxs, frameCount, gpsTimes, lon, lat):
+    """Computes the gps time bounds, point count and bounding box of every frame.
+
+    Input:
+            frameIdxs: (list of integers) frame index (0 to frameCount-1) of each point
+            frameCount: (integer) the number of frames
+            gpsTimes: (list of floats) gps time of each point
+            lon: (list of floats) longitude of each point
+            lat: (list of floats) latitude of each point
+
+    Output:
+            frameSummary: (dictionary) numpy array with one value per frame for each of
+                    start_gps_time, stop_gps_time, min_lon, min_lat, max_lon, max_lat (nan for
+                    frames without points) and point_count
+
+    """
+    frameIdxs = np.asarray(frameIdxs)
+    order = np.argsort(frameIdxs, kind="stable")
+    pointCounts = np.bincount(frameIdxs, minlength=frameCount)
+    hasPoints = pointCounts > 0
+    # offset of each non-empty frame in the points sorted by frame
+    offsets = np.searchsorted(frameIdxs[order], np.flatnonzero(hasPoints))
+
+    def reduceFrames(reduceFunc, values):
+        out = np.full(frameCount, np.nan)
+        out[hasPoints] = reduceFunc.reduceat(np.asarray(values, dtype=np.float64)[order], offsets)
+        return out
+
+    return {
+        "start_gps_time": reduceFrames(np.minimum, gpsTimes),
+        "stop_gps_time": reduceFrames(np.maximum, gpsTimes),
+        "point_count": pointCounts,
+        "min_lon": reduceFrames(np.minimum, lon),
+        "min_lat": reduceFrames(np.minimum, lat),
+        "max_lon": reduceFrames(np.maximum, lon),
+        "max_lat": reduceFrames(np.maximum, lat),
+    }
+
+
+# Projected geometry (geom_proj) of a segment in the polar stereographic projection of its
+# location (NULL for locations without one, see LOCATION_EPSG).
+SEGMENT_PROJECTION_SQL = """
+UPDATE {{app}}_segments seg
+SET    geom_proj = ST_SetSRID(ST_Transform(seg.geom, {epsg}), 0)
+FROM   {{app}}_seasons ss
+       JOIN {{app}}_locations loc ON loc.id = ss.location_id
+WHERE  ss.id = seg.season_id AND seg.id = ANY(%s);
+""".format(epsg=epsgCaseSql("loc.name"))
+
+# Projected geometry (geom_proj) of point paths, as SEGMENT_PROJECTION_SQL.
+POINT_PATH_PROJECTION_SQL = """
+UPDATE {{app}}_point_paths pp
+SET    geom_proj = ST_SetSRID(ST_Transform(ST_Force2D(pp.geom), {epsg}), 0)
+FROM   {{app}}_locations loc
+WHERE  loc.id = pp.location_id AND pp.id BETWEEN %s AND %s AND pp.geom_proj IS NULL;
+""".format(epsg=epsgCaseSql("loc.name"))
+
+
+def updateSegmentProjection(app, segmentIds):
+    """Stores the projected geometry (geom_proj) of segments whose geom was changed in SQL.
+
+    Input:
+            app: (string) application name
+            segmentIds: (list of integers) ids of the segments
+
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(SEGMENT_PROJECTION_SQL.format(app=app), [[int(segmentId) for segmentId in segmentIds]])
+
+
+# Coordinate transforms built by getTransformer, per thread (a GDAL transform must not be used
+# by two threads at once) and keyed by (source epsg, destination epsg).
+_transformers = threading.local()
+
+
+def _clearTransformers():
+    """Drops the cached transforms (a forked process builds its own)."""
+    global _transformers
+    _transformers = threading.local()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_clearTransformers)
+
+
+def getTransformer(srcEpsg, dstEpsg):
+    """Gets the cached coordinate transform between two spatial references.
+
+    Input:
+            srcEpsg: (integer) epsg code of the input coordinates
+            dstEpsg: (integer) epsg code of the output coordinates
+
+    Output:
+            transform: (object) django.contrib.gis.gdal CoordTransform
+
+    The spatial references and the transform are built once per (srcEpsg, dstEpsg) and thread,
+    and reused by every later request.
+
+    """
+    registry = getattr(_transformers, "registry", None)
+    if registry is None:
+        registry = _transformers.registry = {}
+    key = (int(srcEpsg), int(dstEpsg))
+    transform = registry.get(key)
+    if transform is None:
+        transform = registry[key] = CoordTransform(SpatialReference(key[0]), SpatialReference(key[1]))
+    return transform
+
+
+def transformCoords(x, y, srcEpsg, dstEpsg):
+    """Transforms arrays of coordinates between two spatial references in one GDAL call.
+
+    Input:
+            x: (list or numpy array of floats) x coordinates (longitude)
+            y: (list or numpy array of floats) y coordinates (latitude)
+            srcEpsg: (integer) epsg code of the input coordinates
+            dstEpsg: (integer) epsg code of the output coordinates
+
+    Output:
+            x: (numpy array) transformed x coordinates
+            y: (numpy array) transformed y coordinates
+
+    The transform is taken from the cache of getTransformer.
+
+    """
+    coords = np.empty((len(x), 2), dtype="<f8")
+    coords[:, 0] = x
+    coords[:, 1] = y
+    if not len(coords) or srcEpsg == dstEpsg:
+        return coords[:, 0], coords[:, 1]
+
+    # all points are transformed as one (OGR, so single points are allowed) line string
+    line = OGRGeometry(memoryview(struct.pack("<BII", 1, 2, len(coords)) + coords.tobytes()))
+    line.transform(getTransformer(srcEpsg, dstEpsg))
+    wkb = bytes(line.wkb)
+    coords = np.frombuffer(wkb, dtype="<f8" if wkb[0] == 1 else ">f8", offset=9).reshape(-1, 2)
+    return coords[:, 0].copy(), coords[:, 1].copy()
+
+
+# Point arrays whose missing (NaN) values are interpolated by validatePath(clean="repair").
+PATH_REPAIR_FIELDS = ("elev", "roll", "pitch", "heading")
+
+# Most index ranges listed per check in a validatePath() report.
+MAX_REPORT_RANGES = 20
+
+
+def indexRanges(mask, maxRanges=MAX_REPORT_RANGES):
+    """Compacts the True entries of a boolean mask into inclusive index ranges.
+
+    Input:
+            mask: (numpy array of booleans) flags of each point
+            maxRanges: (integer) most ranges returned (the first ones)
+
+    Output:
+            ranges: (list of lists) [first, last] index of each run of flagged points
+
+    """
+    flagged = np.flatnonzero(mask)
+    if len(flagged) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(flagged) > 1)
+    starts = np.concatenate(([flagged[0]], flagged[breaks + 1]))
+    stops = np.concatenate((flagged[breaks], [flagged[-1]]))
+    return [[int(start), int(stop)] for start, stop in zip(starts[:maxRanges], stops[:maxRanges])]
+
+
+def validatePath(pathArrays, clean=None):
+    """Checks (and optionally cleans) the point arrays of a segment before they are loaded.
+
+    Input:
+            pathArrays: (dictionary) list or numpy array for each of PATH_ARRAY_FIELDS
+            clean: (string) None or 'none' to only check, 'drop' to drop the offending points, or
+                    'repair' to interpolate missing PATH_REPAIR_FIELDS values and drop the rest
+
+    Output:
+            pathArrays: (dictionary) float64 numpy array for each of PATH_ARRAY_FIELDS (cleaned)
+            report: (dictionary)
+                    valid: (boolean) True if the returned arrays can be loaded
+                    clean: (string) the clean mode used
+                    point_count: (integer) number of input points
+                    kept_count: (integer) number of returned points
+                    length: (dictionary) length of each array (only if the lengths differ)
+                    nan, duplicate, non_monotonic, repaired: (dictionary) count and index ranges of
+                            points with a missing value, repeating the previous point, with a gps time
+                            not after the points before them, and with interpolated values
+
+    """
+    clean = str(clean or "none").lower()
+    if clean not in ("none", "drop", "repair"):
+        raise Exception("clean MUST BE none, drop OR repair")
+
+    # copies, so that repairs never modify the caller's arrays
+    pathArrays = {name: np.array(pathArrays[name], dtype=np.float64) for name in PATH_ARRAY_FIELDS}
+    pointCount = len(pathArrays["gps_time"])
+    report = {"valid": False, "clean": clean, "point_count": pointCount, "kept_count": 0}
+
+    lengths = {name: len(values) for name, values in pathArrays.items()}
+    if len(set(lengths.values())) > 1:
+        report["length"] = lengths
+        return pathArrays, report
+
+    gpsTime = pathArrays["gps_time"]
+    lon = pathArrays["lon"]
+    lat = pathArrays["lat"]
+
+    # interpolate missing values from the neighbouring points (by index)
+    repairMask = np.zeros(pointCount, dtype=bool)
+    if clean == "repair":
+        locatedMask = np.isfinite(gpsTime) & np.isfinite(lon) & np.isfinite(lat)
+        pointIdxs = np.arange(pointCount)
+        for name in PATH_REPAIR_FIELDS:
+            values = pathArrays[name]
+            badMask = ~np.isfinite(values) & locatedMask
+            goodMask = ~badMask & locatedMask
+            if badMask.any() and goodMask.any():
+                values[badMask] = np.interp(pointIdxs[badMask], pointIdxs[goodMask], values[goodMask])
+                repairMask |= badMask
+
+    nanMask = np.zeros(pointCount, dtype=bool)
+    for values in pathArrays.values():
+        nanMask |= ~np.isfinite(values)
+
+    # a point with the same gps time and position as the (complete) point before it
+    duplicateMask = np.zeros(pointCount, dtype=bool)
+    duplicateMask[1:] = (gpsTime[1:] == gpsTime[:-1]) & (lon[1:] == lon[:-1]) & (lat[1:] == lat[:-1])
+    duplicateMask[1:] &= ~nanMask[:-1]
+
+    # a point whose gps time is not after every (kept) point before it
+    keptGpsTime = np.where(nanMask | duplicateMask, -np.inf, gpsTime)
+    previousMax = np.empty(pointCount)
+    previousMax[:1] = -np.inf
+    previousMax[1:] = np.maximum.accumulate(keptGpsTime)[:-1]
+    nonMonotonicMask = ~nanMask & ~duplicateMask & (gpsTime <= previousMax)
+
+    for name, mask in [("nan", nanMask), ("duplicate", duplicateMask),
+                       ("non_monotonic", nonMonotonicMask), ("repaired", repairMask)]:
+        report[name] = {"count": int(mask.sum()), "ranges": indexRanges(mask)}
+
+    dropMask = nanMask | duplicateMask | nonMonotonicMask
+    if clean == "none":
+        report["valid"] = not dropMask.any()
+        report["kept_count"] = pointCount
+    else:
+        pathArrays = {name: values[~dropMask] for name, values in pathArrays.items()}
+        report["kept_count"] = int(pointCount - dropMask.sum())
+        report["valid"] = True
+    # a segment line needs at least two points
+    report["valid"] = report["valid"] and report["kept_count"] >= 2
+
+    return pathArrays, report
+
+
+def padGpsTimeRange(startGpsTime, stopGpsTime, pad=GPS_TIME_PAD):
+    """Widens an input gps time range to absorb double precision rounding.
+
+    Input:
+            startGpsTime: (Decimal or float) start gps time of the range
+            stopGpsTime: (Decimal or float) stop gps time of the range
+            pad: (float) seconds subtracted from the start and added to the stop
+
+    Output:
+            startGpsTime: (Decimal or float) padded start gps time (same type as the input)
+            stopGpsTime: (Decimal or float) padded stop gps time (same type as the input)
+
+    A range mixing Decimal and float times is padded (and returned) as Decimals; floats are
+    converted from their shortest repr so no binary rounding digits are added.
+
+    """
+    if isinstance(startGpsTime, Decimal) or isinstance(stopGpsTime, Decimal):
+        startGpsTime, stopGpsTime, pad = [
+            value if isinstance(value, Decimal) else Decimal(repr(value))
+            for value in (startGpsTime, stopGpsTime, pad)
+        ]
+    return startGpsTime - pad, stopGpsTime + pad
+
+
+class PhaseTimer(object):
+    """Records the duration and row count of each phase of an ingest or crossover run.
+
+    Phases with the same name (such as the validation of each segment of a batch) are summed.
+    A 'total' phase covering the whole run is added when the timings are saved.
+
+    Example:
+            timer = utility.PhaseTimer("createPath")
+            with timer.phase("copy", rowCount):
+                    ...
+            timer.save(models, season, segment)
+
+    """
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.runId = randId(20)
+        self.startTime = time.perf_counter()
+        self.phases = collections.OrderedDict()
+
+    @contextmanager
+    def phase(self, name, rowCount=None):
+        """Times the enclosed block as the named phase."""
+        phaseStart = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - phaseStart, rowCount)
+
+    def add(self, name, duration, rowCount=None):
+        """Adds a measured duration (and row count) to the named phase."""
+        phaseDuration, phaseRows = self.phases.get(name, (0.0, None))
+        if rowCount is not None:
+            phaseRows = (phaseRows or 0) + int(rowCount)
+        self.phases[name] = (phaseDuration + duration, phaseRows)
+
+    def save(self, models, season=None, segment=None):
+        """Writes the phase timings to the ingest_stats table of the given application.
+
+        Input:
+                models: (named tuple) django model objects for the given application
+                season: (string) name of the season of the run
+                segment: (string) name of the segment of the run (None for multi-segment runs)
+
+        The timings are also logged. A failure to save them is logged and never fails the run.
+
+        """
+        phases = list(self.phases.items())
+        phases.append(("total", (time.perf_counter() - self.startTime, None)))
+        logging.info(
+            "%s timings for segment %s of season %s: %s",
+            self.operation,
+            segment,
+            season,
+            ", ".join("%s %.3fs" % (name, duration) for name, (duration, _) in phases),
+        )
+        try:
+            # a savepoint keeps a failed stats insert from breaking the caller's transaction
+            with transaction.atomic():
+                models.ingest_stats.objects.bulk_create(
+                    [
+                        models.ingest_stats(
+                            run_id=self.runId,
+                            operation=self.operation,
+                            phase=name,
+                            duration=duration,
+                            row_count=rowCount,
+                            season=season,
+                            segment=segment,
+                        )
+                        for name, (duration, rowCount) in phases
+                    ]
+                )
+        except Exception as e:
+            logging.warning("%s timings could not be saved: %s", self.operation, e)
+
+
 def randId(size):
     """Generates a random string of letters and integers.
 
@@ -197,16 +658,22 @@ def getQuery(request):
         raise Exception("method must be POST")
 
 
-def getData(request):
+def getData(request, floatDecode=False):
     """Gets data from POST.
 
     Input:
             request: (object) HTTPRequest object.
+            floatDecode: (boolean) decode JSON numbers as floats instead of Decimals; also
+                    enabled per request by the POST variable float_decode=true
 
     Output:
             app: (string) application name
             data: (String) JSON encoded data
 
+    ujson decodes floats with correct rounding, so a gps_time keeps every digit that the
+    numeric(16,6) gps_time columns store. Use padGpsTimeRange() for arithmetic on input
+    gps times so that either decoding works.
+
     """
     if request.method == "POST":
         try:
@@ -216,7 +683,10 @@ def getData(request):
             jsonData = request.POST.get("data")
 
             if jsonData is not None:
-                data = json.loads(jsonData, parse_float=Decimal)
+                if isFloatDecode(request, floatDecode):
+                    data = ujson.loads(jsonData)
+                else:
+                    data = json.loads(jsonData, parse_float=Decimal)
 
             # parse for MATLAB specific input (build "cookies")
             try:
@@ -242,6 +712,88 @@ def getData(request):
         raise Exception("METHOD MUST BE POST")
 
 
+# Arrays required in a columnar (.npz) path upload, see getPathArrays().
+PATH_ARRAY_FIELDS = ("gps_time", "lon", "lat", "elev", "roll", "pitch", "heading")
+
+
+def isFloatDecode(request, floatDecode=False):
+    """Checks if the numbers of a request are decoded as floats (see getData).
+
+    Input:
+            request: (object) HTTPRequest object.
+            floatDecode: (boolean) the endpoint's default
+
+    Output:
+            floatDecode: (boolean) True if floatDecode or the POST variable float_decode is true
+
+    """
+    return floatDecode or forceBool(request.POST.get("float_decode", False))
+
+
+def getPathArrays(request, field="path"):
+    """Gets the columnar path arrays of an uploaded NumPy .npz file.
+
+    Input:
+            request: (object) HTTPRequest object.
+            field: (string) name of the multipart file field holding the .npz upload
+
+    Output:
+            pathArrays: (dictionary) float64 numpy array for each of PATH_ARRAY_FIELDS,
+                    or None if the request has no file in the given field
+
+    """
+    pathFile = request.FILES.get(field)
+    if pathFile is None:
+        return None
+
+    return loadPathArrays(pathFile, "UPLOADED " + field)
+
+
+def loadPathArrays(npzSource, sourceName):
+    """Loads and checks the columnar path arrays of a NumPy .npz file.
+
+    Input:
+            npzSource: (string or file object) the .npz file
+            sourceName: (string) name of the file used in error messages
+
+    Output:
+            pathArrays: (dictionary) float64 numpy array for each of PATH_ARRAY_FIELDS
+
+    """
+    try:
+        npzFile = np.load(npzSource, allow_pickle=False)
+    except Exception:
+        raise Exception(sourceName + " IS NOT A VALID .npz FILE")
+
+    with npzFile:
+        missingFields = [name for name in PATH_ARRAY_FIELDS if name not in npzFile.files]
+        if missingFields:
+            raise Exception(sourceName + " IS MISSING ARRAYS: " + ", ".join(missingFields))
+        pathArrays = {name: npzFile[name] for name in PATH_ARRAY_FIELDS}
+
+    return checkPathArrays(pathArrays)
+
+
+def checkPathArrays(pathArrays):
+    """Converts columnar path arrays to float64 and checks that they have one value per point.
+
+    Input:
+            pathArrays: (dictionary) list or numpy array for each of PATH_ARRAY_FIELDS
+
+    Output:
+            pathArrays: (dictionary) float64 numpy array for each of PATH_ARRAY_FIELDS
+
+    """
+    pathArrays = {name: np.asarray(pathArrays[name], dtype=np.float64) for name in PATH_ARRAY_FIELDS}
+
+    pointCount = len(pathArrays["gps_time"])
+    for name, values in pathArrays.items():
+        if values.ndim != 1 or len(values) != pointCount:
+            raise Exception("ARRAY " + name + " MUST BE 1-D WITH ONE VALUE PER POINT")
+
+    return pathArrays
+
+
 def getAppModels(app):
     """Gets the Django models for a specified application.
 
@@ -268,6 +820,7 @@ def getAppModels(app):
             "layer_links",
             "layer_points",
             "landmarks",
+            "ingest_stats",
         ],
     )
 
@@ -284,6 +837,7 @@ def getAppModels(app):
     layer_links = apps.get_model(app, "layer_links")
     layer_points = apps.get_model(app, "layer_points")
     landmarks = apps.get_model(app, "landmarks")
+    ingest_stats = apps.get_model(app, "ingest_stats")
 
     return models(
         locations,
@@ -299,14 +853,16 @@ def getAppModels(app):
         layer_links,
         layer_points,
         landmarks,
+        ingest_stats,
     )
 
 
-def getInput(request):
+def getInput(request, floatDecode=False):
     """Wrapper for getData that gets the application models and decodes the JSON
 
     Input:
             request: HTTPRequest object
+            floatDecode: (boolean) decode JSON numbers as floats (see getData)
 
     Output:
             models: (named tuple) django model objects for the given application
@@ -315,7 +871,7 @@ def getInput(request):
             cookies
 
     """
-    app, data, cookies = getData(request)
+    app, data, cookies = getData(request, floatDecode)
 
     models = getAppModels(app)
 
@@ -1,7 +1,7 @@
-from django.db import connection, DatabaseError, transaction, IntegrityError
-from django.db.models import Max, Min
-from django.contrib.gis.geos import GEOSGeometry, Point, LineString, WKBReader
-from django.contrib.gis.gdal import SpatialReference, CoordTransform
+from django.db import connection, connections, DatabaseError, transaction, IntegrityError
+from django.db.models import Max, Min, FloatField
+from django.db.models.functions import Cast
+from django.contrib.gis.geos import GEOSGeometry, LineString, Polygon, WKBReader
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.http import HttpResponse
@@ -9,16 +9,22 @@ from django.conf import settings
 from .utility import ipAuth
 from decimal import Decimal
 import ops.utility as utility
+import ops.pgcopy as pgcopy
+import ops.maintenance as maintenance
+import ops.crossovers as crossovers
 import sys
 import os
+import re
+import shutil
 import datetime
 import simplekml
 import ujson
 import csv
 import time
 import math
-import tempfile
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from scipy.io import savemat
 import numpy as np
 from collections import OrderedDict
@@ -53,15 +59,34 @@ def createPath(request):
             frame_count: (integer) number of frames for the given segment
             frame_start_gps_time: (list of floats) start gps time for each frame for the given segment
 
+            The point arrays (geometry, elev, gps_time, roll, pitch, heading) may instead be uploaded
+            as a NumPy .npz file in the multipart field 'path' (see utility.getPathArrays).
+
+    Optional Input:
+            clean: (string) 'none' (default) rejects points that fail validation, 'drop' drops them,
+                    'repair' interpolates missing elev/roll/pitch/heading values and drops the rest
+            replace: (boolean) replace the segment if it already exists (default false). The new point
+                    paths and frames are swapped in within one transaction, layer points and landmarks
+                    are moved to the new point path nearest in gps time, and the segment's crossovers
+                    are deleted and the segment queued for crossover calculation (crossover_calc false).
+
     Output:
             status: (integer) 0:error 1:success 2:warning
             data: string status message
+                    OR (when validation fails, points were cleaned or layer points could not be re-attached)
+                    message: (string) status message
+                    validation: (dictionary) counts and index ranges of the points that failed each
+                            check (see utility.validatePath)
+                    replace: (dictionary) counts of re-attached and dropped layer points and landmarks
+                            (only when a segment was replaced, see _replacePointPaths)
 
     """
 
     try:
-        models, data, app, cookies = utility.getInput(
-            request)  # get the input and models
+        timer = utility.PhaseTimer('createPath')
+        with timer.phase('decode'):
+            models, data, app, cookies = utility.getInput(
+                request, floatDecode=True)  # get the input and models (numbers as floats)
 
         userProfileObj, status = utility.getUserProfile(cookies)
         if status:
@@ -71,21 +96,18 @@ def createPath(request):
         else:
             return utility.response(0, userProfileObj, {})
 
+        # use the columnar point arrays of an .npz upload in place of the JSON lists
+        with timer.phase('decode'):
+            pathArrays = utility.getPathArrays(request)
+        if pathArrays is not None:
+            data['properties'].update(pathArrays)
+
         # parse the data input
-        inLinePath = data['geometry']
-        inGpsTime = data['properties']['gps_time']
-        inElevation = data['properties']['elev']
-        inRoll = data['properties']['roll']
-        inPitch = data['properties']['pitch']
-        inHeading = data['properties']['heading']
         inSeason = data['properties']['season']
         inSeasonGroup = data['properties']['season_group']
         inLocationName = data['properties']['location']
         inRadar = data['properties']['radar']
         inSegment = data['properties']['segment']
-        inFrameCount = data['properties']['frame_count']
-        inFrameStartGpsTimes = utility.forceList(
-            data['properties']['frame_start_gps_time'])
 
         # Set up the basic logging configuration for createPath:
         logging.basicConfig(
@@ -96,134 +118,972 @@ def createPath(request):
             level=logging.DEBUG)
         logging.info('Segment %s of season %s is now loading', inSegment, inSeason)
 
-        locationsObj, _ = models.locations.objects.get_or_create(
-            name=inLocationName.lower())  # get or create the location
-        seasonGroupsObj, _ = models.season_groups.objects.get_or_create(
-            name=inSeasonGroup)  # get or create the season
-        seasonsObj, _ = models.seasons.objects.get_or_create(
-            name=inSeason, season_group_id=seasonGroupsObj.pk, location_id=locationsObj.pk)  # get or create the season
-        radarsObj, _ = models.radars.objects.get_or_create(
-            name=inRadar.lower())  # get or create the radar
-
-        linePathGeom = GEOSGeometry(ujson.dumps(inLinePath))  # create a geometry object
+        with timer.phase('dimensions'):
+            locationsObj, seasonsObj, radarsObj = _getPathDimensions(
+                models, inLocationName, inSeasonGroup, inSeason, inRadar)
 
-        # Check of the segment exists already:
-        segmentsObj = models.segments.objects.filter(
-            season_id=seasonsObj.pk,
-            radar_id=radarsObj.pk,
-            name=inSegment).values_list(
-            'pk',
-            flat=True)
+        segmentOut, status = _createSegment(
+            models, locationsObj, seasonsObj, radarsObj, data, timer)
+        if not status:
+            return utility.response(0, segmentOut, {})
+        segmentsObj, pointPaths, validationReport, replacedFrameIds = segmentOut
 
-        if segmentsObj:
-            errorStr = 'SEGMENT %s HAS ALREADY BEEN CREATED' % inSegment
-            logging.warning(
-                'SEGMENT %s of SEASON %s WAS ALREADY CREATED.',
-                inSegment,
-                inSeason)
-            return utility.response(0, errorStr, {})
+        with timer.phase('encode'):
+            pointPathColumns = pgcopy.pointPathColumns(
+                locationsObj.pk, seasonsObj.pk, segmentsObj.pk, **pointPaths)
 
-        # Create the segment if it does not exist.
-        segmentsObj, _ = models.segments.objects.get_or_create(
-            season_id=seasonsObj.pk, radar_id=radarsObj.pk, name=inSegment, geom=linePathGeom, crossover_calc=False)
-
-        logging.info('Segment %s of season %s has been created.', inSegment, inSeason)
-
-        frmPks = []
-        for frmId in range(int(inFrameCount)):
-            frameName = inSegment + ("_%03d" % (frmId + 1))
-            frmObj, _ = models.frames.objects.get_or_create(
-                name=frameName, segment_id=segmentsObj.pk)  # get or create the frame object
-            frmPks.append(frmObj.pk)  # store the pk for use in point paths
-
-        # Open a temporary file to hold point path records
-        # Centos 7 places tmp files into service-level subdirs which do not reflect the path returned in Python
-        # Instead, create a dir in /db/
-        temppath = opsSettings.OPS_DATA_PATH + "datapacktmp/createPath"
-        os.makedirs(temppath, mode=0o777, exist_ok=True)
-
-        with tempfile.NamedTemporaryFile(mode='w', prefix='tmp_', dir=temppath, suffix='_pointPaths.csv', delete=False) as f:
-
-            # Create a csv writer object
-            fwrite = csv.writer(f, delimiter=',')
-
-            for ptIdx, ptGeom in enumerate(linePathGeom):
-                # get the frame pk (based on start gps time list)
-                frmId = frmPks[max([gpsIdx for gpsIdx in range(
-                    len(inFrameStartGpsTimes)) if inFrameStartGpsTimes[gpsIdx] <= inGpsTime[ptIdx]])]
-                # Create a GEOSGeometry of the point path
-                pointPathGeom = GEOSGeometry('POINT Z (' +
-                                             repr(ptGeom[0]) +
-                                             ' ' +
-                                             repr(ptGeom[1]) +
-                                             ' ' +
-                                             str(inElevation[ptIdx]) +
-                                             ')', srid=4326)  # create a point geometry object
-                # Write the row to the temp csv file
-                fwrite.writerow([locationsObj.pk,
-                                 seasonsObj.pk,
-                                 segmentsObj.pk,
-                                 frmId,
-                                 inGpsTime[ptIdx],
-                                 inRoll[ptIdx],
-                                 inPitch[ptIdx],
-                                 inHeading[ptIdx],
-                                 str(pointPathGeom.hexewkb.decode()), 
-                                 True])
+        replaceReport = None
+        if replacedFrameIds:
+            # swap the new point paths in for the old ones, keeping the layer points
+            replaceReport = _replacePointPaths(app, segmentsObj, replacedFrameIds, pointPathColumns, timer)
 
-        logging.info(
-            'Point paths CSV for segment %s of season %s has now been created (%s).',
-            inSegment,
-            inSeason,
-            f.name)
-        # Create a cursor to interact with the database
-        cursor = connection.cursor()
-        try:
-            # Change permissions on temp file to allow postgres read permission
-            os.chmod(f.name, 100)
-            # Copy the point paths from the temp csv to the databse.
-            copySql = """COPY {app}_point_paths (location_id, season_id, segment_id, frame_id, gps_time, roll, pitch, heading, geom, key_point)
-                         FROM %s
-                         DELIMITER ',';""".format(app=app)
-            cursor.execute(copySql, [f.name])
-            logging.info(
-                'Point paths CSV for segment %s of season %s has been copied to the database.',
-                inSegment,
-                inSeason)
-            # Remove the temporary file.
-            os.remove(f.name)
+        else:
+            # Create a cursor to interact with the database
+            cursor = connection.cursor()
+            try:
+                # Stream the point paths to the database in the PGCOPY binary format
+                with timer.phase('copy', len(pointPaths['gpsTime'])):
+                    pgcopy.copyBinary(cursor, app + '_point_paths', pgcopy.POINT_PATH_COLUMNS, pointPathColumns)
+                maintenance.recordRowsChanged(app + '_point_paths', len(pointPaths['gpsTime']))
+                logging.info(
+                    'Point paths for segment %s of season %s have been copied to the database.',
+                    inSegment,
+                    inSeason)
 
-        except Exception as e:
-            return utility.errorCheck(e, sys)
-        finally:
-            cursor.close()
+            except Exception as e:
+                return utility.errorCheck(e, sys)
+            finally:
+                cursor.close()
 
         logging.info(
             'Segment %s of season %s was successfully inserted.',
             inSegment,
             inSeason)
-        return utility.response(1, 'SUCCESS: PATH INSERTION COMPLETED.', {})
+        timer.save(models, inSeason, inSegment)
+        return _pathInsertedResponse(validationReport, replaceReport)
 
     except Exception as e:
         return utility.errorCheck(e, sys)
 
 
 @ipAuth()
-def crossoverCalculation(request):
-    """ Creates/Updates entries in the crossovers tables.
+@transaction.atomic()
+def createPathBatch(request):
+    """ Creates entries in the segments, frames, and point paths tables for many segments of one season.
+
+    The shared season, season group, location, and radar are resolved once and the point paths
+    of every segment are loaded in a single COPY stream.
+
+    Input:
+            season: (string) name of the season
+            season_group: (string) name of the season group
+            location: (string) name of the location
+            radar: (string) name of the radar
+            segments: (list of objects) one createPath input per segment, each with:
+                    geometry: (geojson) {'type':'LineString','coordinates',[longitude latitude]}
+                    properties: (object) elev, gps_time, roll, pitch, heading, segment, frame_count,
+                            and frame_start_gps_time as in createPath
+
+            The point arrays of a segment may instead be uploaded as a NumPy .npz file in a multipart
+            field named after the segment (see utility.getPathArrays).
+
+    Optional Input:
+            defer_indexes: (boolean) drop the non-essential point path indexes for the load and
+                    rebuild them before the request returns (root users only, see
+                    maintenance.deferIndexes)
+
+    Output:
+            status: (integer) 0:error 1:success 2:warning
+            data: (dictionary)
+                    segment: (list of strings) name of each input segment
+                    status: (list of integers) 0:error 1:success for each input segment
+                    message: (list of strings) status message for each input segment
+                    validation: (list of dictionaries) utility.validatePath report of each input segment
+                            (None if the segment failed before validation)
+                    replace: (list of dictionaries) _replacePointPaths report of each replaced segment
+                            (None for new and failed segments)
+
+    """
+
+    try:
+        timer = utility.PhaseTimer('createPathBatch')
+        with timer.phase('decode'):
+            models, data, app, cookies = utility.getInput(
+                request, floatDecode=True)  # get the input and models (numbers as floats)
+
+        userProfileObj, status = utility.getUserProfile(cookies)
+        if status:
+            if not userProfileObj.isRoot and not userProfileObj.createData:
+                return utility.response(
+                    0, 'ERROR: USER NOT AUTHORIZED TO CREATE DATA.', {})
+        else:
+            return utility.response(0, userProfileObj, {})
+
+        # parse the data input
+        inSeason = data['properties']['season']
+        inSeasonGroup = data['properties']['season_group']
+        inLocationName = data['properties']['location']
+        inRadar = data['properties']['radar']
+        inSegments = utility.forceList(data['properties']['segments'])
+        inDeferIndexes = utility.forceBool(data['properties'].get('defer_indexes', False))
+
+        if inDeferIndexes and not userProfileObj.isRoot:
+            return utility.response(
+                0, 'ERROR: USER NOT AUTHORIZED TO DEFER INDEXES.', {})
+
+        # Set up the basic logging configuration for createPath:
+        logging.basicConfig(
+            filename=opsSettings.OPS_DATA_PATH +
+            'django_logs/createPath.log',
+            format='%(levelname)s :: %(asctime)s :: %(message)s',
+            datefmt='%c',
+            level=logging.DEBUG)
+        logging.info('%d segments of season %s are now loading', len(inSegments), inSeason)
+
+        with timer.phase('dimensions'):
+            locationsObj, seasonsObj, radarsObj = _getPathDimensions(
+                models, inLocationName, inSeasonGroup, inSeason, inRadar)
+
+        # With defer_indexes the point path indexes are dropped for the load and rebuilt before
+        # the request returns, all in the request's transaction (see maintenance.deferIndexes)
+        with maintenance.deferIndexes(app, ('point_paths',) if inDeferIndexes else (), timer):
+            outSegments = []
+            outStatus = []
+            outMessages = []
+            outValidation = []
+            outReplace = []
+            segmentIds = []
+            segmentPointPaths = []
+            for inSegmentData in inSegments:
+                inSegment = inSegmentData.get('properties', {}).get('segment')
+                replaceReport = None
+                try:
+                    # Roll back only this segment's rows if it fails
+                    with timer.phase('decode'):
+                        pathArrays = utility.getPathArrays(request, inSegment)
+                    if pathArrays is not None:
+                        inSegmentData['properties'].update(pathArrays)
+                    with transaction.atomic():
+                        segmentOut, status = _createSegment(
+                            models, locationsObj, seasonsObj, radarsObj, inSegmentData, timer)
+                        if status and segmentOut[3]:
+                            # a replaced segment is swapped on its own (new segments share one COPY)
+                            with timer.phase('encode'):
+                                pointPathColumns = pgcopy.pointPathColumns(
+                                    locationsObj.pk, seasonsObj.pk, segmentOut[0].pk, **segmentOut[1])
+                            replaceReport = _replacePointPaths(
+                                app, segmentOut[0], segmentOut[3], pointPathColumns, timer)
+                except Exception as e:
+                    segmentOut, status = str(e), False
+                    logging.warning(
+                        'Segment %s of season %s failed: %s', inSegment, inSeason, segmentOut)
+
+                outSegments.append(inSegment)
+                outStatus.append(int(status))
+                outReplace.append(replaceReport)
+                if status:
+                    segmentsObj, pointPaths, validationReport, replacedFrameIds = segmentOut
+                    if replacedFrameIds:
+                        outMessages.append('SUCCESS: PATH REPLACEMENT COMPLETED.')
+                    else:
+                        segmentIds.append(np.full(len(pointPaths['frameIds']), segmentsObj.pk))
+                        segmentPointPaths.append(pointPaths)
+                        outMessages.append('SUCCESS: PATH INSERTION COMPLETED.')
+                    outValidation.append(validationReport)
+                elif isinstance(segmentOut, dict):
+                    outMessages.append(segmentOut['message'])
+                    outValidation.append(segmentOut['validation'])
+                else:
+                    outMessages.append(segmentOut)
+                    outValidation.append(None)
+
+            if segmentPointPaths:
+                segmentIds = np.concatenate(segmentIds)
+                with timer.phase('encode'):
+                    pointPathColumns = pgcopy.pointPathColumns(
+                        locationsObj.pk,
+                        seasonsObj.pk,
+                        segmentIds,
+                        **{key: np.concatenate([pointPaths[key] for pointPaths in segmentPointPaths])
+                           if segmentPointPaths[0][key] is not None else None
+                           for key in segmentPointPaths[0]})
+
+                # Create a cursor to interact with the database
+                cursor = connection.cursor()
+                try:
+                    # Stream the point paths of all segments to the database in one COPY
+                    with timer.phase('copy', len(segmentIds)):
+                        pgcopy.copyBinary(cursor, app + '_point_paths', pgcopy.POINT_PATH_COLUMNS, pointPathColumns)
+                    maintenance.recordRowsChanged(app + '_point_paths', len(segmentIds))
+                    logging.info(
+                        'Point paths for %d segments of season %s have been copied to the database.',
+                        len(segmentPointPaths),
+                        inSeason)
+                finally:
+                    cursor.close()
+
+        timer.save(models, inSeason)
+
+        outData = {'segment': outSegments, 'status': outStatus, 'message': outMessages,
+                   'validation': outValidation, 'replace': outReplace}
+        if all(outStatus):
+            return utility.response(1, outData, {})
+        elif any(outStatus):
+            return utility.response(2, outData, {})
+        else:
+            return utility.response(0, outData, {})
+
+    except Exception as e:
+        return utility.errorCheck(e, sys)
+
+
+@ipAuth()
+def createPathUpload(request):
+    """ Opens an upload session for a segment whose point arrays are sent in numbered chunks.
 
     Input:
-            geometry: (geojson) {'type':'LineString','coordinates',[longitude latitude]}
             season: (string) name of the season
             season_group: (string) name of the season group
             location: (string) name of the location
             radar: (string) name of the radar
             segment: (string) name of the segment
+            frame_count: (integer) number of frames for the given segment
+            frame_start_gps_time: (list of floats) start gps time for each frame for the given segment
+
+    Optional Input:
+            chunk_count: (integer) number of chunks that will be sent (checked on commit)
+            clean: (string) validation clean mode applied on commit (see createPath)
+            replace: (boolean) replace the segment on commit if it exists (see createPath)
+
+    Output:
+            status: (integer) 0:error 1:success 2:warning
+            data:
+                    upload_id: (string) id of the upload session used by the chunk and commit calls
+
+    Chunks are sent to create/path/upload/chunk, and create/path/upload/commit loads them with a
+    single COPY. Received chunks are staged on disk, so a failed chunk can be resent on its own.
+
+    """
+    try:
+        models, data, app, cookies = utility.getInput(
+            request, floatDecode=True)  # get the input and models (numbers as floats)
+
+        userProfileObj, status = utility.getUserProfile(cookies)
+        if status:
+            if not userProfileObj.isRoot and not userProfileObj.createData:
+                return utility.response(
+                    0, 'ERROR: USER NOT AUTHORIZED TO CREATE DATA.', {})
+        else:
+            return utility.response(0, userProfileObj, {})
+
+        # parse the data input
+        uploadProperties = {}
+        for field in ['season', 'season_group', 'location', 'radar', 'segment', 'frame_count']:
+            uploadProperties[field] = data['properties'][field]
+        uploadProperties['frame_start_gps_time'] = utility.forceList(
+            data['properties']['frame_start_gps_time'])
+        uploadProperties['chunk_count'] = data['properties'].get('chunk_count')
+        uploadProperties['clean'] = data['properties'].get('clean')
+        uploadProperties['replace'] = utility.forceBool(data['properties'].get('replace', False))
+        uploadProperties['app'] = app
+
+        # fail early if the segment already exists (and is not being replaced), resolving the
+        # season and radar as the commit will (see _createSegment)
+        if not uploadProperties['replace']:
+            _, seasonsObj, radarsObj = _getPathDimensions(
+                models, uploadProperties['location'], uploadProperties['season_group'],
+                uploadProperties['season'], uploadProperties['radar'], create=False)
+            if seasonsObj is not None and radarsObj is not None and models.segments.objects.filter(
+                    season_id=seasonsObj.pk,
+                    radar_id=radarsObj.pk,
+                    name=uploadProperties['segment']).exists():
+                return utility.response(
+                    0, 'SEGMENT %s HAS ALREADY BEEN CREATED' % uploadProperties['segment'], {})
+
+        # create the staging directory of the upload session
+        uploadId = utility.randId(20)
+        os.makedirs(_uploadPath(uploadId, exists=False))
+        with open(_uploadPath(uploadId, 'upload.json'), 'w') as uploadFile:
+            ujson.dump(uploadProperties, uploadFile)
+
+        return utility.response(1, {'upload_id': uploadId}, {})
+
+    except Exception as e:
+        return utility.errorCheck(e, sys)
+
+
+@ipAuth()
+def createPathUploadChunk(request):
+    """ Stages one numbered chunk of the point arrays of an upload session.
+
+    Input:
+            upload_id: (string) id of the upload session (from create/path/upload)
+            chunk: (integer) number of the chunk, from 1 to the chunk_count of the session (chunks
+                    are joined in this order)
+            gps_time, lon, lat, elev, roll, pitch, heading: (list of floats) point arrays of the chunk
+                    OR
+            a NumPy .npz file with the same arrays in the multipart field 'path'
+
+    Output:
+            status: (integer) 0:error 1:success 2:warning
+            data:
+                    upload_id: (string) id of the upload session
+                    chunk: (integer) number of the staged chunk
+                    point_count: (integer) number of points in the staged chunk
+
+    Sending a chunk number again replaces the staged chunk.
+
+    """
+    try:
+        models, data, app, cookies = utility.getInput(
+            request, floatDecode=True)  # get the input and models (numbers as floats)
+
+        userProfileObj, status = utility.getUserProfile(cookies)
+        if status:
+            if not userProfileObj.isRoot and not userProfileObj.createData:
+                return utility.response(
+                    0, 'ERROR: USER NOT AUTHORIZED TO CREATE DATA.', {})
+        else:
+            return utility.response(0, userProfileObj, {})
+
+        # parse the data input
+        inUploadId = data['properties']['upload_id']
+        inChunk = int(data['properties']['chunk'])
+        if inChunk < 1:
+            return utility.response(0, 'ERROR: CHUNK NUMBERS START AT 1.', {})
+
+        uploadProperties = _uploadState(inUploadId)[0]
+        if uploadProperties['app'] != app:
+            return utility.response(0, 'ERROR: UPLOAD %s BELONGS TO ANOTHER APPLICATION.' % inUploadId, {})
+        if uploadProperties['chunk_count'] is not None and inChunk > int(uploadProperties['chunk_count']):
+            raise Exception('CHUNK %d IS BEYOND THE CHUNK COUNT (%d) OF UPLOAD %s' % (
+                inChunk, int(uploadProperties['chunk_count']), inUploadId))
+
+        pathArrays = utility.getPathArrays(request)
+        if pathArrays is None:
+            pathArrays = utility.checkPathArrays(data['properties'])
+
+        # write the chunk under a temporary name first so a dropped request never leaves a partial chunk
+        chunkPath = _uploadPath(inUploadId, 'chunk_%06d.npz' % inChunk)
+        with open(chunkPath + '.tmp', 'wb') as chunkFile:
+            np.savez(chunkFile, **pathArrays)
+        os.replace(chunkPath + '.tmp', chunkPath)
+
+        return utility.response(1,
+                                {'upload_id': inUploadId,
+                                 'chunk': inChunk,
+                                 'point_count': len(pathArrays['gps_time'])},
+                                {})
+
+    except Exception as e:
+        return utility.errorCheck(e, sys)
+
+
+@ipAuth()
+def getPathUpload(request):
+    """ Gets the state of an upload session so that an interrupted upload can be resumed.
+
+    Input:
+            upload_id: (string) id of the upload session
+
+    Output:
+            status: (integer) 0:error 1:success 2:warning
+            data:
+                    upload_id: (string) id of the upload session
+                    segment: (string) name of the segment of the upload session
+                    chunk_count: (integer) number of expected chunks (None if not given)
+                    chunk: (list of integers) numbers of the chunks staged so far
+
+    """
+    try:
+        models, data, app, cookies = utility.getInput(
+            request)  # get the input and models
+
+        userProfileObj, status = utility.getUserProfile(cookies)
+        if status:
+            if not userProfileObj.isRoot and not userProfileObj.createData:
+                return utility.response(
+                    0, 'ERROR: USER NOT AUTHORIZED TO CREATE DATA.', {})
+        else:
+            return utility.response(0, userProfileObj, {})
+
+        # parse the data input
+        inUploadId = data['properties']['upload_id']
+
+        uploadProperties, chunkNumbers = _uploadState(inUploadId)
+        if uploadProperties['app'] != app:
+            return utility.response(0, 'ERROR: UPLOAD %s BELONGS TO ANOTHER APPLICATION.' % inUploadId, {})
+
+        return utility.response(1,
+                                {'upload_id': inUploadId,
+                                 'segment': uploadProperties['segment'],
+                                 'chunk_count': uploadProperties['chunk_count'],
+                                 'chunk': chunkNumbers},
+                                {})
+
+    except Exception as e:
+        return utility.errorCheck(e, sys)
+
+
+@ipAuth()
+@transaction.atomic()
+def createPathUploadCommit(request):
+    """ Creates the segment of an upload session from its staged chunks.
+
+    Input:
+            upload_id: (string) id of the upload session
 
     Output:
             status: (integer) 0:error 1:success 2:warning
             data: string status message
 
+    The chunks are joined in chunk number order and the point paths are loaded with one COPY.
+    The staged chunks are removed once the segment is committed to the database.
+
+    """
+    try:
+        timer = utility.PhaseTimer('createPathUploadCommit')
+        models, data, app, cookies = utility.getInput(
+            request)  # get the input and models
+
+        userProfileObj, status = utility.getUserProfile(cookies)
+        if status:
+            if not userProfileObj.isRoot and not userProfileObj.createData:
+                return utility.response(
+                    0, 'ERROR: USER NOT AUTHORIZED TO CREATE DATA.', {})
+        else:
+            return utility.response(0, userProfileObj, {})
+
+        # parse the data input
+        inUploadId = data['properties']['upload_id']
+
+        uploadProperties, chunkNumbers = _uploadState(inUploadId)
+        if uploadProperties['app'] != app:
+            return utility.response(0, 'ERROR: UPLOAD %s BELONGS TO ANOTHER APPLICATION.' % inUploadId, {})
+        inSeason = uploadProperties['season']
+        inSegment = uploadProperties['segment']
+
+        # check that every chunk has arrived
+        chunkCount = uploadProperties['chunk_count']
+        if chunkCount is None:
+            chunkCount = max(chunkNumbers) if chunkNumbers else 0
+        missingChunks = sorted(set(range(1, int(chunkCount) + 1)) - set(chunkNumbers))
+        if not chunkNumbers or missingChunks:
+            return utility.response(
+                0, 'ERROR: UPLOAD IS MISSING CHUNKS: %s' % missingChunks, {})
+        extraChunks = [chunkNumber for chunkNumber in chunkNumbers if chunkNumber > int(chunkCount)]
+        if extraChunks:
+            return utility.response(
+                0, 'ERROR: UPLOAD HAS CHUNKS BEYOND ITS CHUNK COUNT: %s' % extraChunks, {})
+
+        # Set up the basic logging configuration for createPath:
+        logging.basicConfig(
+            filename=opsSettings.OPS_DATA_PATH +
+            'django_logs/createPath.log',
+            format='%(levelname)s :: %(asctime)s :: %(message)s',
+            datefmt='%c',
+            level=logging.DEBUG)
+        logging.info(
+            'Segment %s of season %s is now loading from %d chunks', inSegment, inSeason, len(chunkNumbers))
+
+        # join the staged chunks into the point arrays of the segment
+        with timer.phase('decode'):
+            chunkArrays = [
+                utility.loadPathArrays(_uploadPath(inUploadId, 'chunk_%06d.npz' % chunkNumber), 'CHUNK %d' % chunkNumber)
+                for chunkNumber in chunkNumbers]
+            for field in utility.PATH_ARRAY_FIELDS:
+                uploadProperties[field] = np.concatenate([pathArrays[field] for pathArrays in chunkArrays])
+            del chunkArrays
+
+        with timer.phase('dimensions'):
+            locationsObj, seasonsObj, radarsObj = _getPathDimensions(
+                models, uploadProperties['location'], uploadProperties['season_group'], inSeason, uploadProperties['radar'])
+
+        segmentOut, status = _createSegment(
+            models, locationsObj, seasonsObj, radarsObj, {'properties': uploadProperties}, timer)
+        if not status:
+            return utility.response(0, segmentOut, {})
+        segmentsObj, pointPaths, validationReport, replacedFrameIds = segmentOut
+
+        with timer.phase('encode'):
+            pointPathColumns = pgcopy.pointPathColumns(
+                locationsObj.pk, seasonsObj.pk, segmentsObj.pk, **pointPaths)
+
+        replaceReport = None
+        if replacedFrameIds:
+            # swap the new point paths in for the old ones, keeping the layer points
+            replaceReport = _replacePointPaths(app, segmentsObj, replacedFrameIds, pointPathColumns, timer)
+        else:
+            # Stream the point paths to the database in the PGCOPY binary format
+            with connection.cursor() as cursor, timer.phase('copy', len(pointPaths['gpsTime'])):
+                pgcopy.copyBinary(cursor, app + '_point_paths', pgcopy.POINT_PATH_COLUMNS, pointPathColumns)
+            maintenance.recordRowsChanged(app + '_point_paths', len(pointPaths['gpsTime']))
+
+        # remove the staged chunks only once the segment is in the database
+        uploadDir = _uploadPath(inUploadId)
+        transaction.on_commit(lambda: shutil.rmtree(uploadDir, ignore_errors=True))
+
+        logging.info(
+            'Segment %s of season %s was successfully inserted.',
+            inSegment,
+            inSeason)
+        timer.save(models, inSeason, inSegment)
+        return _pathInsertedResponse(validationReport, replaceReport)
+
+    except Exception as e:
+        return utility.errorCheck(e, sys)
+
+
+@ipAuth()
+def deletePathUpload(request):
+    """ Removes an upload session and its staged chunks without creating the segment.
+
+    Input:
+            upload_id: (string) id of the upload session
+
+    Output:
+            status: (integer) 0:error 1:success 2:warning
+            data: string status message
+
+    """
+    try:
+        models, data, app, cookies = utility.getInput(
+            request)  # get the input and models
+
+        userProfileObj, status = utility.getUserProfile(cookies)
+        if status:
+            if not userProfileObj.isRoot and not userProfileObj.createData:
+                return utility.response(
+                    0, 'ERROR: USER NOT AUTHORIZED TO CREATE DATA.', {})
+        else:
+            return utility.response(0, userProfileObj, {})
+
+        # parse the data input
+        inUploadId = data['properties']['upload_id']
+
+        shutil.rmtree(_uploadPath(inUploadId))
+
+        return utility.response(1, 'SUCCESS: UPLOAD REMOVED.', {})
+
+    except Exception as e:
+        return utility.errorCheck(e, sys)
+
+
+# Staged chunk file of an upload session (the chunk number may have any number of digits).
+UPLOAD_CHUNK_PATTERN = re.compile(r'^chunk_(\d+)\.npz$')
+
+
+def _uploadPath(uploadId, fileName=None, exists=True):
+    """ Gets the path of the staging directory (or a file in it) of an upload session.
+
+    Input:
+            uploadId: (string) id of the upload session
+            fileName: (string) name of a file in the staging directory
+            exists: (boolean) require the staging directory to exist
+
+    Output:
+            uploadPath: (string) path of the staging directory or file
+
+    """
+    # upload ids are generated by utility.randId; anything else could escape the staging directory
+    if not isinstance(uploadId, str) or not uploadId.isalnum():
+        raise Exception('INVALID UPLOAD ID')
+    uploadDir = os.path.join(opsSettings.OPS_DATA_PATH, 'data/uploads', uploadId)
+    if exists and not os.path.isdir(uploadDir):
+        raise Exception('UPLOAD %s DOES NOT EXIST' % uploadId)
+    if fileName is None:
+        return uploadDir
+    return os.path.join(uploadDir, fileName)
+
+
+def _uploadState(uploadId):
+    """ Gets the properties and the staged chunk numbers of an upload session.
+
+    Input:
+            uploadId: (string) id of the upload session
+
+    Output:
+            uploadProperties: (dictionary) app and createPath properties given when the session was opened
+            chunkNumbers: (list of integers) sorted numbers of the staged chunks
+
+    """
+    with open(_uploadPath(uploadId, 'upload.json')) as uploadFile:
+        uploadProperties = ujson.load(uploadFile)
+
+    chunkNumbers = []
+    for fileName in os.listdir(_uploadPath(uploadId)):
+        chunkMatch = UPLOAD_CHUNK_PATTERN.match(fileName)
+        if chunkMatch:
+            chunkNumbers.append(int(chunkMatch.group(1)))
+
+    return uploadProperties, sorted(chunkNumbers)
+
+
+def _pathInsertedResponse(validationReport, replaceReport=None):
+    """ Creates the response of an inserted path (a warning with the reports if points were cleaned or picks lost).
+
+    Input:
+            validationReport: (dictionary) report from utility.validatePath
+            replaceReport: (dictionary) report from _replacePointPaths (None for a new segment)
+
+    Output:
+            HttpResponse: see utility.response()
+
+    """
+    outData = {'validation': validationReport}
+    if replaceReport is not None:
+        outData['replace'] = replaceReport
+    if validationReport['kept_count'] < validationReport['point_count'] or validationReport['repaired']['count']:
+        outData['message'] = 'WARNING: PATH INSERTED AFTER CLEANING.'
+        return utility.response(2, outData, {})
+    if replaceReport is not None and (replaceReport['layer_points_dropped'] or replaceReport['landmarks_dropped']):
+        outData['message'] = 'WARNING: PATH REPLACED, SOME LAYER POINTS OR LANDMARKS COULD NOT BE RE-ATTACHED.'
+        return utility.response(2, outData, {})
+    if replaceReport is not None:
+        return utility.response(1, 'SUCCESS: PATH REPLACEMENT COMPLETED.', {})
+    return utility.response(1, 'SUCCESS: PATH INSERTION COMPLETED.', {})
+
+
+def _getPathDimensions(models, inLocationName, inSeasonGroup, inSeason, inRadar, create=True):
+    """ Gets or creates the location, season group, season, and radar shared by the segments of a season.
+
+    Input:
+            models: (named tuple) django model objects for the given application
+            inLocationName: (string) name of the location
+            inSeasonGroup: (string) name of the season group
+            inSeason: (string) name of the season
+            inRadar: (string) name of the radar
+            create: (boolean) create the missing rows; if False only look them up
+
+    Output:
+            locationsObj: (object) locations model instance (None if missing and not created)
+            seasonsObj: (object) seasons model instance (None if missing and not created)
+            radarsObj: (object) radars model instance (None if missing and not created)
+
+    """
+    if not create:
+        locationsObj = models.locations.objects.filter(name=inLocationName.lower()).first()
+        seasonsObj = models.seasons.objects.filter(
+            name=inSeason, season_group__name=inSeasonGroup, location__name=inLocationName.lower()).first()
+        radarsObj = models.radars.objects.filter(name=inRadar.lower()).first()
+        return locationsObj, seasonsObj, radarsObj
+
+    locationsObj, _ = models.locations.objects.get_or_create(
+        name=inLocationName.lower())  # get or create the location
+    seasonGroupsObj, _ = models.season_groups.objects.get_or_create(
+        name=inSeasonGroup)  # get or create the season
+    seasonsObj, _ = models.seasons.objects.get_or_create(
+        name=inSeason, season_group_id=seasonGroupsObj.pk, location_id=locationsObj.pk)  # get or create the season
+    radarsObj, _ = models.radars.objects.get_or_create(
+        name=inRadar.lower())  # get or create the radar
+
+    return locationsObj, seasonsObj, radarsObj
+
+
+def _createSegment(models, locationsObj, seasonsObj, radarsObj, segmentData, timer):
+    """ Creates a segment and its frames and prepares its point paths for pgcopy.pointPathColumns.
+
+    Input:
+            models: (named tuple) django model objects for the given application
+            locationsObj: (object) locations model instance of the segment
+            seasonsObj: (object) seasons model instance of the segment
+            radarsObj: (object) radars model instance of the segment
+            segmentData: (dictionary) createPath input with 'geometry' and 'properties', or with
+                    'properties' holding lon and lat arrays (utility.getPathArrays) instead of 'geometry'.
+                    The optional property clean ('none', 'drop' or 'repair') is passed to
+                    utility.validatePath. If the optional property replace is true an existing
+                    segment is kept and given new frames (see _replacePointPaths).
+            timer: (object) utility.PhaseTimer of the run (validate, segment and encode phases are added)
+
+    Output:
+            segmentOut: (tuple) segments model instance, a dictionary of point path arrays
+                    (frameIds, gpsTime, roll, pitch, heading, geomEwkb, geomProjEwkb), the validation report and
+                    the ids of the frames being replaced (empty for a new segment),
+                    or an error string (segment exists) or dictionary (message and validation report)
+            status: (boolean) False if the segment already exists (and is not replaced) or its
+                    points failed validation
+
+    """
+    # parse the data input
+    inSegment = segmentData['properties']['segment']
+    inFrameCount = segmentData['properties']['frame_count']
+    inFrameStartGpsTimes = utility.forceList(
+        segmentData['properties']['frame_start_gps_time'])
+    inClean = segmentData['properties'].get('clean')
+    inReplace = utility.forceBool(segmentData['properties'].get('replace', False))
+
+    pathArrays = {}
+    for field in ['gps_time', 'elev', 'roll', 'pitch', 'heading']:
+        pathArrays[field] = segmentData['properties'][field]
+    if 'lon' in segmentData['properties']:
+        # columnar upload: the coordinates are already arrays
+        pathArrays['lon'] = segmentData['properties']['lon']
+        pathArrays['lat'] = segmentData['properties']['lat']
+    else:
+        lineCoords = np.asarray(GEOSGeometry(ujson.dumps(segmentData['geometry'])).coords, dtype=np.float64)
+        pathArrays['lon'] = lineCoords[:, 0]
+        pathArrays['lat'] = lineCoords[:, 1]
+
+    # check every point array at once before anything is written
+    with timer.phase('validate', len(pathArrays['gps_time'])):
+        pathArrays, validationReport = utility.validatePath(pathArrays, inClean)
+    if not validationReport['valid']:
+        logging.warning(
+            'SEGMENT %s of SEASON %s FAILED VALIDATION: %s',
+            inSegment,
+            seasonsObj.name,
+            validationReport)
+        return {'message': 'ERROR: SEGMENT %s FAILED VALIDATION.' % inSegment,
+                'validation': validationReport}, False
+
+    inGpsTime = pathArrays['gps_time']
+    lineX = pathArrays['lon']
+    lineY = pathArrays['lat']
+
+    segmentStart = time.perf_counter()
+
+    # build the line from the coordinate arrays without per-point objects
+    linePathGeom = GEOSGeometry(memoryview(pgcopy.ewkbLineString(lineX, lineY)))
+
+    # project the points once for the geom_proj columns (left NULL for unmapped locations)
+    projEpsg = utility.LOCATION_EPSG.get(locationsObj.name)
+    if projEpsg is not None:
+        projX, projY = utility.transformCoords(lineX, lineY, 4326, projEpsg)
+        lineProjGeom = GEOSGeometry(memoryview(pgcopy.ewkbLineString(projX, projY, srid=0)))
+    else:
+        lineProjGeom = None
+
+    # Check of the segment exists already:
+    segmentsObj = models.segments.objects.filter(
+        season_id=seasonsObj.pk,
+        radar_id=radarsObj.pk,
+        name=inSegment).first()
+
+    replacedFrameIds = []
+    if segmentsObj is not None:
+        if not inReplace:
+            logging.warning(
+                'SEGMENT %s of SEASON %s WAS ALREADY CREATED.',
+                inSegment,
+                seasonsObj.name)
+            return 'SEGMENT %s HAS ALREADY BEEN CREATED' % inSegment, False
+
+        # keep the segment (and its id); its frames are swapped out by _replacePointPaths and
+        # clearing crossover_calc queues the segment for crossover recalculation
+        replacedFrameIds = list(models.frames.objects.filter(
+            segment_id=segmentsObj.pk).values_list('pk', flat=True))
+        segmentsObj.geom = linePathGeom
+        segmentsObj.geom_proj = lineProjGeom
+        segmentsObj.crossover_calc = False
+        segmentsObj.save()
+
+        logging.info('Segment %s of season %s is being replaced.', inSegment, seasonsObj.name)
+
+    else:
+        # Create the segment if it does not exist.
+        segmentsObj, _ = models.segments.objects.get_or_create(
+            season_id=seasonsObj.pk, radar_id=radarsObj.pk, name=inSegment, geom=linePathGeom,
+            geom_proj=lineProjGeom, crossover_calc=False)
+
+        logging.info('Segment %s of season %s has been created.', inSegment, seasonsObj.name)
+
+    # get the frame index of every point (based on start gps time list)
+    inFrameCount = int(inFrameCount)
+    frmIdxs = utility.assignFrames(inGpsTime, inFrameStartGpsTimes, np.arange(inFrameCount))
+    frmSummary = utility.summarizeFrames(frmIdxs, inFrameCount, inGpsTime, lineX, lineY)
+
+    # create all frames (with their gps bounds, point count and bounding box) in one insert
+    frmObjs = []
+    for frmIdx in range(inFrameCount):
+        frmObj = models.frames(
+            name=inSegment + ("_%03d" % (frmIdx + 1)),
+            segment_id=segmentsObj.pk,
+            point_count=int(frmSummary['point_count'][frmIdx]))
+        if frmObj.point_count > 0:
+            frmObj.start_gps_time = frmSummary['start_gps_time'][frmIdx]
+            frmObj.stop_gps_time = frmSummary['stop_gps_time'][frmIdx]
+            frmObj.bbox = Polygon.from_bbox((
+                frmSummary['min_lon'][frmIdx],
+                frmSummary['min_lat'][frmIdx],
+                frmSummary['max_lon'][frmIdx],
+                frmSummary['max_lat'][frmIdx]))
+            frmObj.bbox.srid = 4326
+        frmObjs.append(frmObj)
+    frmObjs = models.frames.objects.bulk_create(frmObjs)
+    maintenance.recordRowsChanged(models.frames._meta.db_table, inFrameCount)
+    timer.add('segment', time.perf_counter() - segmentStart, inFrameCount)
+
+    # get the frame pk for every point
+    frmIds = np.array([frmObj.pk for frmObj in frmObjs])[frmIdxs]
+
+    # Pack all point geometries as EWKB at once (sent to the database as-is)
+    with timer.phase('encode', len(inGpsTime)):
+        pointPathGeoms = pgcopy.ewkbPoints(lineX, lineY, pathArrays['elev'])
+        pointPathProjGeoms = pgcopy.ewkbPoints(projX, projY, srid=0) if projEpsg is not None else None
+
+    pointPaths = {
+        'frameIds': frmIds,
+        'gpsTime': inGpsTime,
+        'roll': pathArrays['roll'],
+        'pitch': pathArrays['pitch'],
+        'heading': pathArrays['heading'],
+        'geomEwkb': pointPathGeoms,
+        'geomProjEwkb': pointPathProjGeoms,
+    }
+
+    return (segmentsObj, pointPaths, validationReport, replacedFrameIds), True
+
+
+def _replacePointPaths(app, segmentsObj, replacedFrameIds, pointPathColumns, timer):
+    """ Swaps the point paths of a replaced segment for new ones, keeping its layer points.
+
+    Input:
+            app: (string) application name
+            segmentsObj: (object) segments model instance of the replaced segment
+            replacedFrameIds: (list of integers) ids of the segment's old frames
+            pointPathColumns: (list) new point path columns (see pgcopy.pointPathColumns)
+            timer: (object) utility.PhaseTimer of the run (copy, reattach and swap phases are added)
+
+    Output:
+            replaceReport: (dictionary)
+                    layer_points_reattached: (integer) layer points moved to a new point path
+                    layer_points_dropped: (integer) layer points with no new point path within one
+                            point spacing (deleted with the old point paths)
+                    landmarks_reattached: (integer) landmarks moved to new point paths
+                    landmarks_dropped: (integer) landmarks deleted with the old point paths
+
+    The new point paths are copied to a staging table first so that every layer point can be
+    matched to the new point path nearest in gps time before the live rows change. Then, in the
+    caller's transaction, the new point paths are inserted, the layer points (and landmarks) are
+    moved over, and the old frames are deleted along with their point paths and crossovers.
+
+    """
+    stagingTable = 'ops_staging_point_paths'
+    replaceReport = {}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DROP TABLE IF EXISTS {staging}; "
+                "CREATE TEMP TABLE {staging} (LIKE {app}_point_paths INCLUDING DEFAULTS) ON COMMIT DROP;".format(
+                    staging=stagingTable, app=app))
+
+            # the staged rows draw their ids from the point paths sequence
+            with timer.phase('copy', len(pointPathColumns[0])):
+                pgcopy.copyBinary(cursor, stagingTable, pgcopy.POINT_PATH_COLUMNS, pointPathColumns)
+
+            with timer.phase('reattach'):
+                cursor.execute("SELECT id, gps_time::float8 FROM {staging} ORDER BY gps_time;".format(
+                    staging=stagingTable))
+                newPointPaths = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 2)
+                newIds = newPointPaths[:, 0].astype(np.int64)
+                newGpsTimes = newPointPaths[:, 1]
+
+                # move each layer point to the nearest new point path (one per layer and point path)
+                cursor.execute(
+                    "SELECT lp.id, lp.layer_id, pp.gps_time::float8 FROM {app}_layer_points lp "
+                    "JOIN {app}_point_paths pp ON pp.id = lp.point_path_id WHERE pp.frame_id = ANY(%s);".format(app=app),
+                    [replacedFrameIds])
+                layerPoints = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 3)
+                newIdxs, gaps = utility.matchGpsTimes(layerPoints[:, 2], newGpsTimes)
+                keep = newIdxs >= 0
+                layerPointIds = layerPoints[keep, 0].astype(np.int64)
+                layerIds = layerPoints[keep, 1].astype(np.int64)
+                pointPathIds = newIds[newIdxs[keep]]
+                order = np.lexsort((gaps[keep], pointPathIds, layerIds))
+                _, firstIdxs = np.unique(
+                    np.stack([layerIds[order], pointPathIds[order]], axis=1), axis=0, return_index=True)
+                reattachIdxs = order[firstIdxs]
+                replaceReport['layer_points_reattached'] = len(reattachIdxs)
+                replaceReport['layer_points_dropped'] = len(layerPoints) - len(reattachIdxs)
+
+                # landmarks move only if both of their point paths are matched
+                cursor.execute(
+                    "SELECT lm.id, pp1.gps_time::float8, pp2.gps_time::float8, "
+                    "(pp1.frame_id = ANY(%s) AND pp2.frame_id = ANY(%s))::int FROM {app}_landmarks lm "
+                    "JOIN {app}_point_paths pp1 ON pp1.id = lm.point_path_1_id "
+                    "JOIN {app}_point_paths pp2 ON pp2.id = lm.point_path_2_id "
+                    "WHERE pp1.frame_id = ANY(%s) OR pp2.frame_id = ANY(%s);".format(app=app),
+                    [replacedFrameIds] * 4)
+                landmarks = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 4)
+                newIdxs1, _ = utility.matchGpsTimes(landmarks[:, 1], newGpsTimes)
+                newIdxs2, _ = utility.matchGpsTimes(landmarks[:, 2], newGpsTimes)
+                # a landmark that also spans another segment's point paths cannot be moved
+                keepLandmarks = (newIdxs1 >= 0) & (newIdxs2 >= 0) & (landmarks[:, 3] > 0)
+                replaceReport['landmarks_reattached'] = int(keepLandmarks.sum())
+                replaceReport['landmarks_dropped'] = len(landmarks) - replaceReport['landmarks_reattached']
+
+            # swap: insert the new point paths, move the picks over, then drop the old frames
+            with timer.phase('swap'):
+                cursor.execute("INSERT INTO {app}_point_paths SELECT * FROM {staging}; DROP TABLE {staging};".format(
+                    app=app, staging=stagingTable))
+                cursor.execute(
+                    "UPDATE {app}_layer_points lp SET point_path_id = m.point_path_id "
+                    "FROM unnest(%s::integer[], %s::integer[]) AS m(id, point_path_id) WHERE lp.id = m.id;".format(app=app),
+                    [layerPointIds[reattachIdxs].tolist(), pointPathIds[reattachIdxs].tolist()])
+                cursor.execute(
+                    "UPDATE {app}_landmarks lm SET point_path_1_id = m.point_path_1_id, point_path_2_id = m.point_path_2_id "
+                    "FROM unnest(%s::integer[], %s::integer[], %s::integer[]) AS m(id, point_path_1_id, point_path_2_id) "
+                    "WHERE lm.id = m.id;".format(app=app),
+                    [landmarks[keepLandmarks, 0].astype(np.int64).tolist(),
+                     newIds[newIdxs1[keepLandmarks]].tolist(),
+                     newIds[newIdxs2[keepLandmarks]].tolist()])
+
+                # delete the old frames and point paths along with their crossovers and the layer
+                # points and landmarks that were not re-attached (set based, unlike the ORM cascade)
+                deleteCounts = OrderedDict()
+                for table, columns in [('crossovers', ['point_path_1_id', 'point_path_2_id']),
+                                       ('layer_points', ['point_path_id']),
+                                       ('landmarks', ['point_path_1_id', 'point_path_2_id'])]:
+                    deleteCounts[app + '_' + table] = 0
+                    for column in columns:
+                        cursor.execute(
+                            "DELETE FROM {app}_{table} WHERE {column} IN "
+                            "(SELECT id FROM {app}_point_paths WHERE frame_id = ANY(%s));".format(
+                                app=app, table=table, column=column),
+                            [replacedFrameIds])
+                        deleteCounts[app + '_' + table] += cursor.rowcount
+                cursor.execute("DELETE FROM {app}_point_paths WHERE frame_id = ANY(%s);".format(app=app),
+                               [replacedFrameIds])
+                deleteCounts[app + '_point_paths'] = cursor.rowcount
+                cursor.execute("DELETE FROM {app}_frames WHERE id = ANY(%s);".format(app=app), [replacedFrameIds])
+                deleteCounts[app + '_frames'] = cursor.rowcount
+    except Exception:
+        # views return errors as responses, so make sure a half replaced segment is never committed
+        transaction.set_rollback(True)
+        raise
+
+    deleteCounts[app + '_point_paths'] += len(newIds)
+    deleteCounts[app + '_layer_points'] += replaceReport['layer_points_reattached']
+    for table, rowCount in deleteCounts.items():
+        maintenance.recordRowsChanged(table, rowCount)
+
+    logging.info(
+        'Point paths of segment %s have been replaced: %s', segmentsObj.name, replaceReport)
+    return replaceReport
+
+
+@ipAuth()
+def crossoverCalculation(request):
+    """ Creates/Updates entries in the crossovers tables.
+
+    Input:
+            segments: (integer or list of integers) ids of the segments to calculate crossovers for
+
+    Optional Input:
+            engine: (string) crossover engine ('sql' or 'strtree', see ops/crossovers.py; default
+                    settings.OPS_CROSSOVER_ENGINE)
+
+    Output:
+            status: (integer) 0:error 1:success 2:warning
+            data: string status message, or if any segment failed:
+                    segment: (list of integers) id of each input segment
+                    status: (list of integers) 0:error 1:success for each input segment
+                    message: (list of strings) status message for each input segment
+                    crossovers: (list of integers) number of crossovers inserted for each input segment
+
+    The segments are calculated one after another within the request; the calculate_crossovers
+    management command spreads large batches over worker processes instead.
+
     """
 
     try:
@@ -240,296 +1100,263 @@ def crossoverCalculation(request):
         if type(segments) == int:
             # Matlab arrays of one element are not JSONified into a list of one element
             segments = [segments]
-        for segment_id in segments:
+        segments = [int(segment_id) for segment_id in segments]
+        inEngine = data.get('engine', opsSettings.OPS_CROSSOVER_ENGINE)
+        if inEngine not in crossovers.CROSSOVER_ENGINES:
+            return utility.response(0, 'ERROR: UNKNOWN CROSSOVER ENGINE %s.' % inEngine, {})
 
-            cursor = connection.cursor()
+        outStatus, outCrossovers, outMessages = _calculateCrossovers(app, segments, inEngine)
+        maintenance.recordRowsChanged(app + '_crossovers', sum(outCrossovers))
 
-            try:
-                cursor.execute(f"SELECT name, season_id, radar_id from {app}_segments where id={segment_id};")
-                inSegment, season_id, radar_id = cursor.fetchone()
+        if not all(outStatus):
+            outData = {'segment': segments, 'status': outStatus, 'message': outMessages,
+                       'crossovers': outCrossovers}
+            logging.error("CROSSOVER CALCULATION FAILED FOR %d OF %d SEGMENTS", outStatus.count(0), len(segments))
+            return utility.response(2 if any(outStatus) else 0, outData, {})
 
-                cursor.execute(f"SELECT name, location_id, season_group_id from {app}_seasons where id={season_id};")
-                inSeason, location_id, season_group_id = cursor.fetchone()
+        logging.info("SUCCESS: CROSSOVER CALCULATION COMPLETED")
+        return utility.response(1, 'SUCCESS: CROSSOVER CALCULATION COMPLETED.', {})
 
-                cursor.execute(f"SELECT name from {app}_locations where id={location_id};")
-                inLocationName = cursor.fetchone()[0]
+    except Exception as e:
+        return utility.errorCheck(e, sys)
 
-                cursor.execute(f"SELECT name from {app}_radars where id={radar_id};")
-            except Exception as e:
-                return utility.errorCheck(e, sys)
-            finally:
-                cursor.close()
 
-            segmentsObj = models.segments.objects.get(id=segment_id)
+def _calculateCrossovers(app, segments, engine, workers=1):
+    """ Calculates the crossovers of a batch of segments (see _segmentCrossovers).
 
-            ### calculate and insert crossovers	###
-            logging.info(
-                'Non self-intersecting crossovers for segment %s of season %s are now being found.',
-                inSegment,
-                inSeason)
-            # Get the correct srid for the locaiton
-            proj = utility.epsgFromLocation(inLocationName)
-            # Create a GEOS Well Known Binary reader and initialize vars
-            cross_pts = []
-            cross_angles = []
-            point_path_1_id = []
-            point_path_2_id = []
-
-            # FIND ALL NON SELF-INTERSECTING CROSSOVERS
-            # Get the points of intersection, the closest point_path_id, and the angle
-            # in degrees for the current segment.
-            sql_str = """SET LOCAL work_mem = '15MB';
-                        WITH pts AS
-                            (select row_number() over (order by gps_time) AS rn, pp.id, pp.geom from {app}_point_paths pp where segment_id={seg} and key_point=true order by rn),
-                        LINE AS
-                            (SELECT ST_MakeLine(ST_GeomFromText('POINTZ('||ST_X(pts.geom)||' '||ST_Y(pts.geom)||' '||pts.rn||')', 4326)) AS ln
-                                FROM pts),
-                        i_pts AS
-                            (SELECT (ST_Dump(ST_Intersection(ST_Transform(line.ln,{proj}), ST_Transform(o.geom,{proj})))).geom AS i_pt
-                                FROM LINE, {app}_segments AS o
-                                    WHERE o.id != {seg} AND o.crossover_calc=true)
-
-                        SELECT ST_Transform(ST_Force2D(i_pt), 4326) AS i,
-                        pts1.id,
-                            CASE
-                                WHEN ST_Equals(i_pt, ST_Transform(pts1.geom,{proj})) THEN degrees(ST_Azimuth(i_pt, ST_Transform(pts2.geom,{proj})))
-                                ELSE degrees(ST_Azimuth(i_pt, ST_Transform(pts1.geom,{proj})))
-                            END
-                            FROM i_pts,
-                            pts AS pts1,
-                            pts AS pts2
-                        WHERE pts1.rn = ST_Z(i_pt)::int
-                        AND pts2.rn =
-                            (SELECT rn
-                            FROM pts
-                            WHERE rn != ST_Z(i_pts.i_pt)::int
-                            ORDER BY ABS(ST_Z(i_pts.i_pt)::int - rn) ASC
-                            LIMIT 1)
-                        ORDER BY i;""".format(app=app, proj=proj, seg=segmentsObj.pk)
-            cursor = connection.cursor()
-            try:
-                cursor.execute(sql_str)
-                cross_info1 = cursor.fetchall()
+    Input:
+            app: (string) application name
+            segments: (list of integers) ids of the segments
+            engine: (string) name of the crossover engine (see crossovers.CROSSOVER_ENGINES)
+            workers: (integer) number of worker processes the segments are spread over, each with
+                    its own database connection (only for the calculate_crossovers command; a web
+                    request must not fork)
 
-                # Only perform second query and processing if the above had results.
-                if cross_info1:
-                    # Get the closest point_path_id and the angle in degrees for the other
-                    # segments
-                    logging.info(
-                        'Closest points on intersecting segments for segment %s of season %s are now being found.',
-                        inSegment,
-                        inSeason)
+    Output:
+            status: (list of integers) 0:error 1:success for each segment
+            crossoverCount: (list of integers) number of crossovers inserted for each segment
+            message: (list of strings) status message for each segment
 
-                    sql_str = """SET LOCAL work_mem = '15MB';
-                                with segment_ids as (SELECT s2.id as ids
-                                        FROM {app}_segments AS s1, {app}_segments AS s2
-                                        WHERE s1.id = {seg}
-                                        AND s2.id != {seg} and s2.crossover_calc=true
-                                        AND ST_Intersects(s1.geom, s2.geom)),
-                                pts AS
-                                    (select row_number() over (order by gps_time) AS rn, pp.geom, pp.id, pp.segment_id from {app}_point_paths pp where segment_id in (select ids from segment_ids) and key_point=true order by segment_id, rn),
-                                LINE AS
-                                    (SELECT ST_MakeLine(ST_GeomFromText('POINTZ('||ST_X(pts.geom)||' '||ST_Y(pts.geom)||' '||pts.rn||')', 4326)) AS ln
-                                    FROM pts
-                                    GROUP BY pts.segment_id), 
-                                i_pts AS
-                                    (SELECT (ST_Dump(ST_Intersection(ST_Transform(line.ln,{proj}), ST_Transform(o.geom,{proj})))).geom AS i_pt
-                                    FROM LINE, {app}_segments AS o
-                                    WHERE o.id = {seg})
-                                SELECT pts1.id,
-                                    CASE
-                                        WHEN ST_Equals(i_pt, ST_Transform(pts1.geom,{proj})) THEN degrees(ST_Azimuth(i_pt, ST_Transform(pts2.geom,{proj})))
-                                        ELSE degrees(ST_Azimuth(i_pt, ST_Transform(pts1.geom,{proj})))
-                                    END
-                                FROM i_pts,
-                                    pts AS pts1,
-                                    pts AS pts2
-                                WHERE pts1.rn = ST_Z(i_pt)::int
-                                AND pts2.rn =
-                                    (SELECT rn
-                                    FROM pts
-                                    WHERE rn != ST_Z(i_pts.i_pt)::int
-                                    ORDER BY ABS(ST_Z(i_pts.i_pt)::int - rn) ASC
-                                    LIMIT 1)
-                                ORDER BY ST_Transform(ST_Force2D(i_pt), 4326);""".format(app=app, proj=proj, seg=segmentsObj.pk)
-                    cursor.execute(sql_str)
-                    cross_info2 = cursor.fetchall()
-
-                    if cross_info2:
-                        # Extract all crossovers from above results.
-                        for idx in range(len(cross_info1)):
-                            cross_pts.append(cross_info1[idx][0])
-                            point_path_1_id.append(cross_info1[idx][1])
-                            point_path_2_id.append(cross_info2[idx][0])
-                            # Determine the angle of intersection
-                            angle1 = cross_info1[idx][2]
-                            angle2 = cross_info2[idx][1]
-                            angle = math.fabs(angle1 - angle2)
-                            # Only record the acute angle.
-                            if angle > 90:
-                                angle = math.fabs(180 - angle)
-                                if angle > 90:
-                                    angle = math.fabs(180 - angle)
-                            cross_angles.append(angle)
+    The inserted crossovers are not counted for the background ANALYZE (see
+    maintenance.recordRowsChanged); the caller does that in its own process.
 
-                    else:
-                        # This should not occur.
-                        # Only reached if no crossover information is returned from second query
-                        # But second query is only executed if first query finds crossovers
-                        # If this occurs while editing the queries, likely one no longer matches the other in
-                        logging.error("ERROR FINDING MATCHING CROSSOVER POINT PATHS ON INTERSECTING LINES")
-                        return utility.response(
-                            0, "ERROR FINDING MATCHING CROSSOVER POINT PATHS ON INTERSECTING LINES", {})
-
-                # FIND ALL SELF-INTERSECTING CROSSOVERS:
-                # Fetch the given line path from the db as a multilinestring.
-                # 'ST_UnaryUnion' results in a multilinestring with the last point of
-                # every linestring except the last linestring as a crossover and the
-                # first point of every linestring except the first linestring as a
-                # crossover.
+    """
+    # Each segment is intersected with the calculated segments outside of the batch and the
+    # segments before it in the batch, so every pair of batch segments is found exactly once
+    # whatever order the segments finish in.
+    workers = max(1, min(workers, len(segments)))
+    jobs = [(app, segment_id, segments[:idx], segments[idx + 1:], engine, workers > 1)
+            for idx, segment_id in enumerate(segments)]
+    if workers > 1:
+        # the worker processes must open their own connections (none may be inherited)
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+            results = list(executor.map(_crossoverWorker, jobs))
+    else:
+        results = [_crossoverWorker(job) for job in jobs]
+    outStatus, outCrossovers, outMessages = (list(values) for values in zip(*results))
+
+    # The crossovers of a failed segment with the later segments of the batch are found again
+    # when it is recalculated.
+    for idx, segment_id in enumerate(segments):
+        if not outStatus[idx]:
+            laterIds = [segments[laterIdx] for laterIdx in range(idx + 1, len(segments)) if outStatus[laterIdx]]
+            if laterIds:
+                _discardCrossovers(app, segment_id, laterIds)
+
+    return outStatus, outCrossovers, outMessages
+
+
+def _crossoverWorker(job):
+    """ Calculates the crossovers of one segment of a crossoverCalculation batch (see _segmentCrossovers).
+
+    Input:
+            job: (tuple) app, segment id, ids of the batch segments before and after it, the
+                    crossover engine and whether this runs in a worker process (which closes its
+                    connection when done)
+
+    Output:
+            status: (integer) 0:error 1:success
+            crossoverCount: (integer) number of crossovers inserted
+            message: (string) status message
+
+    """
+    app, segment_id, earlierIds, laterIds, engine, inWorker = job
+    try:
+        crossoverCount = _segmentCrossovers(app, segment_id, earlierIds, laterIds, engine)
+        return 1, crossoverCount, 'SUCCESS: CROSSOVER CALCULATION COMPLETED.'
+    except Exception as e:
+        logging.exception('Crossover calculation of segment %s failed.', segment_id)
+        return 0, 0, 'ERROR: %s' % e
+    finally:
+        if inWorker:
+            connection.close()
+
+
+def _segmentCrossovers(app, segment_id, earlierIds, laterIds, engine='sql'):
+    """ Finds, inserts and flags the crossovers of one segment.
+
+    Input:
+            app: (string) application name
+            segment_id: (integer) id of the segment
+            earlierIds: (list of integers) ids of the batch segments before this one (always intersected)
+            laterIds: (list of integers) ids of the batch segments after this one (never intersected)
+            engine: (string) name of the crossover engine (see crossovers.CROSSOVER_ENGINES)
+
+    Output:
+            crossoverCount: (integer) number of crossovers inserted
+
+    The crossovers are inserted and the segment flagged (crossover_calc) in one transaction.
+
+    """
+    models = utility.getAppModels(app)
+
+    timer = utility.PhaseTimer('crossoverCalculation')
+    lookupStart = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT name, season_id, radar_id from {app}_segments where id={segment_id};")
+        inSegment, season_id, radar_id = cursor.fetchone()
+
+        cursor.execute(f"SELECT name, location_id, season_group_id from {app}_seasons where id={season_id};")
+        inSeason, location_id, season_group_id = cursor.fetchone()
+
+        cursor.execute(f"SELECT name from {app}_locations where id={location_id};")
+        inLocationName = cursor.fetchone()[0]
+
+    segmentsObj = models.segments.objects.get(id=segment_id)
+    timer.add('lookup', time.perf_counter() - lookupStart)
+
+    ### calculate and insert crossovers	###
+    logging.info(
+        'Non self-intersecting crossovers for segment %s of season %s are now being found.',
+        inSegment,
+        inSeason)
+    # Get the correct srid for the locaiton
+    proj = utility.epsgFromLocation(inLocationName)
+
+    # FIND ALL NON SELF-INTERSECTING CROSSOVERS
+    # Get the points of intersection, the closest point_path_ids, and the angles
+    # in degrees for the current segment (see ops/crossovers.py).
+    cursor = connection.cursor()
+    try:
+        # CANDIDATE SEGMENTS
+        # Segments whose projected bounding boxes miss this segment's box cannot cross it.
+        phaseStart = time.perf_counter()
+        candidateIds = _crossoverCandidates(cursor, app, segmentsObj.pk, proj, location_id, earlierIds, laterIds)
+        # the row count of the prefilter phase is the number of candidate segments
+        timer.add('prefilter', time.perf_counter() - phaseStart, len(candidateIds))
+        logging.info(
+            '%d candidate segments for segment %s of season %s.',
+            len(candidateIds),
+            inSegment,
+            inSeason)
+
+        engineFound = crossovers.CROSSOVER_ENGINES[engine](
+            cursor, app, segmentsObj.pk, proj, candidateIds, timer, location_id)
+
+        # FIND ALL SELF-INTERSECTING CROSSOVERS:
+        # Sweep the projected key point line for pieces crossing each other (see
+        # crossovers.selfCrossings).
+        logging.info(
+            'Self-intersecting crossovers for segment %s of season %s are now being found.',
+            inSegment,
+            inSeason)
+        phaseStart = time.perf_counter()
+        keyPoints = crossovers.loadKeyPoints(cursor, app, [segmentsObj.pk], proj, location_id)
+        selfFound = crossovers.selfCrossovers(keyPoints, proj)
+        timer.add('self_intersections', time.perf_counter() - phaseStart, len(selfFound.point_path_1_id))
+        found = crossovers.concatCrossovers([engineFound, selfFound])
+        crossoverCount = len(found.point_path_1_id)
+
+        # The crossovers and the crossover_calc flag are saved together
+        with transaction.atomic():
+            # Check if any crossovers were found.
+            if crossoverCount > 0:
                 logging.info(
-                    'Self-intersecting crossovers for segment %s of season %s are now being found.',
+                    'Crossovers for segment %s of season %s are being inserted.',
                     inSegment,
                     inSeason)
-                sql_str = """WITH pts AS
-                                (select row_number() over (order by gps_time) AS rn, pp.id, pp.geom from {app}_point_paths pp where segment_id={seg} and key_point=true order by rn)
-                            SELECT ST_UnaryUnion(ST_Transform(ST_MakeLine(ST_GeomFromText('POINTZ('||ST_X(pts.geom)||' '||ST_Y(pts.geom)||' '||pts.id||')', 4326)),{proj}))
-                            FROM pts;""".format(app=app, proj=proj, seg=segmentsObj.pk)
-                cursor.execute(sql_str)
-                line = cursor.fetchone()
-                # Create a GEOS geometry from the result fetched above.
-                lines = GEOSGeometry(line[0])
-                # Check if resulting object is a multilinestring, indicating crossovers.
-                if lines.geom_type == 'MultiLineString':
-                    # Get the point_path_ids for all points for the given segment:
-                    pt_ids = models.point_paths.objects.filter(
-                        segment_id=segmentsObj.pk).values_list(
-                        'id', flat=True)
-                    # Create a dictionary to keep track of crossovers and point ids.
-                    self_crosses = {}
-                    # Create a dictionary for managing next points (the point after the
-                    # crossover along the flight path)
-                    nxt_pts = {}
-                    # Loop through all linestrings created by ST_UnaryUnion
-                    for idx in range(len(lines) - 1):
-                        # Set the value of idx2:
-                        idx2 = idx + 1
-
-                        # Keep track of intersection point w/ dictionary:
-                        i_point = lines[idx][-1]
-                        if i_point not in list(self_crosses.keys()):
-                            self_crosses[i_point] = []
-                            nxt_pts[i_point] = []
-
-                        # Fall back/forward to point w/ z in pt_ids.
-                        # For the point before the crossover:
-                        # Include the crossover pt in the search (could be on top of
-                        # point_path geom)
-                        coord_idx = -1
-                        while lines[idx][coord_idx][2] not in pt_ids:
-                            coord_idx -= 1
-                            if math.fabs(coord_idx) > len(lines[idx].coords):
-                                coord_idx = -1
-                                idx -= 1
-                        pt_1 = lines[idx][coord_idx]
-                        # For the point after the crossover:
-                        coord_idx = 1  # Start after the crossover point.
-                        while lines[idx2][coord_idx][2] not in pt_ids:
-                            coord_idx += 1
-                            if coord_idx >= len(lines[idx2].coords):
-                                coord_idx = 0
-                                idx2 += 1
-                        pt_2 = lines[idx2][coord_idx]
-
-                        # select pt closest to current intersection point
-                        if LineString(
-                                pt_1, i_point).length <= LineString(
-                                i_point, pt_2).length:
-                            self_crosses[i_point].append(pt_1[2])
-
-                        else:
-                            self_crosses[i_point].append(pt_2[2])
-                        nxt_pts[i_point].append(pt_2)
-
-                    # Extract information from self-intersecting crossovers dict and
-                    # determine the angle of intersection
-                    for i_pt in self_crosses:
-                        cross_pts.append(
-                            Point(
-                                i_pt[0],
-                                i_pt[1],
-                                srid=proj).transform(
-                                CoordTransform(
-                                    SpatialReference(proj),
-                                    SpatialReference(4326)),
-                                True))
-                        point_path_1_id.append(self_crosses[i_pt][0])
-                        point_path_2_id.append(self_crosses[i_pt][1])
-
-                        # Find the angle of self-intersection
-                        change_x1 = i_pt[0] - nxt_pts[i_pt][0][0]
-                        change_y1 = i_pt[1] - nxt_pts[i_pt][0][1]
-                        change_x2 = i_pt[0] - nxt_pts[i_pt][1][0]
-                        change_y2 = i_pt[1] - nxt_pts[i_pt][1][1]
-                        angle1 = math.degrees(math.atan2(change_y1, change_x1))
-                        angle2 = math.degrees(math.atan2(change_y2, change_x2))
-                        angle = math.fabs(angle1 - angle2)
-                        # Get the acute angle:
-                        if angle > 90:
-                            angle = math.fabs(180 - angle)
-                            if angle > 90:
-                                angle = math.fabs(180 - angle)
-                        cross_angles.append(angle)
-
-                # Check if any crossovers were found.
-                if len(point_path_1_id) > 0:
-                    logging.info(
-                        'Crossovers for segment %s of season %s are being inserted.',
-                        inSegment,
-                        inSeason)
-                    crossovers = []
-                    # If so, package for bulk insert.
-                    for i in range(len(point_path_1_id)):
-                        crossovers.append(
-                            models.crossovers(
-                                point_path_1_id=point_path_1_id[i],
-                                point_path_2_id=point_path_2_id[i],
-                                angle=cross_angles[i],
-                                geom=cross_pts[i]))
-                    # Bulk insert found crossovers into the database.
-                    _ = models.crossovers.objects.bulk_create(crossovers)
-                else:
-                    logging.info(
-                        'No crossovers for segment %s of season %s were found.',
-                        inSegment,
-                        inSeason)
-                
+                # Stream the found crossovers to the database in the PGCOPY binary format
+                with timer.phase('insert', crossoverCount):
+                    crossovers.writeCrossovers(cursor, app, found)
+            else:
                 logging.info(
-                    'Segment %s of season %s has finished crossover calculation.',
+                    'No crossovers for segment %s of season %s were found.',
                     inSegment,
                     inSeason)
-                segmentsObj.crossover_calc = True
-                segmentsObj.save()
 
-            except Exception as e:
-                import traceback
-                tb = traceback.format_exc()
-                logging.error(tb)
-                return utility.errorCheck(e, sys)
-            finally:
-                cursor.close()
+            segmentsObj.crossover_calc = True
+            segmentsObj.save()
 
-        logging.info("SUCCESS: CROSSOVER CALCULATION COMPLETED")
-        return utility.response(1, 'SUCCESS: CROSSOVER CALCULATION COMPLETED.', {})
+        logging.info(
+            'Segment %s of season %s has finished crossover calculation.',
+            inSegment,
+            inSeason)
+        timer.save(models, inSeason, inSegment)
 
-    except Exception as e:
-        import traceback
-        tb = traceback.format_exc()
-        try:
-            logging.error(tb)
-        except Exception:
-            pass
-        return utility.errorCheck(e, sys)
+    finally:
+        cursor.close()
+
+    return crossoverCount
+
+
+def _crossoverCandidates(cursor, app, segment_id, proj, location_id, earlierIds, laterIds):
+    """ Gets the segments whose crossovers with a segment are calculated.
+
+    Input:
+            cursor: (object) database cursor
+            app: (string) application name
+            segment_id: (integer) id of the segment
+            proj: (integer) epsg code of the segment's location
+            location_id: (integer) id of the segment's location
+            earlierIds: (list of integers) ids of the batch segments before this one (always intersected)
+            laterIds: (list of integers) ids of the batch segments after this one (never intersected)
+
+    Output:
+            candidateIds: (list of integers) ids of the candidate segments
+
+    The other segments are the calculated segments outside of the batch and the batch segments
+    before this one. Those of the same location whose projected bounding box misses the segment's
+    box are skipped (the GIST index of geom_proj answers the overlap). Segments without a
+    projected geometry or of another location are always candidates.
+
+    """
+    cursor.execute("""WITH target AS
+                        (SELECT COALESCE(s.geom_proj, ST_SetSRID(ST_Transform(s.geom, {proj}), 0)) AS geom_proj
+                            FROM {app}_segments s WHERE s.id = {seg})
+                    SELECT o.id FROM {app}_segments o JOIN {app}_seasons ss ON ss.id = o.season_id, target
+                        WHERE o.id != {seg}
+                        AND (o.crossover_calc = true AND o.id != ALL({later}) OR o.id = ANY({earlier}))
+                        AND (ss.location_id != {loc} OR o.geom_proj IS NULL OR target.geom_proj IS NULL
+                             OR o.geom_proj && target.geom_proj);""".format(
+        app=app, proj=proj, seg=int(segment_id), loc=int(location_id),
+        later=_idArray(laterIds), earlier=_idArray(earlierIds)))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _discardCrossovers(app, segment_id, otherIds):
+    """ Deletes the crossovers between a segment and other segments.
+
+    Input:
+            app: (string) application name
+            segment_id: (integer) id of the segment
+            otherIds: (list of integers) ids of the other segments
+
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """DELETE FROM {app}_crossovers c
+               USING {app}_point_paths p1, {app}_point_paths p2
+               WHERE p1.id = c.point_path_1_id AND p2.id = c.point_path_2_id
+               AND ((p1.segment_id = %s AND p2.segment_id = ANY(%s))
+                    OR (p2.segment_id = %s AND p1.segment_id = ANY(%s)));""".format(app=app),
+            [segment_id, otherIds, segment_id, otherIds])
+        maintenance.recordRowsChanged(app + '_crossovers', cursor.rowcount)
+
+
+def _idArray(ids):
+    """ Formats ids as a PostgreSQL integer array literal for raw SQL. """
+    return "'{%s}'::integer[]" % ",".join(str(int(segment_id)) for segment_id in ids)
 
 
 def _findKeyPoints(app, segment_id_list, segment_name_list):
@@ -573,10 +1400,12 @@ def _findKeyPoints(app, segment_id_list, segment_name_list):
         # Sometimes, due to a precision difference in the DB (I believe), key_points do not exactly match points in the linestring
         logging.info(f'Updating segment to match key_points for segment {segment_name}')
         sqlStr = """WITH pts AS
-                    (select pp.id, pp.geom
-                    from {app}_point_paths pp where segment_id=%s and key_point=true order by gps_time),
-                    line as (select ST_MakeLine(st_force2d(pts.geom)) as geom from pts)
-                    update {app}_segments seg set geom=line.geom from line where seg.id=%s;""".format(app=app)
+                    (select pp.id, pp.geom, {projected} as geom_proj
+                    from {app}_point_paths pp join {app}_locations loc on pp.location_id=loc.id
+                    where segment_id=%s and key_point=true order by gps_time),
+                    line as (select ST_MakeLine(st_force2d(pts.geom)) as geom, ST_MakeLine(pts.geom_proj) as geom_proj from pts)
+                    update {app}_segments seg set geom=line.geom, geom_proj=line.geom_proj from line where seg.id=%s;""".format(
+            app=app, projected=utility.projectedPointSql(utility.epsgCaseSql('loc.name')))
         with connection.cursor() as cursor:
             cursor.execute(sqlStr, [segment_id, segment_id])
             logging.info(f'Segment geom updated for segment {segment_name}')
@@ -638,18 +1467,19 @@ def alterPathResolution(request):
         try:
             for segmentObj in segmentObjs:
 
-                # Create a linepath constructed from the point paths.
+                # Create a linepath constructed from the (projected) point paths.
                 sqlStr = """WITH pts AS
                             (SELECT loc.name,
-                                    ST_Force2D(pp.geom) AS geom
+                                    {projected} AS geom
                             FROM {app}_point_paths pp
                             JOIN {app}_locations loc ON pp.location_id = loc.id
                             WHERE pp.segment_id = %s
                             ORDER BY gps_time)
                             SELECT DISTINCT(name),
-                                ST_MakeLine(ST_Force2D(geom))
+                                ST_MakeLine(geom)
                             FROM pts
-                            GROUP BY name;""".format(app=app)
+                            GROUP BY name;""".format(
+                    app=app, projected=utility.projectedPointSql(utility.epsgCaseSql('loc.name')))
                 with connection.cursor() as cursor:
                     cursor.execute(sqlStr, [segmentObj.pk])
                     pointLine = cursor.fetchone()
@@ -657,9 +1487,8 @@ def alterPathResolution(request):
                 # determine the projection
                 proj = utility.epsgFromLocation(pointLine[0])
 
-                # Get the line object and transform to correct projection
+                # Get the line object (already in the correct projection)
                 line = GEOSGeometry(pointLine[1])
-                line.transform(proj)
 
                 # Interpolate new points at the desired resolution
                 newLine = []
@@ -671,10 +1500,12 @@ def alterPathResolution(request):
                     newLine.append(line[-1])
 
                 # Construct the new linestring
-                newLine = LineString(newLine, srid=proj)
+                newCoords = np.array([point.coords for point in newLine]).reshape(-1, 2)
+                segmentObj.geom_proj = LineString(newCoords)
 
                 # Transform the line back for storage in DB
-                newLine.transform(4326)
+                newLon, newLat = utility.transformCoords(newCoords[:, 0], newCoords[:, 1], proj, 4326)
+                newLine = LineString(np.column_stack([newLon, newLat]), srid=4326)
 
                 # Alter the segment's geometry
                 segmentObj.geom = newLine
@@ -773,6 +1604,7 @@ def simplifySegmentsResolution(request):
                 with connection.cursor() as cursor:
                     cursor.execute(sqlStr, [segment_id_list, segment_id_list])
                     logging.info('Segment geom simplification complete')
+                utility.updateSegmentProjection(app, segment_id_list)
 
                 sqlStr = """update {app}_point_paths set key_point=true where segment_id in %s;""".format(app=app)
                 with connection.cursor() as cursor:
@@ -787,19 +1619,18 @@ def simplifySegmentsResolution(request):
             try:
                 # perform the simplification
                 sqlStr = """update {app}_segments seg set geom=simplified.geom from 
-                            (select points.id as id, st_transform(st_simplifypreservetopology(st_transform(
-                             st_makeline(points.geom), case -- determine epsg to project to before simplification to ensure correct units are used for resolution
-                                                        when loc.name='arctic' then 3413
-                                                        when loc.name='antarctic' then 3031
-                                                        end
-                                                                                                          ), 
-                                                                  {resolution}), 4326) as geom
-                             from (select st_force2d(pp.geom) as geom, seg.id as id, seg.season_id 
-                                 from {app}_point_paths pp join {app}_segments seg on pp.segment_id=seg.id where seg.id in %s order by gps_time) points
+                            (select points.id as id, st_transform(st_setsrid(st_simplifypreservetopology(
+                             st_makeline(points.geom), {resolution}), {epsg} -- the projected points are simplified so the resolution is in meters
+                                                                  ), 4326) as geom
+                             from (select {projected} as geom, seg.id as id, seg.season_id 
+                                 from {app}_point_paths pp join {app}_segments seg on pp.segment_id=seg.id
+                                 join {app}_locations pploc on pp.location_id=pploc.id where seg.id in %s order by gps_time) points
                              join {app}_seasons ss on points.season_id=ss.id join {app}_locations loc on ss.location_id=loc.id
                              group by points.id, loc.name
                             ) simplified
-                            where seg.id=simplified.id;""".format(app=app, resolution=resolution)
+                            where seg.id=simplified.id;""".format(
+                    app=app, resolution=resolution, epsg=utility.epsgCaseSql('loc.name'),
+                    projected=utility.projectedPointSql(utility.epsgCaseSql('pploc.name')))
                 with connection.cursor() as cursor:
                     cursor.execute(sqlStr, [segment_id_list])
                     logging.info('Segment geom simplification done. Updating key_points...')
@@ -971,7 +1802,7 @@ def createLayerPoints(request):
     """
     try:
         models, data, app, cookies = utility.getInput(
-            request)  # get the input and models
+            request, floatDecode=True)  # get the input and models (numbers as floats)
 
         userProfileObj, status = utility.getUserProfile(cookies)
         if status:
@@ -1010,7 +1841,7 @@ def createLayerPoints(request):
         layerPointsObj = models.layer_points.objects.filter(
             point_path_id__in=inPointPathIds, layer_id=layerId)
         if layerPointsObj.exists():
-            layerPointsObj.delete()
+            maintenance.recordDeleted(layerPointsObj.delete()[1])
 
         # build an object for bulk create
         layerPointsObjs = []
@@ -1045,6 +1876,7 @@ def createLayerPoints(request):
             except IntegrityError:
                 return utility.response(0, 'ERROR: DUPLICATE LAYER POINTS.', {})
 
+        maintenance.recordRowsChanged(app + '_layer_points', len(donePointPaths))
         return utility.response(1, 'SUCCESS: LAYER POINTS INSERTION COMPLETED.', {})
 
     except Exception as e:
@@ -1116,8 +1948,7 @@ def deleteLayerPoints(request):
         if useGpsTimes:
 
             # To handle double precision rounding error
-            inStartGpsTimeN = inStartGpsTime - Decimal(0.00001)
-            inStopGpsTimeN = inStopGpsTime + Decimal(0.00001)
+            inStartGpsTimeN, inStopGpsTimeN = utility.padGpsTimeRange(inStartGpsTime, inStopGpsTime)
 
             # get the min/max point_path_id
             PointPathObj = models.point_paths.objects.filter(
@@ -1150,7 +1981,7 @@ def deleteLayerPoints(request):
 
         else:
 
-            layerPointsObj.delete()  # delete the layer points
+            maintenance.recordDeleted(layerPointsObj.delete()[1])  # delete the layer points
 
             # return the output
             return utility.response(1, 'SUCCESS: LAYER POINTS DELETION COMPLETED.', {})
@@ -1209,22 +2040,25 @@ def deleteBulk(request):
                 'name', flat=True)  # get all the segments for the given seasons
 
         # Delete layer points
-        _ = models.layer_points.objects.filter(
+        _, deleteCounts = models.layer_points.objects.filter(
             point_path__season__name__in=inSeasonNames,
             point_path__segment__name__in=inSegmentNames).delete()
+        maintenance.recordDeleted(deleteCounts)
 
         # Delete segments as well if user requested
         if not deleteOnlyLayerPoints:
 
-            _ = models.segments.objects.filter(
+            _, deleteCounts = models.segments.objects.filter(
                 name__in=inSegmentNames,
-                season__name__in=inSeasonNames).delete()  # delete segments
+                season__name__in=inSeasonNames).delete()  # delete segments (and their frames, point paths, ...)
+            maintenance.recordDeleted(deleteCounts)
 
             if not models.segments.objects.filter(season__name__in=inSeasonNames):
 
                 # delete seasons (if there are no segments left for the specified
                 # seasons)
-                _ = models.seasons.objects.filter(name__in=inSeasonNames).delete()
+                _, deleteCounts = models.seasons.objects.filter(name__in=inSeasonNames).delete()
+                maintenance.recordDeleted(deleteCounts)
 
         # return the output
         return utility.response(1, 'SUCCESS: BULK DELETION COMPLETED', {})
@@ -1308,8 +2142,8 @@ def getPath(request):
         if not usePointPathIds:
             inSeasonName = data['properties']['season']
             # To handle double precision rounding error
-            inStartGpsTime = data['properties']['start_gps_time'] - Decimal(0.00001)
-            inStopGpsTime = data['properties']['stop_gps_time'] + Decimal(0.00001)
+            inStartGpsTime, inStopGpsTime = utility.padGpsTimeRange(
+                data['properties']['start_gps_time'], data['properties']['stop_gps_time'])
 
         # parse optional inputs
         try:
@@ -1323,47 +2157,29 @@ def getPath(request):
 
         if not usePointPathIds:
             # get point paths based on input
-            if nativeGeom:
-                pointPathsObj = models.point_paths.objects.filter(
-                    season_id__name=inSeasonName,
-                    location_id__name=inLocationName,
-                    gps_time__gte=inStartGpsTime,
-                    gps_time__lte=inStopGpsTime).order_by('gps_time').values_list(
-                    'pk',
-                    'gps_time',
-                    'geom')
-            else:
-                pointPathsObj = models.point_paths.objects.filter(
-                    season_id__name=inSeasonName,
-                    location_id__name=inLocationName,
-                    gps_time__gte=inStartGpsTime,
-                    gps_time__lte=inStopGpsTime).order_by('gps_time').values_list(
-                    'pk',
-                    'gps_time',
-                    'geom')
-                for pnt in pointPathsObj:  # Transform the geom value to the correct epsg
-                    pnt[2].transform(epsg)
+            pointPathsObj = models.point_paths.objects.filter(
+                season_id__name=inSeasonName,
+                location_id__name=inLocationName,
+                gps_time__gte=inStartGpsTime,
+                gps_time__lte=inStopGpsTime).order_by('gps_time').values_list(
+                'pk',
+                'gps_time',
+                'geom')
         else:
-            if nativeGeom:
-                pointPathsObj = models.point_paths.objects.filter(
-                    id__in=inPointPathIds,
-                    location_id__name=inLocationName).order_by('gps_time').values_list(
-                    'pk',
-                    'gps_time',
-                    'geom')
-            else:
-                pointPathsObj = models.point_paths.objects.filter(
-                    id__in=inPointPathIds,
-                    location_id__name=inLocationName).order_by('gps_time').values_list(
-                    'pk',
-                    'gps_time',
-                    'geom')
-                for pnt in pointPathsObj:  # Transform the geom value to the correct epsg
-                    pnt[2].transform(epsg)
+            pointPathsObj = models.point_paths.objects.filter(
+                id__in=inPointPathIds,
+                location_id__name=inLocationName).order_by('gps_time').values_list(
+                'pk',
+                'gps_time',
+                'geom')
 
         # unzip the data for output
         pks, gpsTimes, pointPaths = list(zip(*pointPathsObj))
         xCoords, yCoords, elev = list(zip(*pointPaths))
+        if not nativeGeom:
+            # Transform all the coordinates to the correct epsg at once
+            xCoords, yCoords = utility.transformCoords(xCoords, yCoords, 4326, epsg)
+            xCoords, yCoords = xCoords.tolist(), yCoords.tolist()
 
         # return the output
         return utility.response(1,
@@ -1440,7 +2256,11 @@ def getFrameClosest(request):
                         'name',
                         flat=True)))  # get all the public seasons
 
-        epsg = utility.epsgFromLocation(inLocationName)  # get the input epsg
+        # the point paths are projected for mapped locations only
+        if inLocationName not in utility.LOCATION_EPSG:
+            return utility.response(
+                0, 'ERROR: LOCATION %s IS NOT MAPPED (ONLY %s).' % (inLocationName, ' AND '.join(sorted(utility.LOCATION_EPSG))), {})
+        proj = utility.LOCATION_EPSG[inLocationName]
 
         # Get the location id
         location_id = models.locations.objects.filter(
@@ -1451,29 +2271,37 @@ def getFrameClosest(request):
         pointTxt = 'POINT(%s %s)' % (inPointX, inPointY)
 
         try:
-            # Get the closest frame to the input point as a linestring.
+            # Get the closest frame to the input point as a linestring. The projected point paths are
+            # searched through the geom_proj index, those without geom_proj through the partial
+            # index of the unprojected point paths.
             queryStr = """
             WITH pt AS
             (
-                    SELECT   pp.frame_id
-                    FROM     {app}_point_paths pp
-                    JOIN     {app}_seasons ss
-                    ON       pp.season_id=ss.id
-                    WHERE    ss.NAME IN %s
-                    AND      pp.location_id = %s
-                    ORDER BY st_transform(pp.geom,%s) <-> st_geomfromtext(%s,%s) limit 1)
+                    SELECT   closest.frame_id
+                    FROM     ((SELECT   pp.frame_id, pp.geom_proj <-> st_geomfromtext(%s,0) AS dist
+                              FROM     {app}_point_paths pp
+                              JOIN     {app}_seasons ss
+                              ON       pp.season_id=ss.id
+                              WHERE    ss.NAME IN %s
+                              AND      pp.location_id = %s
+                              AND      pp.geom_proj IS NOT NULL
+                              ORDER BY pp.geom_proj <-> st_geomfromtext(%s,0) limit 1)
+                             UNION ALL
+                             (SELECT   pp.frame_id, {projected} <-> st_geomfromtext(%s,0) AS dist
+                              FROM     {app}_point_paths pp
+                              JOIN     {app}_seasons ss
+                              ON       pp.season_id=ss.id
+                              WHERE    ss.NAME IN %s
+                              AND      pp.location_id = %s
+                              AND      pp.geom_proj IS NULL
+                              ORDER BY dist limit 1)) closest
+                    ORDER BY closest.dist limit 1)
             SELECT   ss.NAME,
                     pp.segment_id,
                     min(pp.gps_time),
                     max(pp.gps_time),
                     frm.NAME,
-                    st_makeline(st_transform(st_geomfromtext('POINTZ('
-                            || st_x(pp.geom)
-                            || ' '
-                            || st_y(pp.geom)
-                            || ' '
-                            || pp.gps_time
-                            ||')',4326),%s))
+                    st_makeline(st_makepoint(st_x({projected}), st_y({projected}), pp.gps_time))
             FROM     pt,
                     {app}_point_paths pp
             JOIN     {app}_seasons ss
@@ -1484,11 +2312,12 @@ def getFrameClosest(request):
             GROUP BY ss.NAME,
                     pp.segment_id,
                     frm.NAME;
-            """.format(app=app)
+            """.format(app=app, projected=utility.projectedPointSql(proj))
             with connection.cursor() as cursor:
                 cursor.execute(
                     queryStr, [
-                    inSeasonNames, location_id, epsg, pointTxt, epsg, epsg])
+                    pointTxt, inSeasonNames, location_id, pointTxt,
+                    pointTxt, inSeasonNames, location_id])
                 closestFrame = cursor.fetchone()
         except DatabaseError as dberror:
             return utility.response(0, dberror.args[0], {})
@@ -1600,6 +2429,9 @@ def getLayerPoints(request):
             return_geom: (string) 'geog' or 'proj' to include either lat/lon/elev or x/y/elev in the output
                     If return_geom = 'proj' variable location MUST be included
 
+            float_decode: (POST variable, boolean) decode the input and return gps_time and twtt as floats
+                    cast by the database instead of building Decimal values
+
     Output:
             status: (integer) 0:error 1:success 2:warning
             data:
@@ -1644,8 +2476,8 @@ def getLayerPoints(request):
         try:
             useAllGps = False
             # To handle double precision rounding error
-            inStartGpsTime = data['properties']['start_gps_time'] - Decimal(0.00001)
-            inStopGpsTime = data['properties']['stop_gps_time'] + Decimal(0.00001)
+            inStartGpsTime, inStopGpsTime = utility.padGpsTimeRange(
+                data['properties']['start_gps_time'], data['properties']['stop_gps_time'])
         except KeyError:
             useAllGps = True
 
@@ -1724,11 +2556,19 @@ def getLayerPoints(request):
                     'pk',
                     flat=True)
 
+        if utility.isFloatDecode(request):
+            # let the database cast the numeric columns so no Decimal objects are built
+            gpsTimeField = Cast('point_path__gps_time', FloatField())
+            twttField = Cast('twtt', FloatField())
+        else:
+            gpsTimeField = 'point_path__gps_time'
+            twttField = 'twtt'
+
         if not returnGeom:
             # get a layer points object (no geometry)
             layerPointsObj = models.layer_points.objects.select_related('point_path__gps_time').filter(
                 point_path_id__in=inPointPathIds, layer_id__in=layerIds).values_list(
-                'point_path', 'layer_id', 'point_path__gps_time', 'twtt', 'type', 'quality')
+                'point_path', 'layer_id', gpsTimeField, twttField, 'type', 'quality')
 
             if len(layerPointsObj) == 0:
                 return utility.response(
@@ -1754,8 +2594,8 @@ def getLayerPoints(request):
                 layer_id__in=layerIds).values_list(
                 'point_path',
                 'layer_id',
-                'point_path__gps_time',
-                'twtt',
+                gpsTimeField,
+                twttField,
                 'type',
                 'quality',
                 'point_path__geom')
@@ -1767,18 +2607,13 @@ def getLayerPoints(request):
             pointPathId, layerIds, gpsTimes, twtts, types, qualitys, pointPaths = list(
                 zip(*layerPointsObj))  # unzip the layerPointsObj
 
-            outLon = []
-            outLat = []
-            outElev = []
+            coords = np.array([GEOSGeometry(pointObj).coords for pointObj in pointPaths]).reshape(-1, 3)
+            outLon, outLat = coords[:, 0], coords[:, 1]
             if inGeomType == 'proj':
                 epsg = utility.epsgFromLocation(inLocationName)  # get the input epsg
-            for pointObj in pointPaths:
-                ptGeom = GEOSGeometry(pointObj)
-                if inGeomType == 'proj':
-                    ptGeom.transform(epsg)
-                outLon.append(ptGeom.x)
-                outLat.append(ptGeom.y)
-                outElev.append(ptGeom.z)
+                # Transform all the coordinates at once
+                outLon, outLat = utility.transformCoords(outLon, outLat, 4326, epsg)
+            outLon, outLat, outElev = outLon.tolist(), outLat.tolist(), coords[:, 2].tolist()
 
             # return the output
             return utility.response(1,
@@ -2661,33 +3496,44 @@ def getSegmentInfo(request):
 
         # perform the function logic
 
-        # get the segment name, season name, frame names, and frame ids
-        pointPathsObj = models.point_paths.objects.select_related(
-            'seasons__name', 'segments__name', 'frames__name').filter(
-            segment_id=inSegmentId).order_by('frame').distinct('frame').values_list(
-            'season__name', 'segment__name', 'frame__name', 'frame')
-
-        seasonNames, segmentNames, frameNames, frameIds = list(
-            zip(*pointPathsObj))  # extract all the elements
-
-        if len(frameNames) < 1:
+        # get the segment name and season name
+        segmentsObj = models.segments.objects.filter(
+            pk=inSegmentId).values_list('season__name', 'name')
+        if not segmentsObj.exists():
+            return utility.response(0, 'ERROR: SEGMENT DOES NOT EXIST.', {})
+        seasonName, segmentName = segmentsObj[0]
+
+        # get the frames with point paths and the gps bounds stored with them at ingest
+        framesObj = list(models.frames.objects.filter(segment_id=inSegmentId).exclude(
+            point_count=0).order_by('pk').values_list('pk', 'name', 'start_gps_time', 'stop_gps_time'))
+
+        # compute the bounds of frames loaded before they were stored (one query for all)
+        missingFrameIds = [frmId for frmId, _, startGpsTime, _ in framesObj if startGpsTime is None]
+        if missingFrameIds:
+            missingBounds = {
+                frmId: (startGpsTime, stopGpsTime) for frmId, startGpsTime, stopGpsTime in
+                models.point_paths.objects.filter(frame_id__in=missingFrameIds).values(
+                    'frame').annotate(Min('gps_time'), Max('gps_time')).values_list(
+                    'frame', 'gps_time__min', 'gps_time__max')}
+            framesObj = [
+                (frmId, frameName) + missingBounds.get(frmId, (None, None))
+                if startGpsTime is None else (frmId, frameName, startGpsTime, stopGpsTime)
+                for frmId, frameName, startGpsTime, stopGpsTime in framesObj]
+            # frames without any point paths are not returned
+            framesObj = [frameObj for frameObj in framesObj if frameObj[2] is not None]
+
+        if len(framesObj) < 1:
             return utility.response(2,
                                     'WARNING: NO FRAMES FOUND FOR THE GIVEN SEGMENT ID',
                                     {})  # return if there are no frames
 
-        # for each frame get max/min gps_time from point paths
-        startGpsTimes = []
-        stopGpsTimes = []
-        for frmId in frameIds:
-            pointPathGpsTimes = models.point_paths.objects.filter(
-                frame_id=frmId).values_list('gps_time', flat=True)
-            startGpsTimes.append(min(pointPathGpsTimes))
-            stopGpsTimes.append(max(pointPathGpsTimes))
+        _, frameNames, startGpsTimes, stopGpsTimes = list(
+            zip(*framesObj))  # extract all the elements
 
         # return the output
         return utility.response(1,
-                                {'season': seasonNames[0],
-                                 'segment': segmentNames[0],
+                                {'season': seasonName,
+                                 'segment': segmentName,
                                     'frame': frameNames,
                                     'start_gps_time': startGpsTimes,
                                     'stop_gps_time': stopGpsTimes},
@@ -2697,6 +3543,78 @@ def getSegmentInfo(request):
         return utility.errorCheck(e, sys)
 
 
+@ipAuth()
+def getIngestStats(request):
+    """ Get the per-phase timings of past ingest (createPath), crossover and datapack load runs from the OPS.
+
+    Optional Input:
+            operation: (string or list of strings) operations to return:
+                    createPath, createPathUploadCommit: decode, dimensions, validate, segment, encode,
+                            copy (and reattach, swap for replaced segments)
+                    createPathBatch: as createPath, plus drop_indexes, 'index <name>' and analyze
+                            when the point path indexes are deferred
+                    crossoverCalculation: lookup, prefilter, load (strtree engine), intersect,
+                            resolve, self_intersections, insert
+                    load_datapacks: drop_indexes, insert, 'index <name>', analyze
+            phase: (string or list of strings) phases to return (see above; every run also has a total)
+            season: (string) name of a season to limit the output
+            segment: (string) name of a segment to limit the output
+            start_date: (string) 'YYYYMMDD' first day of the runs to return
+            stop_date: (string) 'YYYYMMDD' last day of the runs to return
+            limit: (integer) maximum number of phases to return, newest first (default 1000)
+
+    Output:
+            status: (integer) 0:error 1:success 2:warning
+            data:
+                    run_id: (list of strings) id shared by the phases of one run
+                    operation: (list of strings) name of the operation of each phase
+                    phase: (list of strings) name of each phase
+                    duration: (list of floats) seconds spent in each phase
+                    row_count: (list of integers) rows handled by each phase (None if not counted)
+                    season: (list of strings) name of the season of each phase
+                    segment: (list of strings) name of the segment of each phase (None for batches)
+                    created: (list of strings) time each run was recorded
+
+    """
+    try:
+        models, data, app, cookies = utility.getInput(
+            request)  # get the input and models
+
+        # parse the optional data input
+        inProperties = data.get('properties', {})
+        statsObj = models.ingest_stats.objects.all()
+        if 'operation' in inProperties:
+            statsObj = statsObj.filter(operation__in=utility.forceList(inProperties['operation']))
+        if 'phase' in inProperties:
+            statsObj = statsObj.filter(phase__in=utility.forceList(inProperties['phase']))
+        if 'season' in inProperties:
+            statsObj = statsObj.filter(season=inProperties['season'])
+        if 'segment' in inProperties:
+            statsObj = statsObj.filter(segment=inProperties['segment'])
+        if 'start_date' in inProperties:
+            statsObj = statsObj.filter(
+                created__date__gte=datetime.datetime.strptime(inProperties['start_date'], '%Y%m%d').date())
+        if 'stop_date' in inProperties:
+            statsObj = statsObj.filter(
+                created__date__lte=datetime.datetime.strptime(inProperties['stop_date'], '%Y%m%d').date())
+        inLimit = int(inProperties.get('limit', 1000))
+
+        statsFields = ['run_id', 'operation', 'phase', 'duration', 'row_count', 'season', 'segment', 'created']
+        statsRows = statsObj.order_by('-created', 'id').values_list(*statsFields)[:inLimit]
+
+        outData = {field: [] for field in statsFields}
+        for statsRow in statsRows:
+            for field, value in zip(statsFields, statsRow):
+                outData[field].append(value)
+        outData['created'] = [str(created) for created in outData['created']]
+
+        # return the output
+        return utility.response(1, outData, {})
+
+    except Exception as e:
+        return utility.errorCheck(e, sys)
+
+
 def getCrossovers(request):
     """ Get crossover values from the OPS.
 
@@ -3556,7 +4474,11 @@ def getFrameSearch(request):
             return utility.response(
                 2, 'WARNING: NO FRAMES FOUND FOR THE GIVEN SEARCH STRING.', {})
 
-        epsg = utility.epsgFromLocation(inLocationName)  # get the input epsg
+        # the point paths are projected for mapped locations only
+        if inLocationName not in utility.LOCATION_EPSG:
+            return utility.response(
+                0, 'ERROR: LOCATION %s IS NOT MAPPED (ONLY %s).' % (inLocationName, ' AND '.join(sorted(utility.LOCATION_EPSG))), {})
+        proj = utility.LOCATION_EPSG[inLocationName]
 
         try:
             # Query for the rquired information (get the points as a linestring w/ z
@@ -3564,22 +4486,16 @@ def getFrameSearch(request):
             queryStr = """
             SELECT  ss.name,
                     pp.segment_id,
-                    st_transform(St_makeline(St_geomfromtext('POINTZ('
-                            ||St_x(geom)
-                            ||' '
-                            || St_y(geom)
-                            ||' '
-                            || pp.gps_time
-                            ||')',4326)),%s)
+                    St_makeline(St_makepoint(St_x({projected}), St_y({projected}), pp.gps_time))
             FROM     {app}_point_paths pp
             JOIN     {app}_seasons ss
             ON       pp.season_id=ss.id
             WHERE    pp.frame_id=%s
             GROUP BY ss.name,
                     pp.segment_id;
-            """.format(app=app)
+            """.format(app=app, projected=utility.projectedPointSql(proj))
             with connection.cursor() as cursor:
-                cursor.execute(queryStr, [epsg, framesObj.pk])
+                cursor.execute(queryStr, [framesObj.pk])
                 pointPathsObj = cursor.fetchone()
         except DatabaseError as dberror:
             return utility.response(0, dberror.args[0], {})
@@ -7,11 +7,29 @@
 
 ####    Necessary imports    ####
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.test.client import RequestFactory
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.contrib.gis.geos import GEOSGeometry, Point
 import ops.views as views
+import gzip
+import io
+import os
+import tarfile
+import tempfile
+from unittest import mock
+from decimal import Decimal
+from urllib.parse import urlencode
+import numpy as np
 import ujson
 import ops.utility
+import ops.pgcopy
+import ops.middleware
+import ops.maintenance
+import ops.datapack
+import ops.crossovers
 
 
 ####    DEFINE FUNCTIONS USED BY TESTS    ####
@@ -67,7 +85,7 @@ class createPathTests(TestCase):
     def test_createPath_status(self):
         setUp(self)
         # Set the json string
-        jsonStr = '{ "type": "Feature", "geometry": { "type": "LineString", "coordinates": [ [ 76.422813519870743, -68.994377212760924 ], [ 76.422813519870743, -68.994377212760924 ], [ 76.422813519870743, -68.994377212760924 ] ] }, "properties": { "location": "arctic", "season": "test", "radar": "test", "segment": "99999999_01", "gps_time": [ 1301569765.9649489, 1301569766.9649489, 1301569767.9649489, 1301569768.9649489 ], "elev": [ 1257.839261098396, 1258.839261098396, 1259.839261098396, 1260.839261098396 ], "roll": [ -0.249471361002334, -0.249471361002334, -0.249471361002334, -0.249471361002334 ], "pitch": [ 0.088953745496139006, 0.088953745496139006, 0.088953745496139006, 0.088953745496139006 ], "heading": [ 2.1470276181592851, 2.1470276181592851, 2.1470276181592851, 2.1470276181592851 ], "frame_count": 2, "frame_start_gps_time": [ 1301569765.9649489, 1301569767.9649489 ], "season_group": "cresis_private", "userName": "admin", "isAuthenticated": true, "mat": true } }'
+        jsonStr = '{ "type": "Feature", "geometry": { "type": "LineString", "coordinates": [ [ 76.422813519870743, -68.994377212760924 ], [ 76.422813519870743, -68.994377212760924 ], [ 76.422813519870743, -68.994377212760924 ], [ 76.422813519870743, -68.994377212760924 ] ] }, "properties": { "location": "arctic", "season": "test", "radar": "test", "segment": "99999999_01", "gps_time": [ 1301569765.9649489, 1301569766.9649489, 1301569767.9649489, 1301569768.9649489 ], "elev": [ 1257.839261098396, 1258.839261098396, 1259.839261098396, 1260.839261098396 ], "roll": [ -0.249471361002334, -0.249471361002334, -0.249471361002334, -0.249471361002334 ], "pitch": [ 0.088953745496139006, 0.088953745496139006, 0.088953745496139006, 0.088953745496139006 ], "heading": [ 2.1470276181592851, 2.1470276181592851, 2.1470276181592851, 2.1470276181592851 ], "frame_count": 2, "frame_start_gps_time": [ 1301569765.9649489, 1301569767.9649489 ], "season_group": "cresis_private", "userName": "admin", "isAuthenticated": true, "mat": true } }'
 
         # Create the request from the above app & jsonStr
         request = self.factory.post("create/path", {"app": "rds", "data": jsonStr})
@@ -117,6 +135,547 @@ class createPathTests(TestCase):
         # (5 crossovers from fixture + 1 from this test = 6)
         self.assertEqual(crossovers, 6)
 
+    # Test the frames are created with their gps bounds, point counts and bounding boxes
+    def test_createPath_frames(self):
+        setUp(self)
+        jsonStr = '{ "type": "Feature", "geometry": { "type": "LineString", "coordinates": [ [ 76.4, -68.9 ], [ 76.5, -68.8 ], [ 76.6, -68.7 ], [ 76.7, -68.6 ] ] }, "properties": { "location": "arctic", "season": "test", "radar": "test", "segment": "99999996_01", "gps_time": [ 1301569765.964949, 1301569766.964949, 1301569767.964949, 1301569768.964949 ], "elev": [ 1257.8, 1258.8, 1259.8, 1260.8 ], "roll": [ -0.24947, -0.24947, -0.24947, -0.24947 ], "pitch": [ 0.08895, 0.08895, 0.08895, 0.08895 ], "heading": [ 2.14703, 2.14703, 2.14703, 2.14703 ], "frame_count": 2, "frame_start_gps_time": [ 1301569765.964949, 1301569767.964949 ], "season_group": "cresis_private", "userName": "admin", "isAuthenticated": true, "mat": true } }'
+
+        # Create the request from the above app & jsonStr
+        request = self.factory.post("create/path", {"app": "rds", "data": jsonStr})
+        # Get the response
+        response = views.createPath(request)
+
+        # Check the status
+        checkStatus(self, response)
+
+        framesObj = self.models.frames.objects.filter(
+            segment__name="99999996_01"
+        ).order_by("name")
+        self.assertEqual([frameObj.point_count for frameObj in framesObj], [2, 2])
+        self.assertEqual(framesObj[1].start_gps_time, Decimal("1301569767.964949"))
+        self.assertEqual(framesObj[1].stop_gps_time, Decimal("1301569768.964949"))
+        self.assertEqual(framesObj[1].bbox.extent, (76.6, -68.7, 76.7, -68.6))
+
+        # Every point path belongs to the frame that covers its gps time
+        self.assertEqual(
+            self.models.point_paths.objects.filter(frame_id=framesObj[0].pk).count(), 2
+        )
+
+    # Test points that fail validation are rejected before anything is written
+    def test_createPath_validation(self):
+        setUp(self)
+        # 3 coordinates for 4 gps times
+        jsonStr = '{ "type": "Feature", "geometry": { "type": "LineString", "coordinates": [ [ 76.4, -68.9 ], [ 76.5, -68.8 ], [ 76.6, -68.7 ] ] }, "properties": { "location": "arctic", "season": "test", "radar": "test", "segment": "99999994_01", "gps_time": [ 1301569765.964949, 1301569766.964949, 1301569767.964949, 1301569768.964949 ], "elev": [ 1257.8, 1258.8, 1259.8, 1260.8 ], "roll": [ -0.24947, -0.24947, -0.24947, -0.24947 ], "pitch": [ 0.08895, 0.08895, 0.08895, 0.08895 ], "heading": [ 2.14703, 2.14703, 2.14703, 2.14703 ], "frame_count": 1, "frame_start_gps_time": [ 1301569765.964949 ], "season_group": "cresis_private", "userName": "admin", "isAuthenticated": true, "mat": true } }'
+
+        request = self.factory.post("create/path", {"app": "rds", "data": jsonStr})
+        response = views.createPath(request)
+
+        self.assertEqual(ujson.loads(response.content)["status"], 0)
+        self.assertEqual(getData(response)["validation"]["length"]["lon"], 3)
+        self.assertFalse(self.models.segments.objects.filter(name="99999994_01").exists())
+
+    # Test clean=drop loads the valid points and reports the dropped ones
+    def test_createPath_clean_drop(self):
+        setUp(self)
+        # the third point repeats the second, the elevation of the fifth is missing (null)
+        jsonStr = '{ "type": "Feature", "geometry": { "type": "LineString", "coordinates": [ [ 76.4, -68.9 ], [ 76.5, -68.8 ], [ 76.5, -68.8 ], [ 76.6, -68.7 ], [ 76.7, -68.6 ] ] }, "properties": { "location": "arctic", "season": "test", "radar": "test", "segment": "99999994_02", "gps_time": [ 1301569765.964949, 1301569766.964949, 1301569766.964949, 1301569767.964949, 1301569768.964949 ], "elev": [ 1257.8, 1258.8, 1258.8, 1259.8, null ], "roll": [ -0.24947, -0.24947, -0.24947, -0.24947, -0.24947 ], "pitch": [ 0.08895, 0.08895, 0.08895, 0.08895, 0.08895 ], "heading": [ 2.14703, 2.14703, 2.14703, 2.14703, 2.14703 ], "frame_count": 1, "frame_start_gps_time": [ 1301569765.964949 ], "clean": "drop", "season_group": "cresis_private", "userName": "admin", "isAuthenticated": true, "mat": true } }'
+
+        request = self.factory.post("create/path", {"app": "rds", "data": jsonStr})
+        response = views.createPath(request)
+
+        self.assertEqual(ujson.loads(response.content)["status"], 2, getData(response))
+        validation = getData(response)["validation"]
+        self.assertEqual(validation["kept_count"], 3)
+        self.assertEqual(validation["duplicate"]["ranges"], [[2, 2]])
+        self.assertEqual(validation["nan"]["ranges"], [[4, 4]])
+        self.assertEqual(
+            self.models.point_paths.objects.filter(segment__name="99999994_02").count(), 3
+        )
+
+    # Test replacing an existing segment keeps its layer points
+    def test_createPath_replace(self):
+        setUp(self)
+        pathStr = '{ "type": "Feature", "geometry": { "type": "LineString", "coordinates": [ [ 76.4, -68.9 ], [ 76.5, -68.8 ], [ 76.6, -68.7 ], [ 76.7, -68.6 ] ] }, "properties": { "location": "arctic", "season": "test", "radar": "test", "segment": "99999992_01", "gps_time": [ %s ], "elev": [ 1257.8, 1258.8, 1259.8, 1260.8 ], "roll": [ -0.24947, -0.24947, -0.24947, -0.24947 ], "pitch": [ 0.08895, 0.08895, 0.08895, 0.08895 ], "heading": [ 2.14703, 2.14703, 2.14703, 2.14703 ], "frame_count": 2, "frame_start_gps_time": [ %s ], "replace": true, "season_group": "cresis_private", "userName": "admin", "isAuthenticated": true, "mat": true } }'
+        gpsTimes = 1301569765.5 + np.arange(4.0)
+
+        request = self.factory.post("create/path", {"app": "rds", "data": pathStr % (
+            ", ".join(repr(gpsTime) for gpsTime in gpsTimes), "%r, %r" % (gpsTimes[0], gpsTimes[2]))})
+        checkStatus(self, views.createPath(request))
+        segmentsObj = self.models.segments.objects.get(name="99999992_01")
+        oldPointPathIds = list(self.models.point_paths.objects.filter(
+            segment_id=segmentsObj.pk).order_by("gps_time").values_list("pk", flat=True))
+        for pointPathId in [oldPointPathIds[0], oldPointPathIds[3]]:
+            self.models.layer_points.objects.create(
+                layer_id=1, point_path_id=pointPathId, twtt=0.00001, type=1, quality=1, user_id=self.user.pk)
+
+        # reprocessed gps times are slightly later
+        gpsTimes = gpsTimes + 0.1
+        request = self.factory.post("create/path", {"app": "rds", "data": pathStr % (
+            ", ".join(repr(gpsTime) for gpsTime in gpsTimes), "%r, %r" % (gpsTimes[0], gpsTimes[2]))})
+        response = views.createPath(request)
+        checkStatus(self, response)
+        self.assertEqual(getData(response), "SUCCESS: PATH REPLACEMENT COMPLETED.")
+
+        # the segment is kept, its point paths and frames are new and its picks moved over
+        self.assertEqual(self.models.segments.objects.filter(name="99999992_01").get().pk, segmentsObj.pk)
+        self.assertFalse(self.models.segments.objects.get(pk=segmentsObj.pk).crossover_calc)
+        self.assertEqual(self.models.frames.objects.filter(segment_id=segmentsObj.pk).count(), 2)
+        self.assertFalse(self.models.point_paths.objects.filter(pk__in=oldPointPathIds).exists())
+        newGpsTimes = self.models.layer_points.objects.filter(
+            point_path__segment_id=segmentsObj.pk).order_by("point_path__gps_time").values_list(
+            "point_path__gps_time", flat=True)
+        self.assertEqual([float(gpsTime) for gpsTime in newGpsTimes],
+                         [round(gpsTimes[0], 6), round(gpsTimes[3], 6)])
+
+    # Test a columnar .npz upload of the point arrays
+    def test_createPath_npz(self):
+        setUp(self)
+        jsonStr = '{ "properties": { "location": "arctic", "season": "test", "radar": "test", "segment": "99999997_01", "frame_count": 2, "frame_start_gps_time": [ 1301569765.964949, 1301569767.964949 ], "season_group": "cresis_private", "userName": "admin", "isAuthenticated": true, "mat": true } }'
+        npzBuffer = io.BytesIO()
+        np.savez(
+            npzBuffer,
+            gps_time=1301569765.964949 + np.arange(4.0),
+            lon=np.array([76.4, 76.5, 76.6, 76.7]),
+            lat=np.full(4, -68.9),
+            elev=np.array([1257.8, 1258.8, 1259.8, 1260.8]),
+            roll=np.full(4, -0.24947),
+            pitch=np.full(4, 0.08895),
+            heading=np.full(4, 2.14703),
+        )
+        pathFile = SimpleUploadedFile("path.npz", npzBuffer.getvalue())
+
+        # Create the request from the above app, jsonStr & upload
+        request = self.factory.post(
+            "create/path", {"app": "rds", "data": jsonStr, "path": pathFile}
+        )
+        # Get the response
+        response = views.createPath(request)
+
+        # Check the status
+        checkStatus(self, response)
+
+        # Check the segment line and the point paths
+        segmentsObj = self.models.segments.objects.get(name="99999997_01")
+        self.assertEqual(segmentsObj.geom.coords[1], (76.5, -68.9))
+        pointPaths = self.models.point_paths.objects.filter(
+            segment_id=segmentsObj.pk
+        ).order_by("gps_time")
+        self.assertEqual(pointPaths.count(), 4)
+        self.assertEqual(pointPaths[3].geom.z, 1260.8)
+
+
+# Test the multi-segment createPathBatch view.
+class createPathBatchTests(TestCase):
+    fixtures = testFixtures()
+
+    def batchSegment(self, segment, gpsStart):
+        return {
+            "type": "Feature",
+            "geometry": {
+                "type": "LineString",
+                "coordinates": [[76.4, -68.9], [76.5, -68.9], [76.6, -68.9], [76.7, -68.9]],
+            },
+            "properties": {
+                "segment": segment,
+                "gps_time": [gpsStart, gpsStart + 1, gpsStart + 2, gpsStart + 3],
+                "elev": [1257.8, 1258.8, 1259.8, 1260.8],
+                "roll": [-0.24947, -0.24947, -0.24947, -0.24947],
+                "pitch": [0.08895, 0.08895, 0.08895, 0.08895],
+                "heading": [2.14703, 2.14703, 2.14703, 2.14703],
+                "frame_count": 2,
+                "frame_start_gps_time": [gpsStart, gpsStart + 2],
+            },
+        }
+
+    # Test that every segment is loaded and a repeated segment is reported as failed
+    def test_createPathBatch_status(self):
+        setUp(self)
+        jsonStr = ujson.dumps(
+            {
+                "properties": {
+                    "location": "arctic",
+                    "season": "test",
+                    "season_group": "cresis_private",
+                    "radar": "test",
+                    "segments": [
+                        self.batchSegment("99999998_01", 1301569765.964949),
+                        self.batchSegment("99999998_02", 1301569865.964949),
+                        self.batchSegment("99999998_01", 1301569965.964949),
+                    ],
+                    "userName": "admin",
+                    "isAuthenticated": True,
+                    "mat": True,
+                }
+            }
+        )
+
+        # Create the request from the above app & jsonStr
+        request = self.factory.post("create/path/batch", {"app": "rds", "data": jsonStr})
+        # Get the response
+        response = views.createPathBatch(request)
+
+        # One of three segments failed, so the batch returns a warning
+        self.assertEqual(ujson.loads(response.content)["status"], 2, getData(response))
+        self.assertEqual(getData(response)["status"], [1, 1, 0])
+
+        # Both new segments have their frames and all of their point paths
+        segments = self.models.segments.objects.filter(name__startswith="99999998_")
+        self.assertEqual(segments.count(), 2)
+        self.assertEqual(self.models.frames.objects.filter(segment__in=segments).count(), 4)
+        self.assertEqual(
+            self.models.point_paths.objects.filter(segment__in=segments).count(), 8
+        )
+
+
+# Test the chunked path upload session views.
+class createPathUploadTests(TestCase):
+    fixtures = testFixtures()
+
+    def post(self, view, url, properties, files={}):
+        properties = dict(properties, userName="admin", isAuthenticated=True, mat=True)
+        postData = dict(files, app="rds", data=ujson.dumps({"properties": properties}))
+        return view(self.factory.post(url, postData))
+
+    def test_createPathUpload(self):
+        setUp(self)
+        with tempfile.TemporaryDirectory() as dataPath, mock.patch.object(
+            views.opsSettings, "OPS_DATA_PATH", dataPath + "/"
+        ):
+            # Open the upload session
+            response = self.post(
+                views.createPathUpload,
+                "create/path/upload",
+                {
+                    "location": "arctic",
+                    "season": "test",
+                    "season_group": "cresis_private",
+                    "radar": "test",
+                    "segment": "99999995_01",
+                    "frame_count": 2,
+                    "frame_start_gps_time": [1301569765.964949, 1301569767.964949],
+                    "chunk_count": 2,
+                },
+            )
+            checkStatus(self, response)
+            uploadId = getData(response)["upload_id"]
+
+            # Send the second chunk as an .npz file and the first as JSON lists
+            npzBuffer = io.BytesIO()
+            np.savez(
+                npzBuffer,
+                gps_time=[1301569767.964949, 1301569768.964949],
+                lon=[76.6, 76.7],
+                lat=[-68.7, -68.6],
+                elev=[1259.8, 1260.8],
+                roll=[-0.24947, -0.24947],
+                pitch=[0.08895, 0.08895],
+                heading=[2.14703, 2.14703],
+            )
+            response = self.post(
+                views.createPathUploadChunk,
+                "create/path/upload/chunk",
+                {"upload_id": uploadId, "chunk": 2},
+                {"path": SimpleUploadedFile("path.npz", npzBuffer.getvalue())},
+            )
+            checkStatus(self, response)
+
+            # A chunk beyond the chunk count is rejected
+            response = self.post(
+                views.createPathUploadChunk,
+                "create/path/upload/chunk",
+                {"upload_id": uploadId, "chunk": 3},
+                {"path": SimpleUploadedFile("path.npz", npzBuffer.getvalue())},
+            )
+            self.assertEqual(ujson.loads(response.content)["status"], 0)
+
+            # Commit fails while a chunk is missing
+            response = self.post(
+                views.createPathUploadCommit, "create/path/upload/commit", {"upload_id": uploadId}
+            )
+            self.assertEqual(ujson.loads(response.content)["status"], 0)
+
+            response = self.post(
+                views.createPathUploadChunk,
+                "create/path/upload/chunk",
+                {
+                    "upload_id": uploadId,
+                    "chunk": 1,
+                    "gps_time": [1301569765.964949, 1301569766.964949],
+                    "lon": [76.4, 76.5],
+                    "lat": [-68.9, -68.8],
+                    "elev": [1257.8, 1258.8],
+                    "roll": [-0.24947, -0.24947],
+                    "pitch": [0.08895, 0.08895],
+                    "heading": [2.14703, 2.14703],
+                },
+            )
+            checkStatus(self, response)
+
+            # Both chunks are staged
+            response = self.post(views.getPathUpload, "get/path/upload", {"upload_id": uploadId})
+            checkStatus(self, response)
+            self.assertEqual(getData(response)["chunk"], [1, 2])
+
+            # The upload state is only given to authenticated users
+            response = views.getPathUpload(self.factory.post("get/path/upload", {
+                "app": "rds", "data": ujson.dumps({"properties": {
+                    "upload_id": uploadId, "userName": "admin", "isAuthenticated": False, "mat": True}})}))
+            self.assertEqual(ujson.loads(response.content)["status"], 0)
+
+            # Commit the upload
+            response = self.post(
+                views.createPathUploadCommit, "create/path/upload/commit", {"upload_id": uploadId}
+            )
+            checkStatus(self, response)
+
+        segmentsObj = self.models.segments.objects.get(name="99999995_01")
+        self.assertEqual(segmentsObj.geom.coords[0], (76.4, -68.9))
+        self.assertEqual(
+            self.models.point_paths.objects.filter(segment_id=segmentsObj.pk).count(), 4
+        )
+
+
+    def test_uploadState(self):
+        with tempfile.TemporaryDirectory() as dataPath, mock.patch.object(
+            views.opsSettings, "OPS_DATA_PATH", dataPath + "/"
+        ):
+            uploadDir = os.path.join(dataPath, "data/uploads", "abc123")
+            os.makedirs(uploadDir)
+            with open(os.path.join(uploadDir, "upload.json"), "w") as uploadFile:
+                ujson.dump({"app": "rds"}, uploadFile)
+            # chunk numbers past 6 digits and partially written chunks
+            for fileName in ["chunk_000002.npz", "chunk_1234567.npz", "chunk_000003.npz.tmp"]:
+                open(os.path.join(uploadDir, fileName), "wb").close()
+            uploadProperties, chunkNumbers = views._uploadState("abc123")
+            self.assertEqual(uploadProperties["app"], "rds")
+            self.assertEqual(chunkNumbers, [2, 1234567])
+
+
+# Test the ingest timings recorded by createPath and returned by getIngestStats().
+class ingestStatsTests(TestCase):
+    fixtures = testFixtures()
+
+    def test_getIngestStats(self):
+        setUp(self)
+        jsonStr = '{ "type": "Feature", "geometry": { "type": "LineString", "coordinates": [ [ 76.4, -68.9 ], [ 76.5, -68.8 ], [ 76.6, -68.7 ], [ 76.7, -68.6 ] ] }, "properties": { "location": "arctic", "season": "test", "radar": "test", "segment": "99999993_01", "gps_time": [ 1301569765.964949, 1301569766.964949, 1301569767.964949, 1301569768.964949 ], "elev": [ 1257.8, 1258.8, 1259.8, 1260.8 ], "roll": [ -0.24947, -0.24947, -0.24947, -0.24947 ], "pitch": [ 0.08895, 0.08895, 0.08895, 0.08895 ], "heading": [ 2.14703, 2.14703, 2.14703, 2.14703 ], "frame_count": 2, "frame_start_gps_time": [ 1301569765.964949, 1301569767.964949 ], "season_group": "cresis_private", "userName": "admin", "isAuthenticated": true, "mat": true } }'
+        request = self.factory.post("create/path", {"app": "rds", "data": jsonStr})
+        checkStatus(self, views.createPath(request))
+
+        jsonStr = '{"properties": {"operation": "createPath", "segment": "99999993_01"}}'
+        request = self.factory.post("get/ingest/stats", {"app": "rds", "data": jsonStr})
+        response = views.getIngestStats(request)
+        checkStatus(self, response)
+
+        stats = getData(response)
+        phaseRows = dict(zip(stats["phase"], stats["row_count"]))
+        for phase in ["decode", "dimensions", "validate", "segment", "encode", "copy", "total"]:
+            self.assertIn(phase, phaseRows)
+        self.assertEqual(phaseRows["copy"], 4)
+        self.assertEqual(phaseRows["segment"], 2)
+        self.assertEqual(len(set(stats["run_id"])), 1)
+        self.assertTrue(all(duration >= 0 for duration in stats["duration"]))
+
+
+# Test the validatePath() utility used by createPath.
+class validatePathTests(TestCase):
+    def pathArrays(self, gpsTime, elev):
+        pointCount = len(gpsTime)
+        return {
+            "gps_time": gpsTime,
+            "lon": np.arange(pointCount, dtype=float),
+            "lat": np.zeros(pointCount),
+            "elev": elev,
+            "roll": np.zeros(pointCount),
+            "pitch": np.zeros(pointCount),
+            "heading": np.zeros(pointCount),
+        }
+
+    def test_validatePath_report(self):
+        pathArrays = self.pathArrays([1, 2, 3, 2.5, 2.7, 4], [1, 2, 3, 4, 5, np.nan])
+        _, report = ops.utility.validatePath(pathArrays)
+        self.assertFalse(report["valid"])
+        self.assertEqual(report["nan"], {"count": 1, "ranges": [[5, 5]]})
+        self.assertEqual(report["non_monotonic"], {"count": 2, "ranges": [[3, 4]]})
+
+    def test_validatePath_repair(self):
+        pathArrays = self.pathArrays([1, 2, 3, 4], [1, np.nan, np.nan, 4])
+        cleanArrays, report = ops.utility.validatePath(pathArrays, "repair")
+        self.assertTrue(report["valid"])
+        self.assertEqual(report["repaired"], {"count": 2, "ranges": [[1, 2]]})
+        self.assertEqual(list(cleanArrays["elev"]), [1, 2, 3, 4])
+        # the input arrays are left unchanged
+        self.assertTrue(np.isnan(pathArrays["elev"][1]))
+
+
+# Test the assignFrames() utility used by createPath.
+class assignFramesTests(TestCase):
+    def test_assignFrames(self):
+        # Points on a frame start belong to that frame, points after it to the same frame
+        frameIds = ops.utility.assignFrames(
+            [10.0, 10.5, 11.0, 12.0, 20.0], [10.0, 11.0, 15.0], [7, 8, 9]
+        )
+        self.assertEqual(list(frameIds), [7, 7, 8, 8, 9])
+
+    def test_assignFrames_before_first_frame(self):
+        # A point before the first frame start cannot be assigned
+        with self.assertRaises(Exception):
+            ops.utility.assignFrames([9.0, 10.0], [10.0, 11.0], [7, 8])
+
+
+# Test the COPY FROM STDIN stream used for bulk inserts.
+class copyStreamTests(TestCase):
+    def test_copyStream_text(self):
+        rows = [[idx, None, "abc", True] for idx in range(25)]
+        stream = ops.pgcopy.CopyStream(ops.pgcopy.textChunks(rows, chunkRows=7))
+        # Read in small pieces like the database cursor does
+        out = b""
+        chunk = stream.read(13)
+        while chunk:
+            out += chunk
+            chunk = stream.read(13)
+        expected = "".join("%d,\\N,abc,True\n" % idx for idx in range(25))
+        self.assertEqual(out, expected.encode("utf-8"))
+
+    def test_copyStream_binary(self):
+        columns = [
+            ops.pgcopy.int4Column([7]),
+            ops.pgcopy.numericColumn([-1.5], 2),
+            ops.pgcopy.boolColumn([True]),
+        ]
+        out = b"".join(ops.pgcopy.binaryChunks(columns))
+        expected = (
+            ops.pgcopy.PGCOPY_HEADER
+            + b"\x00\x03"  # field count
+            + b"\x00\x00\x00\x04\x00\x00\x00\x07"  # int4 7
+            # numeric -1.50: 2 digits, weight 0, negative, dscale 2, digits [1, 5000]
+            + b"\x00\x00\x00\x0c\x00\x02\x00\x00\x40\x00\x00\x02\x00\x01\x13\x88"
+            + b"\x00\x00\x00\x01\x01"  # bool true
+            + ops.pgcopy.PGCOPY_TRAILER
+        )
+        self.assertEqual(out, expected)
+
+    def test_copyStream_binary_null(self):
+        columns = [ops.pgcopy.int4Column([7]), ops.pgcopy.nullColumn(1)]
+        out = b"".join(ops.pgcopy.binaryChunks(columns))
+        expected = (
+            ops.pgcopy.PGCOPY_HEADER
+            + b"\x00\x02"  # field count
+            + b"\x00\x00\x00\x04\x00\x00\x00\x07"  # int4 7
+            + b"\xff\xff\xff\xff"  # NULL
+            + ops.pgcopy.PGCOPY_TRAILER
+        )
+        self.assertEqual(out, expected)
+
+
+# Test the vectorized EWKB point encoder against GEOS.
+class ewkbPointsTests(TestCase):
+    def test_ewkbPoints_pointz(self):
+        x = [76.422813519870743, -45.5, 0.0]
+        y = [-68.994377212760924, 70.25, 0.0]
+        z = [1257.839261098396, -12.5, 0.0]
+        ewkb = ops.pgcopy.ewkbPoints(x, y, z)
+        for idx in range(len(x)):
+            geosEwkb = GEOSGeometry(
+                "POINT Z (%r %r %r)" % (x[idx], y[idx], z[idx]), srid=4326
+            ).ewkb
+            self.assertEqual(bytes(ewkb[idx]), bytes(geosEwkb))
+
+    def test_ewkbPoints_point(self):
+        ewkb = ops.pgcopy.ewkbPoints([-45.5], [70.25], srid=3413)
+        geosEwkb = GEOSGeometry("POINT (-45.5 70.25)", srid=3413).ewkb
+        self.assertEqual(bytes(ewkb[0]), bytes(geosEwkb))
+
+    def test_ewkbLineString(self):
+        ewkb = ops.pgcopy.ewkbLineString([76.4, 76.5, 76.6], [-68.9, -68.9, -69.0])
+        geosEwkb = GEOSGeometry(
+            "LINESTRING (76.4 -68.9, 76.5 -68.9, 76.6 -69.0)", srid=4326
+        ).ewkb
+        self.assertEqual(ewkb, bytes(geosEwkb))
+
+
+# Test the array coordinate transform against GEOS.
+class transformCoordsTests(TestCase):
+    def test_transformCoords(self):
+        lon = [-45.5, -40.25, 10.0]
+        lat = [70.25, 72.5, 80.0]
+        x, y = ops.utility.transformCoords(lon, lat, 4326, 3413)
+        for idx in range(len(lon)):
+            point = Point(lon[idx], lat[idx], srid=4326)
+            point.transform(3413)
+            self.assertAlmostEqual(x[idx], point.x, places=6)
+            self.assertAlmostEqual(y[idx], point.y, places=6)
+
+    def test_getTransformer(self):
+        transform = ops.utility.getTransformer(4326, 3031)
+        self.assertIs(ops.utility.getTransformer(4326, 3031), transform)
+        self.assertIsNot(ops.utility.getTransformer(3031, 4326), transform)
+
+    def test_epsgCaseSql(self):
+        # the SQL projection of each location matches epsgFromLocation
+        with connection.cursor() as cursor:
+            for name, epsg in ops.utility.LOCATION_EPSG.items():
+                cursor.execute("SELECT %s;" % ops.utility.epsgCaseSql("%s"), [name])
+                self.assertEqual(cursor.fetchone()[0], ops.utility.epsgFromLocation(name))
+            cursor.execute("SELECT %s;" % ops.utility.epsgCaseSql("%s"), ["unmapped"])
+            self.assertIsNone(cursor.fetchone()[0])
+
+    def test_projectedPointSql(self):
+        # a point path without geom_proj is projected on the fly, as the stored geom_proj would be
+        x, y = ops.utility.transformCoords([-45.5], [70.25], 4326, 3413)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT ST_X(p), ST_Y(p) FROM (SELECT %s AS p FROM (SELECT NULL::geometry AS geom_proj, "
+                "ST_SetSRID(ST_MakePoint(-45.5, 70.25, 10.0), 4326) AS geom) pp) q;"
+                % ops.utility.projectedPointSql(3413)
+            )
+            projX, projY = cursor.fetchone()
+        self.assertAlmostEqual(projX, x[0], places=3)
+        self.assertAlmostEqual(projY, y[0], places=3)
+
+
+# Test the gzip request body decompression middleware.
+class requestDecompressionTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        # Echo the decoded POST data back in an OPS response
+        self.middleware = ops.middleware.RequestDecompressionMiddleware(
+            lambda request: ops.utility.response(1, request.POST.get("data"), {})
+        )
+
+    def gzipRequest(self, body):
+        return self.factory.post(
+            "create/path",
+            gzip.compress(body),
+            content_type="application/x-www-form-urlencoded",
+            HTTP_CONTENT_ENCODING="gzip",
+        )
+
+    def test_requestDecompression_gzip(self):
+        jsonStr = '{ "properties": { "gps_time": [ 1301569765.9649489 ] } }'
+        request = self.gzipRequest(urlencode({"app": "rds", "data": jsonStr}).encode())
+        response = self.middleware(request)
+
+        checkStatus(self, response)
+        self.assertEqual(getData(response), jsonStr)
+
+    @override_settings(OPS_MAX_DECOMPRESSED_BODY_SIZE=1000)
+    def test_requestDecompression_cap(self):
+        request = self.gzipRequest(b"0" * 100000)
+        response = self.middleware(request)
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_requestDecompression_invalid(self):
+        request = self.factory.post(
+            "create/path",
+            b"not gzip data",
+            content_type="application/x-www-form-urlencoded",
+            HTTP_CONTENT_ENCODING="gzip",
+        )
+        response = self.middleware(request)
+
+        self.assertEqual(response.status_code, 400)
+
 
 # Test createLayer() view.
 class createLayerTests(TestCase):
@@ -407,6 +966,76 @@ class getLayerPointsTests(TestCase):
         data = getData(response)
         self.assertEqual(len(data["gps_time"]), 3)
 
+    # Test the float fast-path returns the same points as the Decimal decoding
+    def test_getLayerPoints_float_decode(self):
+        setUp(self)
+        jsonStr = '{ "properties": { "location": "arctic", "season": "fixtureTest", "segment": "11111111_01", "lyr_name": [ "surface", "bottom", "fixtureTest" ], "start_gps_time": 1301569764.9649489, "stop_gps_time": 1301569868.9649489, "mat": true, "userName": "admin", "isAuthenticated": true } }'
+
+        responses = []
+        for floatDecode in ["false", "true"]:
+            request = self.factory.post(
+                "get/layer/points",
+                {"app": "rds", "data": jsonStr, "float_decode": floatDecode},
+            )
+            responses.append(views.getLayerPoints(request))
+            checkStatus(self, responses[-1])
+
+        decimalData = getData(responses[0])
+        floatData = getData(responses[1])
+        self.assertEqual(floatData["point_path_id"], decimalData["point_path_id"])
+        self.assertEqual(
+            [float(gpsTime) for gpsTime in floatData["gps_time"]],
+            [float(gpsTime) for gpsTime in decimalData["gps_time"]],
+        )
+
+
+# Test the padGpsTimeRange() utility for both request decodings.
+class padGpsTimeRangeTests(TestCase):
+    def test_padGpsTimeRange(self):
+        startGpsTime, stopGpsTime = ops.utility.padGpsTimeRange(
+            Decimal("1301569765.964949"), Decimal("1301569766.964949")
+        )
+        self.assertEqual(startGpsTime, Decimal("1301569765.964939"))
+        self.assertEqual(stopGpsTime, Decimal("1301569766.964959"))
+
+        # Decimal and float (or integer) times are padded together as Decimals
+        startGpsTime, stopGpsTime = ops.utility.padGpsTimeRange(
+            Decimal("1301569765.964949"), 1301569766.964949
+        )
+        self.assertIsInstance(stopGpsTime, Decimal)
+        self.assertEqual(startGpsTime, Decimal("1301569765.964939"))
+        self.assertEqual(stopGpsTime, Decimal("1301569766.964959"))
+
+        startGpsTime, stopGpsTime = ops.utility.padGpsTimeRange(
+            1301569765, Decimal("1301569766.964949")
+        )
+        self.assertEqual(startGpsTime, Decimal("1301569764.99999"))
+        self.assertEqual(stopGpsTime, Decimal("1301569766.964959"))
+
+        startGpsTime, stopGpsTime = ops.utility.padGpsTimeRange(
+            1301569765.964949, 1301569766
+        )
+        self.assertIsInstance(startGpsTime, float)
+        self.assertAlmostEqual(startGpsTime, 1301569765.964939, places=6)
+        self.assertAlmostEqual(stopGpsTime, 1301569766.00001, places=6)
+
+
+# Test the getData() utility for both request decodings.
+class getDataTests(TestCase):
+    def test_getData_floatDecode(self):
+        jsonStr = '{ "properties": { "gps_time": [ 1301569765.964949, 1301569766.5 ], "count": 2, "mat": true, "userName": "admin", "isAuthenticated": true } }'
+        request = RequestFactory().post("get/path", {"app": "rds", "data": jsonStr})
+
+        app, data, cookies = ops.utility.getData(request, floatDecode=True)
+        self.assertEqual(app, "rds")
+        self.assertEqual(data["properties"]["gps_time"], [1301569765.964949, 1301569766.5])
+        self.assertIsInstance(data["properties"]["gps_time"][0], float)
+        self.assertEqual(data["properties"]["count"], 2)
+        self.assertTrue(cookies["isMat"])
+
+        app, data, cookies = ops.utility.getData(request)
+        self.assertEqual(data["properties"]["gps_time"], [Decimal("1301569765.964949"), Decimal("1301569766.5")])
+
 
 # Test the getLayerPointsCsv() view
 class getLayerPointsCsvTests(TestCase):
@@ -637,3 +1266,380 @@ class analyzeTests(TestCase):
 
         # Check the status
         checkStatus(self, response)
+
+
+# Test the row counting and ANALYZE queue of ops.maintenance.
+@override_settings(OPS_ANALYZE_ROW_THRESHOLD=100)
+class maintenanceTests(TestCase):
+    def setUp(self):
+        ops.maintenance._rowsChanged.clear()
+
+    def test_recordRowsChanged_threshold(self):
+        with mock.patch("ops.maintenance.queueAnalyze") as queueAnalyze:
+            with self.captureOnCommitCallbacks(execute=True):
+                ops.maintenance.recordRowsChanged("rds_point_paths", 60)
+            queueAnalyze.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                ops.maintenance.recordRowsChanged("rds_point_paths", 60)
+                ops.maintenance.recordRowsChanged("rds_layer_points", 10)
+            queueAnalyze.assert_called_once_with("rds_point_paths")
+
+        # the count starts over after an ANALYZE is queued
+        self.assertEqual(ops.maintenance._rowsChanged["rds_point_paths"], 0)
+
+    def test_recordDeleted(self):
+        ops.maintenance.recordDeleted({"rds.layer_points": 40, "rds.point_paths": 5})
+        self.assertEqual(ops.maintenance._rowsChanged["rds_layer_points"], 40)
+        self.assertEqual(ops.maintenance._rowsChanged["rds_point_paths"], 5)
+
+    def test_dropIndexes_rebuildIndexes(self):
+        indexSql = "SELECT indexname FROM pg_indexes WHERE tablename = 'rds_point_paths';"
+        with ops.maintenance.connection.cursor() as cursor:
+            cursor.execute(indexSql)
+            beforeIndexes = set(row[0] for row in cursor.fetchall())
+            indexes = ops.maintenance.dropIndexes("rds", ("point_paths",))
+            # The gps_time index is dropped and the primary key is kept
+            self.assertTrue(any("gps_time" in indexName for indexName in indexes))
+            cursor.execute(indexSql)
+            self.assertEqual(
+                set(row[0] for row in cursor.fetchall()), beforeIndexes - set(indexes))
+            self.assertEqual(ops.maintenance.rebuildIndexes(indexes), [])
+            cursor.execute(indexSql)
+            self.assertEqual(set(row[0] for row in cursor.fetchall()), beforeIndexes)
+
+    def test_queueAnalyze_dedupe(self):
+        with mock.patch("ops.maintenance.threading.Thread"), \
+                mock.patch.object(ops.maintenance, "_queue", ops.maintenance.queue.Queue()), \
+                mock.patch.object(ops.maintenance, "_pending", set()), \
+                mock.patch.object(ops.maintenance, "_worker", None):
+            ops.maintenance.queueAnalyze("rds_point_paths")
+            ops.maintenance.queueAnalyze("rds_point_paths")
+            ops.maintenance.queueAnalyze("rds_layer_points")
+            self.assertEqual(ops.maintenance._queue.qsize(), 2)
+
+    def test_deferIndexes(self):
+        indexSql = "SELECT indexname FROM pg_indexes WHERE tablename = 'rds_point_paths';"
+        with ops.maintenance.connection.cursor() as cursor:
+            cursor.execute(indexSql)
+            beforeIndexes = set(row[0] for row in cursor.fetchall())
+            # The indexes are dropped in the block and back before it ends
+            with transaction.atomic(), ops.maintenance.deferIndexes("rds", ("point_paths",)) as indexes:
+                self.assertTrue(indexes)
+                cursor.execute(indexSql)
+                self.assertEqual(set(row[0] for row in cursor.fetchall()), beforeIndexes - set(indexes))
+            cursor.execute(indexSql)
+            self.assertEqual(set(row[0] for row in cursor.fetchall()), beforeIndexes)
+
+            # A failed load rolls back the drop
+            with self.assertRaises(ValueError):
+                with transaction.atomic(), ops.maintenance.deferIndexes("rds", ("point_paths",)):
+                    raise ValueError()
+            cursor.execute(indexSql)
+            self.assertEqual(set(row[0] for row in cursor.fetchall()), beforeIndexes)
+
+
+
+# Test the staging table datapack loader of ops.datapack.
+class datapackTests(TestCase):
+    fixtures = testFixtures()
+
+    def test_datapackFiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for fileName in ["rds_point_paths", "rds_segments", "snow_radars", "readme"]:
+                open(directory + "/" + fileName, "w").close()
+            packFiles = ops.datapack.datapackFiles(directory)
+        # Files are found per app in foreign key order
+        self.assertEqual(sorted(packFiles), ["rds", "snow"])
+        self.assertEqual(list(packFiles["rds"]), ["segments", "point_paths"])
+
+    def test_loadDatapack_lookup(self):
+        setUp(self)
+        radarCount = self.models.radars.objects.count()
+        csvFiles = {"radars": io.BytesIO(b"1001,fixturetest\n1002,datapack_radar\n")}
+        rowCounts = ops.datapack.loadDatapack("rds", csvFiles)
+        # The existing radar is reused and only the new radar is inserted
+        self.assertEqual(rowCounts["radars"], 1)
+        self.assertEqual(self.models.radars.objects.count(), radarCount + 1)
+        self.assertEqual(self.models.radars.objects.filter(name="fixturetest").count(), 1)
+
+
+# Test the load_datapacks management command.
+class loadDatapacksTests(TestCase):
+    fixtures = testFixtures()
+
+    def loadPack(self, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            csvData = b"1001,fixturetest\n1002,datapack_radar\n"
+            with tarfile.open(os.path.join(directory, "pack.tar.gz"), "w:gz") as tarball:
+                member = tarfile.TarInfo("rds_radars")
+                member.size = len(csvData)
+                tarball.addfile(member, io.BytesIO(csvData))
+            out = io.StringIO()
+            call_command("load_datapacks", directory, workers=1, stdout=out, **options)
+        return out.getvalue()
+
+    def test_load_datapacks(self):
+        setUp(self)
+        radarCount = self.models.radars.objects.count()
+        out = self.loadPack()
+        self.assertIn("Staged 2 rows of rds_radars from pack.tar.gz", out)
+        self.assertEqual(self.models.radars.objects.count(), radarCount + 1)
+
+    def test_load_datapacks_dry_run(self):
+        setUp(self)
+        radarCount = self.models.radars.objects.count()
+        out = self.loadPack(dry_run=True)
+        # The rows are counted but nothing is inserted
+        self.assertIn("would be inserted", out)
+        self.assertEqual(self.models.radars.objects.count(), radarCount)
+
+
+# Test the crossoverCalculation() view.
+class crossoverCalculationTests(TestCase):
+    fixtures = testFixtures()
+
+    def createSegment(self, segment, lon, lat):
+        gpsTime = [1301569765.0 + idx for idx in range(len(lon))]
+        properties = {
+            "location": "arctic", "season": "test", "radar": "test", "segment": segment,
+            "gps_time": gpsTime, "elev": [1000.0] * len(lon), "roll": [0.0] * len(lon),
+            "pitch": [0.0] * len(lon), "heading": [0.0] * len(lon), "frame_count": 1,
+            "frame_start_gps_time": gpsTime[:1], "season_group": "cresis_private",
+            "userName": "admin", "isAuthenticated": True, "mat": True,
+        }
+        jsonStr = ujson.dumps({"type": "Feature", "properties": properties, "geometry": {
+            "type": "LineString", "coordinates": [list(coord) for coord in zip(lon, lat)]}})
+        request = self.factory.post("create/path", {"app": "rds", "data": jsonStr})
+        checkStatus(self, views.createPath(request))
+        return self.models.segments.objects.get(name=segment).pk
+
+    def test_crossoverCalculation_batch(self):
+        setUp(self)
+        # Two crossing segments calculated in one batch
+        segmentIds = [
+            self.createSegment("99999997_01", [-50.0, -50.0, -50.0, -50.0], [69.0, 69.1, 69.3, 69.4]),
+            self.createSegment("99999997_02", [-50.4, -50.1, -49.9, -49.6], [69.2, 69.2, 69.2, 69.2]),
+        ]
+        request = self.factory.post(
+            "calculateCrossovers", {"app": "rds", "data": ujson.dumps({"segments": segmentIds})})
+        checkStatus(self, views.crossoverCalculation(request))
+
+        # The crossing is found once (by the second segment) and both segments are flagged
+        self.assertEqual(
+            self.models.crossovers.objects.filter(point_path_1__segment_id__in=segmentIds).count(), 1)
+        self.assertEqual(
+            self.models.segments.objects.filter(pk__in=segmentIds, crossover_calc=True).count(), 2)
+
+    def test_crossoverCalculation_prefilter(self):
+        setUp(self)
+        # Two segments whose bounding boxes do not overlap
+        segmentIds = [
+            self.createSegment("99999996_01", [-50.0, -50.0, -50.0, -50.0], [69.0, 69.1, 69.3, 69.4]),
+            self.createSegment("99999996_02", [-40.4, -40.1, -39.9, -39.6], [72.2, 72.2, 72.2, 72.2]),
+        ]
+        self.assertIsNotNone(self.models.segments.objects.get(pk=segmentIds[0]).geom_proj)
+        self.assertFalse(
+            self.models.point_paths.objects.filter(segment_id__in=segmentIds, geom_proj__isnull=True).exists())
+        locationId = self.models.segments.objects.get(pk=segmentIds[1]).season.location_id
+
+        with connection.cursor() as cursor:
+            # The first segment is pruned from the candidates of the second
+            candidateIds = views._crossoverCandidates(
+                cursor, "rds", segmentIds[1], 3413, locationId, segmentIds[:1], [])
+            self.assertNotIn(segmentIds[0], candidateIds)
+
+            # A segment without a projected geometry is always compared
+            self.models.segments.objects.filter(pk=segmentIds[0]).update(geom_proj=None)
+            candidateIds = views._crossoverCandidates(
+                cursor, "rds", segmentIds[1], 3413, locationId, segmentIds[:1], [])
+            self.assertIn(segmentIds[0], candidateIds)
+
+        request = self.factory.post(
+            "calculateCrossovers", {"app": "rds", "data": ujson.dumps({"segments": segmentIds})})
+        checkStatus(self, views.crossoverCalculation(request))
+        prefilterStats = self.models.ingest_stats.objects.get(
+            operation="crossoverCalculation", phase="prefilter", segment="99999996_02")
+        self.assertGreaterEqual(prefilterStats.row_count, 1)
+
+    def test_crossoverCalculation_unprojected(self):
+        setUp(self)
+        # Point paths without a projected geometry are transformed by the engines
+        segmentIds = [
+            self.createSegment("99999995_01", [-50.0, -50.0, -50.0, -50.0], [69.0, 69.1, 69.3, 69.4]),
+            self.createSegment("99999995_02", [-50.4, -50.1, -49.9, -49.6], [69.2, 69.2, 69.2, 69.2]),
+        ]
+        locationId = self.models.segments.objects.get(pk=segmentIds[1]).season.location_id
+        engines = ["sql", "strtree"]
+        with connection.cursor() as cursor:
+            results = [
+                ops.crossovers.CROSSOVER_ENGINES[engine](
+                    cursor, "rds", segmentIds[1], 3413, segmentIds[:1], None, locationId)
+                for engine in engines
+            ]
+            self.models.point_paths.objects.filter(segment_id=segmentIds[0]).update(geom_proj=None)
+            for engine, stored in zip(engines, results):
+                self.assertEqual(len(stored.point_path_1_id), 1)
+                transformed = ops.crossovers.CROSSOVER_ENGINES[engine](
+                    cursor, "rds", segmentIds[1], 3413, segmentIds[:1], None, locationId)
+                self.assertEqual(transformed.point_path_2_id.tolist(), stored.point_path_2_id.tolist())
+                np.testing.assert_allclose(transformed.lon, stored.lon, atol=1e-9)
+                np.testing.assert_allclose(transformed.lat, stored.lat, atol=1e-9)
+
+    def test_calculate_crossovers_command(self):
+        setUp(self)
+        segmentIds = [
+            self.createSegment("99999994_01", [-50.0, -50.0, -50.0, -50.0], [69.0, 69.1, 69.3, 69.4]),
+            self.createSegment("99999994_02", [-50.4, -50.1, -49.9, -49.6], [69.2, 69.2, 69.2, 69.2]),
+        ]
+        out = io.StringIO()
+        call_command("calculate_crossovers", "rds", *segmentIds, workers=1, stdout=out)
+        self.assertIn("inserted for 2 segments", out.getvalue())
+        self.assertEqual(
+            self.models.crossovers.objects.filter(point_path_1__segment_id__in=segmentIds).count(), 1)
+        self.assertEqual(
+            self.models.segments.objects.filter(pk__in=segmentIds, crossover_calc=True).count(), 2)
+
+    def test_crossoverCalculation_report(self):
+        setUp(self)
+        request = self.factory.post(
+            "calculateCrossovers", {"app": "rds", "data": ujson.dumps({"segments": [99999999]})})
+        response = views.crossoverCalculation(request)
+        self.assertEqual(ujson.loads(response.content)["status"], 0)
+        self.assertEqual(getData(response)["status"], [0])
+
+    def test_crossoverCalculation_engine(self):
+        setUp(self)
+        segmentIds = [
+            self.createSegment("99999995_01", [-50.0, -50.0, -50.0, -50.0], [69.0, 69.1, 69.3, 69.4]),
+            self.createSegment("99999995_02", [-50.4, -50.1, -49.9, -49.6], [69.2, 69.2, 69.2, 69.2]),
+        ]
+        request = self.factory.post(
+            "calculateCrossovers", {"app": "rds", "data": ujson.dumps({"segments": segmentIds, "engine": "strtree"})})
+        checkStatus(self, views.crossoverCalculation(request))
+        self.assertEqual(
+            self.models.crossovers.objects.filter(point_path_1__segment_id__in=segmentIds).count(), 1)
+
+        request = self.factory.post(
+            "calculateCrossovers", {"app": "rds", "data": ujson.dumps({"segments": segmentIds, "engine": "none"})})
+        self.assertEqual(ujson.loads(views.crossoverCalculation(request).content)["status"], 0)
+
+
+# Test that the crossover engines agree on synthetic flight lines.
+class crossoverEnginesTests(TestCase):
+    fixtures = testFixtures()
+    createSegment = crossoverCalculationTests.createSegment
+
+    def test_STRtree_query(self):
+        rng = np.random.default_rng(7)
+        corners = rng.uniform(0, 100, (500, 2))
+        boxes = np.hstack([corners, corners + rng.uniform(0, 5, (500, 2))])
+        corners = rng.uniform(0, 100, (50, 2))
+        queries = np.hstack([corners, corners + rng.uniform(0, 10, (50, 2))])
+        queryIdx, itemIdx = ops.crossovers.STRtree(boxes, nodeCapacity=4).query(queries)
+        expected = {
+            (queryId, itemId) for queryId in range(len(queries)) for itemId in range(len(boxes))
+            if queries[queryId, 0] <= boxes[itemId, 2] and boxes[itemId, 0] <= queries[queryId, 2]
+            and queries[queryId, 1] <= boxes[itemId, 3] and boxes[itemId, 1] <= queries[queryId, 3]
+        }
+        self.assertEqual(len(queryIdx), len(expected))
+        self.assertEqual(set(zip(queryIdx.tolist(), itemIdx.tolist())), expected)
+
+    def test_findCrossings(self):
+        # A zigzag crossed between key points (rounded up to key point 13) and on key point 14
+        target = np.array([[1, 10 + idx, float(idx), 0.3 * (idx % 2)] for idx in range(6)])
+        others = np.array([[2, 100 + idx, 2.5, idx - 1.0] for idx in range(3)]
+                          + [[3, 200 + idx, 4.0, 2.0 * idx - 1] for idx in range(2)])
+        found = ops.crossovers.findCrossings(target, others, 3413)
+        self.assertEqual(found.point_path_1_id.tolist(), [13, 14])
+        self.assertEqual(found.point_path_2_id.tolist(), [101, 201])
+        np.testing.assert_allclose(found.angle, [73.300756, 73.300756], atol=1e-6)
+
+    def test_resolveCrossings(self):
+        # Positions halfway between key points round half to even (key point numbers from 1), and
+        # a crossing on the last key point is measured towards the key point before it
+        target = np.array([[1, 10 + idx, 10.0 * idx, 0.0] for idx in range(3)])
+        others = np.array([[2, 100, 5.0, -5.0], [2, 101, 5.0, 5.0], [3, 200, 20.0, -5.0], [3, 201, 20.0, 5.0]])
+        found = ops.crossovers.resolveCrossings(
+            target, others, np.array([0.5, 2.0]), np.array([0.5, 2.5]), np.array([[5.0, 0.0], [20.0, 0.0]]), 3413)
+        self.assertEqual(found.point_path_1_id.tolist(), [11, 12])
+        self.assertEqual(found.point_path_2_id.tolist(), [101, 201])
+        np.testing.assert_allclose(found.angle, [90.0, 90.0])
+
+    def test_selfCrossings(self):
+        rng = np.random.default_rng(3)
+        xy = rng.uniform(0, 10, (60, 2))
+        pieces1, pieces2, t, u = ops.crossovers.selfCrossings(xy, chunkPairs=7)
+        # every pair of non-adjacent pieces tested directly
+        expected = set()
+        for idx1 in range(len(xy) - 1):
+            for idx2 in range(idx1 + 2, len(xy) - 1):
+                found = ops.crossovers.crossPieces(
+                    xy, np.array([idx1]), np.array([False]), xy, np.array([idx2]), np.array([False]))
+                if len(found[0]):
+                    expected.add((idx1, idx2))
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(set(zip(pieces1.tolist(), pieces2.tolist())), expected)
+
+    def test_selfCrossovers(self):
+        # A loop crossing itself halfway along its first and third pieces
+        keyPoints = np.array([[1, 10 + idx, x, y] for idx, (x, y) in enumerate(
+            [(0.0, 0.0), (2.0, 2.0), (2.0, 0.0), (0.0, 2.0), (5.0, 5.0)])])
+        found = ops.crossovers.selfCrossovers(keyPoints, 3413)
+        self.assertEqual(found.point_path_1_id.tolist(), [10])
+        self.assertEqual(found.point_path_2_id.tolist(), [12])
+        np.testing.assert_allclose(found.angle, [90.0])
+
+    def test_writeCrossovers(self):
+        setUp(self)
+        pointPathIds = list(self.models.point_paths.objects.order_by("id").values_list("id", flat=True)[:3])
+        found = ops.crossovers.concatCrossovers([
+            ops.crossovers.Crossovers(
+                np.array(pointPathIds[:2]), np.array(pointPathIds[1:]), np.array([12.34567, 89.9996]),
+                np.array([-45.5, 76.25]), np.array([70.25, -68.5])),
+            ops.crossovers.emptyCrossovers(),
+        ])
+        crossoverCount = self.models.crossovers.objects.count()
+        with connection.cursor() as cursor:
+            self.assertEqual(ops.crossovers.writeCrossovers(cursor, "rds", found), 2)
+            self.assertEqual(ops.crossovers.writeCrossovers(cursor, "rds", ops.crossovers.emptyCrossovers()), 0)
+        self.assertEqual(self.models.crossovers.objects.count(), crossoverCount + 2)
+        written = self.models.crossovers.objects.order_by("-id")[:2][::-1]
+        self.assertEqual([obj.point_path_1_id for obj in written], pointPathIds[:2])
+        self.assertEqual([obj.point_path_2_id for obj in written], pointPathIds[1:])
+        # angles are rounded to the column scale
+        self.assertEqual([obj.angle for obj in written], [Decimal("12.346"), Decimal("90.000")])
+        self.assertEqual([obj.geom.coords for obj in written], [(-45.5, 70.25), (76.25, -68.5)])
+        self.assertEqual(written[0].geom.srid, 4326)
+
+    def test_crossoverEngines_equivalent(self):
+        setUp(self)
+        # A grid of north-south and east-west lines crossed by a diagonal, with no crossing on a
+        # key point
+        segmentIds = []
+        for idx, lon in enumerate([-50.05, -49.95, -49.85]):
+            segmentIds.append(self.createSegment(
+                "99999990_%02d" % (idx + 1), [lon, lon + 0.01, lon - 0.01, lon], [69.0, 69.13, 69.27, 69.41]))
+        for idx, lat in enumerate([69.1, 69.2, 69.3]):
+            segmentIds.append(self.createSegment(
+                "99999991_%02d" % (idx + 1), [-50.2, -50.0, -49.9, -49.7], [lat, lat + 0.005, lat - 0.005, lat]))
+        segmentIds.append(self.createSegment(
+            "99999992_01", [-50.3, -50.07, -49.92, -49.81, -49.6], [68.95, 69.11, 69.24, 69.33, 69.45]))
+
+        with connection.cursor() as cursor:
+            for segmentId in segmentIds:
+                candidateIds = [otherId for otherId in segmentIds if otherId != segmentId]
+                results = [
+                    ops.crossovers.CROSSOVER_ENGINES[engine](cursor, "rds", segmentId, 3413, candidateIds)
+                    for engine in ["sql", "strtree"]
+                ]
+                rows = []
+                for found in results:
+                    order = np.lexsort((found.point_path_2_id, found.point_path_1_id))
+                    rows.append(np.column_stack([
+                        found.point_path_1_id[order], found.point_path_2_id[order],
+                        found.angle[order], found.lon[order], found.lat[order]]))
+                self.assertGreater(len(rows[0]), 0)
+                self.assertEqual(rows[0].shape, rows[1].shape)
+                np.testing.assert_array_equal(rows[0][:, :2], rows[1][:, :2])
+                np.testing.assert_allclose(rows[0][:, 2:], rows[1][:, 2:], atol=1e-6)
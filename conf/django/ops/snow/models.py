@@ -45,6 +45,8 @@ class segments(models.Model):
     geom = models.LineStringField()
     objects = models.Manager()
     crossover_calc = models.BooleanField(default=True)
+    # geom in the polar stereographic projection of the location (see utility.LOCATION_EPSG)
+    geom_proj = models.LineStringField(srid=0, null=True, blank=True)
 
     def __str__(self):
         return "%s" % (self.name)
@@ -54,6 +56,11 @@ class frames(models.Model):
 
     segment = models.ForeignKey("segments", on_delete=models.CASCADE)
     name = models.CharField(max_length=20)
+    # summary of the frame's point paths (stored at ingest, null for frames loaded before)
+    start_gps_time = models.DecimalField(max_digits=16, decimal_places=6, blank=True, null=True)
+    stop_gps_time = models.DecimalField(max_digits=16, decimal_places=6, blank=True, null=True)
+    point_count = models.IntegerField(blank=True, null=True)
+    bbox = models.PolygonField(blank=True, null=True)
 
     def __str__(self):
         return "%s" % (self.name)
@@ -70,6 +77,9 @@ class point_paths(models.Model):
     pitch = models.DecimalField(max_digits=6, decimal_places=5)
     heading = models.DecimalField(max_digits=6, decimal_places=5)
     geom = models.PointField(dim=3)
+    # 2D geom in the polar stereographic projection of the location (see utility.LOCATION_EPSG),
+    # its GIST index is created by the migration that adds it
+    geom_proj = models.PointField(srid=0, null=True, blank=True, spatial_index=False)
     objects = models.Manager()
     key_point = models.BooleanField(default=True, db_index=True)
 
@@ -160,3 +170,19 @@ class landmarks(models.Model):
 
     def __str__(self):
         return "%d" % (self.id)
+
+
+class ingest_stats(models.Model):
+
+    # one row per phase of an ingest or crossover run (see utility.PhaseTimer)
+    run_id = models.CharField(max_length=20, db_index=True)
+    operation = models.CharField(max_length=50)
+    phase = models.CharField(max_length=50)
+    duration = models.FloatField()  # seconds
+    row_count = models.IntegerField(blank=True, null=True)
+    season = models.CharField(max_length=50, blank=True, null=True)
+    segment = models.CharField(max_length=20, blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return "%s %s" % (self.operation, self.phase)
@@ -514,6 +514,9 @@ HOME=/
 
 # CLEAR THE CONTENTS OF THE DJANGO LOGS EVERY MONTH (FIRST OF MONTH, 2 AM)
 0 2 1 * * root > $opsDataPath/django_logs/createPath.log;
+
+# REMOVE ABANDONED PATH UPLOAD SESSIONS OLDER THAN 1 WEEK EVERY DAY AT 3 AM
+0 3 * * * root find $opsDataPath/data/uploads/ -mindepth 1 -maxdepth 1 -type d -mtime +7 -exec rm -rf {} +;
 EOM
 
     printf "${STATUS_COLOR}Restarting crond${NC}\n";
@@ -751,13 +754,7 @@ Environment=\"PGLOG=${pgDir}pgstartup.log\"
         printf "${STATUS_COLOR}Creating default user${NC}\n";
         python manage.py shell -c "exec(open('/opt/ops/conf/tools/createDefaultUser.py').read())"
 
-        # CREATE INDEXES ON POINT PATH GEOMETRIES
-        printf "${STATUS_COLOR}Creating indices on point path geometries${NC}\n";
-        indexStr='psql -U postgres -d '$dbName' -c "CREATE INDEX app_antarctic_geom_idx ON app_point_paths USING gist (ST_Transform(geom,3031)) WHERE location_id = 2; CREATE INDEX app_arctic_geom_idx ON app_point_paths USING gist (ST_Transform(geom,3413)) WHERE location_id = 1;"'
-        eval ${indexStr//app/rds}
-        eval ${indexStr//app/snow}
-        eval ${indexStr//app/accum}
-        eval ${indexStr//app/kuband}
+        # the projected point path geometries (geom_proj) are indexed by the migrations
 
     fi
 
@@ -951,6 +948,7 @@ WantedBy=multi-user.target"
     mkdir -m 777 -p $opsDataPath"datapacktmp/"
     mkdir -m 777 -p  $opsDataPath"data/datapacks/"
     mkdir -m 777 -p $opsDataPath"data/reports/"
+    mkdir -m 777 -p $opsDataPath"data/uploads/"
     mkdir -m 777 -p $opsDataPath"postgresql_reports/"
     mkdir -m 777 -p $opsDataPath"django_logs/debug/"
     mkdir -m 777 -p /var/profile_logs/txt/
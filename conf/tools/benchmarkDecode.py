@@ -0,0 +1,136 @@
+# =========================================================================================
+# SCRIPT FOR BENCHMARKING OPS REQUEST DECODING AND RESPONSE ENCODING.
+#
+# Compares the default Decimal request decoding of utility.getData with the float
+# fast-path (float_decode) for a large getLayerPoints round trip: once on synthetic
+# payloads and, if a segment is given below, through the getLayerPoints view itself.
+#
+# To run:
+# 	(1) Activate VirtualEnv: source /usr/bin/venv/bin/activate
+# 	(2) Run this script in the Django environment:
+# 	    python /var/django/ops/manage.py shell -c "exec(open('/opt/ops/conf/tools/benchmarkDecode.py').read())"
+#
+# =========================================================================================
+
+## USER INPUT
+
+# ------------------------------------------------------------------------------------------
+# pointCounts: the number of layer points in each synthetic round trip
+pointCounts = [10000, 100000, 1000000]
+
+# ------------------------------------------------------------------------------------------
+# repeats: the number of times each measurement is repeated (the fastest run is reported)
+repeats = 3
+
+# ------------------------------------------------------------------------------------------
+# live*: an existing segment to request from the getLayerPoints view
+# (set liveSegment = None to skip the live round trip)
+liveApp = "rds"
+liveLocation = "arctic"
+liveSeason = "2011_Greenland_P3"
+liveSegment = None
+liveUserName = "anonymous"
+
+# ------------------------------------------------------------------------------------------
+
+## AUTOMATED SECTION ##
+
+import json
+import timeit
+from decimal import Decimal
+import ujson
+from django.test.client import RequestFactory
+import ops.utility as utility
+import ops.views as views
+
+
+def bestTime(func, *args, **kwargs):
+    return min(timeit.repeat(lambda: func(*args, **kwargs), number=1, repeat=repeats))
+
+
+def syntheticRequest(pointCount):
+    """Builds a getLayerPoints request selecting pointCount point paths by id."""
+    return json.dumps(
+        {
+            "properties": {
+                "location": "arctic",
+                "season": "2011_Greenland_P3",
+                "segment": "20110331_01",
+                "start_gps_time": 1301569765.964949,
+                "stop_gps_time": 1301569765.964949 + pointCount * 0.05,
+                "point_path_id": list(range(1, pointCount + 1)),
+            }
+        }
+    )
+
+
+def syntheticResponse(pointCount, numberType):
+    """Builds getLayerPoints output columns holding numberType gps times and twtts."""
+    gpsTimes = [numberType("%.6f" % (1301569765.964949 + idx * 0.05)) for idx in range(pointCount)]
+    twtts = [numberType("%.11f" % (0.00001 + idx * 1e-12)) for idx in range(pointCount)]
+    return {
+        "point_path_id": list(range(1, pointCount + 1)),
+        "lyr_id": [1] * pointCount,
+        "gps_time": gpsTimes,
+        "twtt": twtts,
+        "type": [1] * pointCount,
+        "quality": [1] * pointCount,
+    }
+
+
+def decimalRoundTrip(jsonData, outData):
+    data = json.loads(jsonData, parse_float=Decimal)
+    utility.padGpsTimeRange(data["properties"]["start_gps_time"], data["properties"]["stop_gps_time"])
+    return utility.response(1, outData, {})
+
+
+def floatRoundTrip(jsonData, outData):
+    data = ujson.loads(jsonData)
+    utility.padGpsTimeRange(data["properties"]["start_gps_time"], data["properties"]["stop_gps_time"])
+    return utility.response(1, outData, {})
+
+
+print("SYNTHETIC getLayerPoints DECODE+RESPOND (seconds)")
+print("%10s %12s %12s %12s %12s" % ("points", "decode Dec", "decode float", "round Dec", "round float"))
+for pointCount in pointCounts:
+    jsonData = syntheticRequest(pointCount)
+    decimalData = syntheticResponse(pointCount, Decimal)
+    floatData = syntheticResponse(pointCount, float)
+    print(
+        "%10d %12.4f %12.4f %12.4f %12.4f"
+        % (
+            pointCount,
+            bestTime(json.loads, jsonData, parse_float=Decimal),
+            bestTime(ujson.loads, jsonData),
+            bestTime(decimalRoundTrip, jsonData, decimalData),
+            bestTime(floatRoundTrip, jsonData, floatData),
+        )
+    )
+
+if liveSegment is not None:
+    factory = RequestFactory()
+    jsonStr = json.dumps(
+        {
+            "properties": {
+                "location": liveLocation,
+                "season": liveSeason,
+                "segment": liveSegment,
+                "userName": liveUserName,
+                "isAuthenticated": True,
+                "mat": True,
+            }
+        }
+    )
+
+    def liveRoundTrip(floatDecode):
+        request = factory.post(
+            "get/layer/points",
+            {"app": liveApp, "data": jsonStr, "float_decode": str(floatDecode).lower()},
+        )
+        return views.getLayerPoints(request)
+
+    pointCount = len(ujson.loads(liveRoundTrip(False).content)["data"].get("point_path_id", []))
+    print("")
+    print("LIVE getLayerPoints ROUND TRIP FOR SEGMENT %s (%d points, seconds)" % (liveSegment, pointCount))
+    print("%14s: %8.3f" % ("Decimal", bestTime(liveRoundTrip, False)))
+    print("%14s: %8.3f" % ("float_decode", bestTime(liveRoundTrip, True)))
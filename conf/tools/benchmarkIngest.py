@@ -0,0 +1,191 @@
+# =========================================================================================
+# SCRIPT FOR BENCHMARKING THE PIECES OF THE OPS INGEST (createPath) PIPELINE.
+#
+# Times the in-memory stages of createPath on synthetic segments so that regressions and
+# improvements can be measured without a full database load.
+#
+# To run:
+# 	(1) Activate VirtualEnv: source /usr/bin/venv/bin/activate
+# 	(2) Run this script in the Django environment:
+# 	    python /var/django/ops/manage.py shell -c "exec(open('/opt/ops/conf/tools/benchmarkIngest.py').read())"
+#
+# =========================================================================================
+
+## USER INPUT
+
+# ------------------------------------------------------------------------------------------
+# pointCounts: the number of points in each synthetic segment
+pointCounts = [1000, 10000, 100000]
+
+# ------------------------------------------------------------------------------------------
+# frameCounts: the number of frames in each synthetic segment
+frameCounts = [10, 100, 500]
+
+# ------------------------------------------------------------------------------------------
+# repeats: the number of times each measurement is repeated (the fastest run is reported)
+repeats = 3
+
+# ------------------------------------------------------------------------------------------
+# copyPointCount: the number of points in the segment used to compare COPY encodings
+copyPointCount = 1000000
+
+# ------------------------------------------------------------------------------------------
+# copyApp: the app whose point_paths table layout is used for the COPY comparison
+# (rows are copied into a temporary table, nothing is written to the app's tables)
+copyApp = "rds"
+
+# ------------------------------------------------------------------------------------------
+
+## AUTOMATED SECTION ##
+
+import timeit
+import numpy as np
+from django.db import connection
+import ops.utility as utility
+import ops.pgcopy as pgcopy
+from django.contrib.gis.geos import GEOSGeometry
+
+
+def syntheticSegment(pointCount, frameCount):
+    """Builds gps times and frame start gps times for a synthetic segment."""
+    gpsTimes = list(1301569765.964949 + np.arange(pointCount) * 0.05)
+    frameStartGpsTimes = list(
+        np.linspace(gpsTimes[0], gpsTimes[-1], frameCount, endpoint=False)
+    )
+    framePks = list(range(1, frameCount + 1))
+    return gpsTimes, frameStartGpsTimes, framePks
+
+
+def scanFrames(gpsTimes, frameStartGpsTimes, framePks):
+    """The original per-point frame lookup used by createPath."""
+    return [
+        framePks[
+            max(
+                [
+                    gpsIdx
+                    for gpsIdx in range(len(frameStartGpsTimes))
+                    if frameStartGpsTimes[gpsIdx] <= gpsTime
+                ]
+            )
+        ]
+        for gpsTime in gpsTimes
+    ]
+
+
+def bestTime(func, *args):
+    return min(timeit.repeat(lambda: func(*args), number=1, repeat=repeats))
+
+
+print("FRAME ASSIGNMENT (seconds)")
+print("%10s %8s %12s %12s %10s" % ("points", "frames", "scan", "vectorized", "speedup"))
+for pointCount in pointCounts:
+    for frameCount in frameCounts:
+        args = syntheticSegment(pointCount, frameCount)
+        # The original scan is quadratic; skip sizes that would take minutes.
+        if pointCount * frameCount <= 5e6:
+            scanTime = bestTime(scanFrames, *args)
+        else:
+            scanTime = float("nan")
+        vecTime = bestTime(utility.assignFrames, *args)
+        print(
+            "%10d %8d %12.4f %12.4f %10.1f"
+            % (pointCount, frameCount, scanTime, vecTime, scanTime / vecTime)
+        )
+
+
+def syntheticPointPaths(pointCount):
+    """Builds the columns of a synthetic segment's point paths."""
+    gpsTimes = 1301569765.964949 + np.arange(pointCount) * 0.05
+    lon = np.linspace(-50.0, -40.0, pointCount)
+    lat = np.linspace(68.0, 70.0, pointCount)
+    elev = np.full(pointCount, 1257.839261)
+    attitude = np.full(pointCount, -0.24947)
+    frameIds = np.ones(pointCount, dtype=np.int64)
+    return gpsTimes, lon, lat, elev, attitude, frameIds
+
+
+def textCopyChunks(gpsTimes, lon, lat, elev, attitude, frameIds):
+    """Encodes the point paths as COPY text rows with hex EWKB (the text pipeline).
+
+    Rows follow pgcopy.POINT_PATH_COLUMNS; geom_proj is left NULL as in binaryCopyChunks.
+
+    """
+    rows = (
+        [1, 1, 1, frameIds[idx], gpsTimes[idx], attitude[idx], attitude[idx], attitude[idx],
+         pgcopy.ewkbPointZ(lon[idx], lat[idx], elev[idx]).hex(), None, True]
+        for idx in range(len(gpsTimes))
+    )
+    return pgcopy.textChunks(rows)
+
+
+def binaryCopyChunks(gpsTimes, lon, lat, elev, attitude, frameIds):
+    """Encodes the point paths as PGCOPY binary tuples (the binary pipeline)."""
+    geoms = pgcopy.ewkbPoints(lon, lat, elev)
+    columns = pgcopy.pointPathColumns(1, 1, 1, frameIds, gpsTimes, attitude, attitude, attitude, geoms)
+    return pgcopy.binaryChunks(columns)
+
+
+def geosEwkb(lon, lat, elev):
+    """The original per-point WKT -> GEOS -> hex EWKB conversion used by createPath."""
+    return [
+        GEOSGeometry(
+            "POINT Z (" + repr(lon[idx]) + " " + repr(lat[idx]) + " " + str(elev[idx]) + ")",
+            srid=4326,
+        ).hexewkb.decode()
+        for idx in range(len(lon))
+    ]
+
+
+def structEwkb(lon, lat, elev):
+    """Hand-packed EWKB, one point at a time."""
+    return [pgcopy.ewkbPointZ(lon[idx], lat[idx], elev[idx]) for idx in range(len(lon))]
+
+
+def encodeOnly(chunkFunc, *args):
+    return sum(len(chunk) for chunk in chunkFunc(*args))
+
+
+def copyToTemp(copySql, chunkFunc, *args):
+    with connection.cursor() as cursor:
+        cursor.execute("TRUNCATE ops_benchmark_point_paths;")
+        cursor.copy_expert(copySql, pgcopy.CopyStream(chunkFunc(*args)))
+
+
+pointPaths = syntheticPointPaths(copyPointCount)
+_, lon, lat, elev, _, _ = pointPaths
+
+print("")
+print("POINT Z EWKB ENCODING FOR %d POINTS (seconds)" % copyPointCount)
+for name, encodeFunc in [
+    ("GEOS", geosEwkb),
+    ("struct", structEwkb),
+    ("numpy", pgcopy.ewkbPoints),
+]:
+    print("%8s: %8.3f" % (name, bestTime(encodeFunc, lon, lat, elev)))
+
+print("")
+print("COPY ENCODING FOR %d POINTS (seconds)" % copyPointCount)
+columnsStr = ", ".join(pgcopy.POINT_PATH_COLUMNS)
+with connection.cursor() as cursor:
+    cursor.execute(
+        "CREATE TEMP TABLE ops_benchmark_point_paths (LIKE {app}_point_paths INCLUDING DEFAULTS);".format(
+            app=copyApp
+        )
+    )
+try:
+    for name, chunkFunc, copySql in [
+        ("text", textCopyChunks,
+         "COPY ops_benchmark_point_paths (%s) FROM STDIN DELIMITER ',';" % columnsStr),
+        ("binary", binaryCopyChunks,
+         "COPY ops_benchmark_point_paths (%s) FROM STDIN WITH (FORMAT binary);" % columnsStr),
+    ]:
+        payloadBytes = encodeOnly(chunkFunc, *pointPaths)
+        encodeTime = bestTime(encodeOnly, chunkFunc, *pointPaths)
+        copyTime = bestTime(copyToTemp, copySql, chunkFunc, *pointPaths)
+        print(
+            "%8s: %6.1f MB  encode %8.3f  encode+COPY %8.3f  (%.0f rows/s)"
+            % (name, payloadBytes / 1e6, encodeTime, copyTime, copyPointCount / copyTime)
+        )
+finally:
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS ops_benchmark_point_paths;")